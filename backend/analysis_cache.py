@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# --- Configuration ---
+CACHE_PATH = os.environ.get("ANALYSIS_CACHE_PATH", os.path.join("db_storage", "analysis_cache.sqlite3"))
+MAX_CACHE_BYTES = int(os.environ.get("ANALYSIS_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+MAX_CACHE_AGE = float(os.environ.get("ANALYSIS_CACHE_MAX_AGE", str(30 * 24 * 3600))) # seconds
+
+# Pipeline stages, each with its own key space:
+#   page        -> content hash of one scanned page / page image
+#   text        -> sha256(file bytes)
+#   context     -> sha256(text) + knowledge-base version
+#   explanation -> sha256(text) + sha256(context) + language
+STAGES = ("page", "text", "context", "explanation")
+
+
+def sha256_file(path: str, block_size: int = 1024 * 1024) -> str:
+    """Hashes a file in fixed-size blocks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def sha256_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    """
+    Content-addressed, multi-stage cache for the /analyze pipeline.
+
+    Each stage is cached separately, so re-analyzing the same file in another
+    language only pays for generation, and a knowledge-base change only
+    invalidates retrieval (and, through the context hash, generation).
+    Entries are evicted by age and, least-recently-used first, by total size.
+    """
+
+    def __init__(self, path: Optional[str] = CACHE_PATH, max_bytes: int = MAX_CACHE_BYTES, max_age: float = MAX_CACHE_AGE):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._conn = None
+        self._total_bytes = 0
+        self.hits = {stage: 0 for stage in STAGES}
+        self.misses = {stage: 0 for stage in STAGES}
+        self.evictions = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " stage TEXT, key TEXT, value TEXT, size INTEGER,"
+                " kb_version TEXT, created REAL, last_used REAL,"
+                " PRIMARY KEY (stage, key))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_created ON entries (created)")
+            (total,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+            self._total_bytes = total
+        return self._conn
+
+    def get(self, stage: str, key: str) -> Optional[Any]:
+        """Returns the cached value (JSON-decoded) or None."""
+        with self._lock:
+            db = self._db()
+            row = db.execute(
+                "SELECT value, created FROM entries WHERE stage = ? AND key = ?", (stage, key)
+            ).fetchone()
+            if row is None or time.time() - row[1] > self.max_age:
+                self.misses[stage] += 1
+                return None
+            db.execute("UPDATE entries SET last_used = ? WHERE stage = ? AND key = ?", (time.time(), stage, key))
+            db.commit()
+            self.hits[stage] += 1
+            return json.loads(row[0])
+
+    def put(self, stage: str, key: str, value: Any, kb_version: Optional[str] = None):
+        """Stores a JSON-serializable value, then enforces the size/age limits."""
+        data = json.dumps(value, ensure_ascii=False)
+        size = len(data.encode("utf-8")) + len(key)
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            old = db.execute("SELECT size FROM entries WHERE stage = ? AND key = ?", (stage, key)).fetchone()
+            db.execute(
+                "INSERT OR REPLACE INTO entries (stage, key, value, size, kb_version, created, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (stage, key, data, size, kb_version, now, now)
+            )
+            self._total_bytes += size - (old[0] if old else 0)
+            self._evict_locked(db)
+            db.commit()
+
+    def _evict_locked(self, db: sqlite3.Connection):
+        cutoff = time.time() - self.max_age
+        count, size = db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries WHERE created < ?", (cutoff,)
+        ).fetchone()
+        if count:
+            db.execute("DELETE FROM entries WHERE created < ?", (cutoff,))
+            self._total_bytes -= size
+            self.evictions += count
+
+        while self._total_bytes > self.max_bytes:
+            victims = db.execute(
+                "SELECT stage, key, size FROM entries ORDER BY last_used LIMIT 64"
+            ).fetchall()
+            if not victims:
+                break
+            for stage, key, size in victims:
+                db.execute("DELETE FROM entries WHERE stage = ? AND key = ?", (stage, key))
+                self._total_bytes -= size
+                self.evictions += 1
+                if self._total_bytes <= self.max_bytes:
+                    break
+
+    def invalidate_kb(self, current_kb_version: str) -> int:
+        """
+        Drops retrieval results computed against any other knowledge-base
+        version. Explanations are keyed by context hash, so they are only
+        reused if the new retrieval yields the same context; others age out.
+        """
+        with self._lock:
+            db = self._db()
+            condition = "stage = 'context' AND kb_version IS NOT ?"
+            count, size = db.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries WHERE {condition}", (current_kb_version,)
+            ).fetchone()
+            db.execute(f"DELETE FROM entries WHERE {condition}", (current_kb_version,))
+            db.commit()
+            self._total_bytes -= size
+            return count
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "hits": dict(self.hits),
+                "misses": dict(self.misses),
+                "evictions": self.evictions,
+                "bytes": self._total_bytes,
+            }
@@ -0,0 +1,192 @@
+import mimetypes
+import tempfile
+from typing import Dict, Iterator, Optional
+
+from analysis_cache import AnalysisCache, sha256_file, sha256_text
+from gemini_client import process_document, generate_explanation, generate_explanation_stream
+from rag_service import rag_service
+from page_extraction import extract_units, split_units
+from query_builder import MULTI_QUERY, build_queries
+from image_preprocess import preprocess_file
+from storage import sniff_mime_type
+
+# Shared, content-addressed cache for every stage of /analyze
+analysis_cache = AnalysisCache()
+_seen_kb_version: Optional[str] = None
+
+# Pages read from the PDF text layer / sent to the vision model / served from the page cache
+page_stats = {"local": 0, "remote": 0, "cached": 0}
+
+
+def guess_mime_type(file_path: str) -> str:
+    # Content first: stored blobs have no file extension
+    with open(file_path, "rb") as f:
+        mime_type = sniff_mime_type(f.read(16))
+    if mime_type is None or mime_type == "text/plain":
+        mime_type = mimetypes.guess_type(file_path)[0] or mime_type
+    return mime_type or "application/octet-stream" # Default
+
+
+def vision_extract(file_path: str, mime_type: str) -> str:
+    """
+    Vision call for one page unit. Photos are cropped, cleaned up and shrunk
+    first (when OpenCV is installed), so far fewer bytes are uploaded.
+    """
+    if mime_type.startswith("image/"):
+        with tempfile.TemporaryDirectory(prefix="prepared_") as workdir:
+            prepared = preprocess_file(file_path, workdir)
+            if prepared is not None:
+                return process_document(*prepared)
+    return process_document(file_path, mime_type)
+
+
+def read_document(file_path: str, mime_type: str) -> Dict:
+    """
+    Extracts a document's text page by page, using the vision model only for
+    pages without a usable text layer. Pages are processed concurrently and
+    cached by content hash. Returns {"text", "pages": {"total", "local",
+    "remote", "cached"}}.
+    """
+    with tempfile.TemporaryDirectory(prefix="pages_") as workdir:
+        try:
+            units = split_units(file_path, mime_type, workdir)
+        except Exception as e:
+            print(f"Could not split {file_path} into pages, sending the whole file to vision: {e}")
+            units = [{"index": 0, "path": file_path, "mime_type": mime_type, "hash": sha256_file(file_path)}]
+        document = extract_units(units, vision_extract, cache=analysis_cache)
+    pages = document["pages"]
+    print(f"Extracted {file_path}: {pages['local']} pages locally, {pages['remote']} via vision, "
+          f"{pages['cached']} from cache.")
+    return document
+
+
+def extract_text(file_path: str, file_hash: Optional[str] = None) -> Dict:
+    """
+    Stage 1: Text layer / Vision API (Gemini) -> Extract Text.
+    Cached once per file content (SHA-256 of the bytes).
+    """
+    file_hash = file_hash or sha256_file(file_path)
+    document = analysis_cache.get("text", file_hash)
+    cached = document is not None
+    if isinstance(document, str): # Entries written before page accounting
+        document = {"text": document, "pages": None}
+    if not cached:
+        document = read_document(file_path, guess_mime_type(file_path))
+        for kind in page_stats:
+            page_stats[kind] += document["pages"][kind]
+        analysis_cache.put("text", file_hash, document)
+    doc_text = document["text"]
+    return {
+        "file_hash": file_hash,
+        "text": doc_text,
+        "text_hash": sha256_text(doc_text),
+        "pages": document["pages"],
+        "cached": cached,
+    }
+
+
+def retrieve_context(doc_text: str, text_hash: Optional[str] = None) -> Dict:
+    """
+    Stage 2: RAG Search -> Find Laws.
+    Cached per (text hash, knowledge-base version, query mode); a new KB
+    version drops retrieval results computed against older versions.
+    """
+    global _seen_kb_version
+    kb_version = rag_service.kb_version
+    if kb_version != _seen_kb_version:
+        if _seen_kb_version is not None:
+            analysis_cache.invalidate_kb(kb_version)
+        _seen_kb_version = kb_version
+
+    mode = "multi" if MULTI_QUERY else "single" # Results differ by mode
+    key = f"{text_hash or sha256_text(doc_text)}:{kb_version}:{mode}"
+    result = analysis_cache.get("context", key)
+    cached = result is not None
+    if not cached:
+        # Sub-queries from the whole text: opening, cited acts/sections/amounts, key passages
+        queries = build_queries(doc_text)
+        print(f"Querying RAG with {len(queries)} sub-queries ({', '.join(q['kind'] for q in queries)}).")
+        result = rag_service.query_many([q["text"] for q in queries])
+        for query, report in zip(queries, result["retrieval"]["sub_queries"]):
+            report["kind"] = query["kind"]
+        analysis_cache.put("context", key, result, kb_version=kb_version)
+
+    context_str = "\n\n".join(result["documents"])
+    return {
+        "documents": result["documents"],
+        "retrieval": result["retrieval"],
+        "context": context_str,
+        "context_hash": sha256_text(context_str),
+        "cached": cached,
+    }
+
+
+def explain(doc_text: str, text_hash: str, context: Dict, language: str) -> Dict:
+    """
+    Stage 3: Generation (Gemini) -> Explain in Loc Lang.
+    Cached per (text hash, context hash, language).
+    """
+    key = f"{text_hash}:{context['context_hash']}:{language}"
+    explanation = analysis_cache.get("explanation", key)
+    cached = explanation is not None
+    if not cached:
+        explanation = generate_explanation(doc_text, context["context"], language)
+        analysis_cache.put("explanation", key, explanation)
+    return {"explanation": explanation, "cached": cached}
+
+
+def explain_stream(doc_text: str, text_hash: str, context: Dict, language: str) -> Iterator[Dict]:
+    """
+    Streaming variant of `explain`. Yields {"delta": str} pieces as they are
+    generated, then a final {"explanation", "cached"} dict like `explain`.
+    A cache hit is sent as a single delta. The explanation is only cached
+    once generation completes, so an abandoned stream stores nothing.
+    """
+    key = f"{text_hash}:{context['context_hash']}:{language}"
+    explanation = analysis_cache.get("explanation", key)
+    cached = explanation is not None
+    if cached:
+        yield {"delta": explanation}
+    else:
+        pieces = []
+        for piece in generate_explanation_stream(doc_text, context["context"], language):
+            pieces.append(piece)
+            yield {"delta": piece}
+        explanation = "".join(pieces)
+        analysis_cache.put("explanation", key, explanation)
+    yield {"explanation": explanation, "cached": cached}
+
+
+def summarize(doc_text: str) -> str:
+    """The short preview of the extracted text shown to the user."""
+    return doc_text[:200] + "..."
+
+
+def build_response(extraction: Dict, context: Dict, explanation: Dict) -> Dict:
+    """The /analyze response payload."""
+    return {
+        "original_text_summary": summarize(extraction["text"]),
+        "explanation": explanation["explanation"],
+        "related_laws": context["documents"],
+        "retrieval": context["retrieval"],
+        "pages": extraction["pages"],
+        "cache": {
+            "text": extraction["cached"],
+            "context": context["cached"],
+            "explanation": explanation["cached"],
+        },
+    }
+
+
+def analyze_file(file_path: str, language: str) -> Dict:
+    """Runs the full pipeline for one uploaded file."""
+    print(f"Processing {file_path} (Vision)...")
+    extraction = extract_text(file_path)
+
+    print("Querying Knowledge Base...")
+    context = retrieve_context(extraction["text"], extraction["text_hash"])
+
+    print(f"Generating Explanation in {language}...")
+    explanation = explain(extraction["text"], extraction["text_hash"], context, language)
+
+    return build_response(extraction, context, explanation)
@@ -0,0 +1,82 @@
+"""
+Throughput benchmark for keyword analysis (text_analyzer.py).
+
+Chunks the knowledge base handbooks (ingest.PDF_FILES, read from the project
+root like ingest.py) with chunking.chunk_pages; where they are missing,
+generates handbook-like pages instead: numbered sections of English legal
+text with Tamil and Hindi paragraphs (one in three pages), as in the Tamil
+Nadu handbooks. Then tokenizes every chunk with:
+- whitespace:      text.lower().split(), the previous tokenizer
+- analyzer (cold): Analyzer() with an empty term cache (index build)
+- analyzer (warm): the same Analyzer again (queries, incremental ingestion)
+- no stemming:     Analyzer(stem=False), cold
+Reports throughput and the resulting vocabulary (distinct terms).
+
+Usage: python bench_analyzer.py [synthetic pages]   default: 2000
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from chunking import chunk_pages
+from ingest import PDF_FILES
+from pdf_text import extract_pages
+from text_analyzer import Analyzer
+
+ENGLISH = ("consumer complaint licensee supply tariff notice commission appeal penalty assessment "
+           "electricity charges meter reading deposit refund district order hearing section act "
+           "the of to and in shall be any by or such under consumers' (a) (b) 2003: ₹5.50 Rs.").split()
+TAMIL = ("மின்சார வாரியம் நுகர்வோர் புகார் மக்களுக்கு மாநிலத்தின் கட்டணம் மற்றும் ஒரு இந்த "
+         "குடும்ப அட்டை நியாய விலைக் கடை அரிசி வழங்கப்படும்.").split()
+HINDI = ("उपभोक्ता उपभोक्ताओं की शिकायत शिकायतें जिला आयोग में दर्ज आवास योजना के लिए "
+         "आवेदन किया जाता है और लाभार्थी।").split()
+
+
+def handbook_pages(pages):
+    """Page texts of the handbooks in the project root, or generated ones."""
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    paths = [os.path.join(project_root, f) for f in PDF_FILES if os.path.exists(os.path.join(project_root, f))]
+    if paths:
+        print(f"Handbooks: {', '.join(os.path.basename(p) for p in paths)}")
+        return [text for path in paths for text in extract_pages(path)]
+    print(f"Handbooks not found in {project_root}; generating {pages} pages.")
+    rng = random.Random(7)
+    result = []
+    for p in range(pages):
+        lines = []
+        for i in range(40):
+            if i % 10 == 0:
+                lines.append(f"{p * 4 + i // 10 + 1}. Rules for {rng.choice(ENGLISH[:20])}.- (1) The")
+            words = TAMIL if p % 6 == 1 else HINDI if p % 6 == 4 else ENGLISH
+            lines.append(" ".join(rng.choice(words) for _ in range(14)))
+        result.append("\n".join(lines))
+    return result
+
+
+def measure(label, tokenize, texts, megabytes):
+    start = time.perf_counter()
+    token_lists = [tokenize(text) for text in texts]
+    seconds = time.perf_counter() - start
+    tokens = sum(len(t) for t in token_lists)
+    vocab = len({term for t in token_lists for term in t})
+    print(f"{label:<18}{seconds * 1000:>10.0f}{len(texts) / seconds:>12.0f}{megabytes / seconds:>9.1f}"
+          f"{tokens / seconds / 1e6:>12.2f}{vocab:>9}")
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    texts = [chunk["text"] for chunk in chunk_pages(handbook_pages(pages))]
+    megabytes = sum(len(t.encode("utf-8")) for t in texts) / 1e6
+    print(f"{len(texts)} chunks, {megabytes:.1f} MB\n")
+    print(f"{'tokenizer':<18}{'ms':>10}{'chunks/s':>12}{'MB/s':>9}{'Mtokens/s':>12}{'vocab':>9}")
+    measure("whitespace", lambda text: text.lower().split(), texts, megabytes)
+    analyzer = Analyzer()
+    measure("analyzer (cold)", analyzer.analyze, texts, megabytes)
+    measure("analyzer (warm)", analyzer.analyze, texts, megabytes)
+    measure("no stemming", Analyzer(stem=False).analyze, texts, megabytes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Cold-start benchmark for the keyword index.
+
+Builds a synthetic corpus (default 100k chunks) and compares:
+  before: fetch every document from Chroma, tokenize, build BM25Okapi
+  after:  fetch IDs only, fingerprint them, memory-map the saved BM25Index
+
+Chroma is populated with tiny dummy embeddings in a temp directory
+(no Gemini calls). Pass --no-chroma to time only the index part.
+
+Usage: python bench_bm25_startup.py [num_chunks] [--no-chroma]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from rank_bm25 import BM25Okapi
+
+from bm25_index import BM25Index, corpus_fingerprint
+
+WORDS_PER_CHUNK = 160
+VOCAB_SIZE = 50000
+
+
+def make_corpus(num_chunks):
+    rng = random.Random(42)
+    vocab = [f"w{i}" for i in range(VOCAB_SIZE)]
+    # Zipf-like term distribution, roughly like natural text
+    weights = [1.0 / (rank + 1) for rank in range(VOCAB_SIZE)]
+    ids = [f"handbook.pdf_chunk_{i}" for i in range(num_chunks)]
+    docs = [" ".join(rng.choices(vocab, weights, k=WORDS_PER_CHUNK)) for _ in range(num_chunks)]
+    return ids, docs
+
+
+def fetch_paged(collection, include, page_size=5000):
+    """Same paged read as rag_service.fetch_collection."""
+    ids, documents = [], []
+    offset = 0
+    while True:
+        page = collection.get(include=include, limit=page_size, offset=offset)
+        ids.extend(page["ids"])
+        documents.extend(page["documents"] or [])
+        if len(page["ids"]) < page_size:
+            return ids, documents
+        offset += page_size
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<40}{elapsed * 1000:>10.1f} ms")
+    return result, elapsed
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    use_chroma = "--no-chroma" not in sys.argv
+    num_chunks = int(args[0]) if args else 100_000
+
+    print(f"--- BM25 cold start: {num_chunks} chunks ---")
+    ids, docs = make_corpus(num_chunks)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        collection = None
+        if use_chroma:
+            import chromadb
+            client = chromadb.PersistentClient(path=os.path.join(tmp, "chroma"))
+            collection = client.get_or_create_collection(name="bench", metadata={"hnsw:space": "cosine"})
+            print("Populating Chroma (setup, not timed)...")
+            batch = 5000  # Chroma rejects very large single requests
+            for i in range(0, num_chunks, batch):
+                collection.add(
+                    ids=ids[i:i + batch],
+                    documents=docs[i:i + batch],
+                    embeddings=[[float(j % 7), 1.0, 0.5, 0.25] for j in range(i, min(i + batch, num_chunks))],
+                )
+
+        index = BM25Index()
+        index.add_many(ids, [d.lower().split() for d in docs])
+        path = os.path.join(tmp, "bm25.idx")
+        index.save(path, fingerprint=corpus_fingerprint(ids), meta={"tokenizer": "whitespace-lower"})
+        print(f"Index file size: {os.path.getsize(path) / 1e6:.1f} MB")
+        del index
+
+        print("\nBefore (full fetch + tokenize + BM25Okapi):")
+        total_before = 0.0
+        if collection is not None:
+            (_, fetched), t = timed("fetch all documents", lambda: fetch_paged(collection, ["documents"]))
+            total_before += t
+        else:
+            fetched = docs
+        corpus, t = timed("tokenize", lambda: [d.lower().split() for d in fetched])
+        total_before += t
+        _, t = timed("BM25Okapi build", lambda: BM25Okapi(corpus))
+        total_before += t
+        print(f"  {'TOTAL':<40}{total_before * 1000:>10.1f} ms")
+
+        print("\nAfter (ID fingerprint + memory-mapped index):")
+        total_after = 0.0
+        if collection is not None:
+            (fetched_ids, _), t = timed("fetch IDs only", lambda: fetch_paged(collection, []))
+            total_after += t
+        else:
+            fetched_ids = ids
+        fingerprint, t = timed("fingerprint", lambda: corpus_fingerprint(fetched_ids))
+        total_after += t
+        header, t = timed("read header + compare", lambda: BM25Index.read_header(path))
+        total_after += t
+        assert header["fingerprint"] == fingerprint
+        loaded, t = timed("BM25Index.load (mmap)", lambda: BM25Index.load(path))
+        total_after += t
+        print(f"  {'TOTAL':<40}{total_after * 1000:>10.1f} ms")
+        print(f"\nSpeedup: {total_before / total_after:.1f}x")
+        del loaded
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Latency benchmark for top-k keyword retrieval.
+
+Compares, per query:
+  old:    score every document, then Python sorted() over all scores
+          (what RAGService.query did with BM25Okapi)
+  dense:  score every document with numpy, then argpartition
+  top_n:  BM25Index.top_n (posting lists of query terms only, MaxScore pruning)
+
+Synthetic corpora of 10k, 100k and 1M chunks are built directly as CSR
+arrays (Zipf-distributed vocabulary) so the 1M case fits in a few seconds.
+
+Usage: python bench_bm25_topk.py [sizes...]   e.g. python bench_bm25_topk.py 10000 100000
+"""
+import sys
+import time
+
+import numpy as np
+
+from bm25_index import BM25Index
+from string_table import StringTable
+
+VOCAB_SIZE = 100_000
+TERMS_PER_DOC = 40
+TOP_K = 6           # RAGService.query asks for n_results * 2
+NUM_QUERIES = 30
+
+
+def build_index(num_docs, rng):
+    """Builds a BM25Index base segment from random (doc, term) pairs."""
+    ranks = np.arange(1, VOCAB_SIZE + 1)
+    p = 1.0 / ranks
+    p /= p.sum()
+    terms = rng.choice(VOCAB_SIZE, size=num_docs * TERMS_PER_DOC, p=p).astype(np.int64)
+    docs = np.repeat(np.arange(num_docs, dtype=np.int64), TERMS_PER_DOC)
+
+    # Collapse duplicate (doc, term) pairs into term frequencies
+    keys, tfs = np.unique(docs * VOCAB_SIZE + terms, return_counts=True)
+    fwd_docs, fwd_terms = keys // VOCAB_SIZE, keys % VOCAB_SIZE
+    used, fwd_terms = np.unique(fwd_terms, return_inverse=True)
+
+    order = np.argsort(fwd_terms, kind="stable")
+    counts = np.bincount(fwd_terms, minlength=len(used))
+    post_offsets = np.concatenate([[0], np.cumsum(counts)])
+    doc_len = np.full(num_docs, TERMS_PER_DOC, dtype=np.int32)
+    post_slots = fwd_docs[order].astype(np.uint32)
+    post_tfs = tfs[order].astype(np.uint16)
+    arrays = {
+        "doc_len": doc_len,
+        "df": counts.astype(np.int32),
+        "max_tf": np.maximum.reduceat(post_tfs, post_offsets[:-1]).astype(np.uint32),
+        "min_dl": np.minimum.reduceat(doc_len[post_slots], post_offsets[:-1]).astype(np.int32),
+        "post_offsets": post_offsets.astype(np.int64),
+        "post_slots": post_slots,
+        "post_tfs": post_tfs,
+        "fwd_offsets": np.concatenate([[0], np.cumsum(np.bincount(fwd_docs, minlength=num_docs))]).astype(np.int64),
+        "fwd_terms": fwd_terms.astype(np.uint32),
+        "fwd_tfs": tfs.astype(np.uint16),
+    }
+    index = BM25Index()
+    # Benchmark-only shortcut: load the CSR arrays directly, like BM25Index.load does
+    index._load_arrays(arrays, StringTable.from_strings([f"w{t}" for t in used]),
+                       StringTable.from_strings([f"chunk_{i}" for i in range(num_docs)]))
+    return index
+
+
+def make_queries(rng):
+    """Mixes rare and common terms, like a snippet of a notice would."""
+    queries = []
+    for _ in range(NUM_QUERIES):
+        rare = [f"w{t}" for t in rng.integers(200, VOCAB_SIZE, size=rng.integers(3, 12))]
+        common = [f"w{t}" for t in rng.integers(0, 200, size=rng.integers(0, 3))]
+        queries.append(rare + common)
+    return queries
+
+
+def old_top_k(index, query):
+    scores = index.get_scores(query)
+    return sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:TOP_K]
+
+
+def dense_top_k(index, query):
+    scores = index.get_scores(query)
+    top = np.argpartition(-scores, TOP_K)[:TOP_K]
+    return top[np.argsort(-scores[top])]
+
+
+def top_n(index, query):
+    return index.top_n(query, TOP_K)
+
+
+def time_per_query(fn, index, queries):
+    start = time.perf_counter()
+    for query in queries:
+        fn(index, query)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    rng = np.random.default_rng(0)
+
+    print(f"{'chunks':>10}{'old sorted (ms)':>18}{'dense argpart (ms)':>20}{'top_n (ms)':>14}")
+    for num_docs in sizes:
+        index = build_index(num_docs, rng)
+        queries = make_queries(rng)
+        slots = index.live_slots()
+
+        # Sanity check: same scores as exhaustive scoring
+        for query in queries[:5]:
+            scores = index.get_scores(query)[slots]
+            expected = np.sort(scores[scores > 0])[::-1][:TOP_K]
+            got = [score for _, score in index.top_n(query, TOP_K)]
+            assert np.allclose(got, expected)
+
+        old_ms = time_per_query(old_top_k, index, queries[:5] if num_docs >= 1_000_000 else queries)
+        dense_ms = time_per_query(dense_top_k, index, queries)
+        top_ms = time_per_query(top_n, index, queries)
+        print(f"{num_docs:>10}{old_ms:>18.2f}{dense_ms:>20.2f}{top_ms:>14.2f}")
+        del index # Freed before the next, larger corpus is built
+
+
+if __name__ == "__main__":
+    main()
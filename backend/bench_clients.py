@@ -0,0 +1,122 @@
+"""
+Microbenchmark: per-request TextToSpeechClient vs the pooled client.
+
+Runs a local gRPC stub of the TextToSpeech service over TLS (self-signed
+certificate), so the numbers include channel creation and the TLS handshake
+but no real network latency or synthesis time. Each mode issues the same
+SynthesizeSpeech calls, sequentially and from a small thread pool.
+
+Usage: python bench_clients.py [calls]   default: 200
+"""
+import datetime
+import os
+import statistics
+import sys
+import time
+from concurrent import futures
+
+import grpc
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+from google.auth.credentials import AnonymousCredentials
+from google.cloud import texttospeech
+from google.cloud.texttospeech import TextToSpeechClient
+from google.cloud.texttospeech_v1.services.text_to_speech.transports import TextToSpeechGrpcTransport
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from clients import client_pool
+
+SERVICE = "google.cloud.texttospeech.v1.TextToSpeech"
+AUDIO = b"ID3" + b"\0" * 2048
+
+
+def self_signed_cert():
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name).issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now).not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.DNSName("localhost")]), critical=False)
+        .sign(key, hashes.SHA256())
+    )
+    key_pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                serialization.NoEncryption())
+    return key_pem, cert.public_bytes(serialization.Encoding.PEM)
+
+
+def start_stub_server():
+    def synthesize(request, context):
+        return texttospeech.SynthesizeSpeechResponse(audio_content=AUDIO)
+
+    handler = grpc.method_handlers_generic_handler(SERVICE, {
+        "SynthesizeSpeech": grpc.unary_unary_rpc_method_handler(
+            synthesize,
+            request_deserializer=texttospeech.SynthesizeSpeechRequest.deserialize,
+            response_serializer=texttospeech.SynthesizeSpeechResponse.serialize,
+        )
+    })
+    key_pem, cert_pem = self_signed_cert()
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=8))
+    server.add_generic_rpc_handlers((handler,))
+    port = server.add_secure_port("localhost:0", grpc.ssl_server_credentials([(key_pem, cert_pem)]))
+    server.start()
+    return server, f"localhost:{port}", cert_pem
+
+
+def make_client_factory(target, cert_pem):
+    def factory():
+        transport = TextToSpeechGrpcTransport(
+            host=target,
+            credentials=AnonymousCredentials(),
+            ssl_channel_credentials=grpc.ssl_channel_credentials(root_certificates=cert_pem),
+        )
+        return TextToSpeechClient(transport=transport)
+    return factory
+
+
+def synthesize(client):
+    return client.synthesize_speech(
+        input=texttospeech.SynthesisInput(text="Please pay the bill before the due date."),
+        voice=texttospeech.VoiceSelectionParams(language_code="en-US"),
+        audio_config=texttospeech.AudioConfig(audio_encoding=texttospeech.AudioEncoding.MP3),
+    ).audio_content
+
+
+def run(label, get_client, calls, workers):
+    def one_call(_):
+        start = time.perf_counter()
+        client = get_client()
+        assert synthesize(client) == AUDIO
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        latencies = list(pool.map(one_call, range(calls)))
+    wall = time.perf_counter() - start
+    latencies.sort()
+    print(f"{label:<22}{workers:>8}{calls / wall:>10.0f}{statistics.median(latencies) * 1000:>10.2f}"
+          f"{latencies[int(len(latencies) * 0.99) - 1] * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    server, target, cert_pem = start_stub_server()
+    factory = make_client_factory(target, cert_pem)
+
+    # Route the pool's client creation to the stub server
+    texttospeech.TextToSpeechClient = factory
+    try:
+        print(f"{'mode':<22}{'threads':>8}{'calls/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+        for workers in (1, 8):
+            run("new client per call", factory, calls, workers)
+            client_pool.reset()
+            run("pooled client", client_pool.tts, calls, workers)
+    finally:
+        texttospeech.TextToSpeechClient = TextToSpeechClient
+        server.stop(0)
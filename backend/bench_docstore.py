@@ -0,0 +1,118 @@
+"""
+Memory benchmark for the RAG document registry (document_store.py).
+
+Holds N synthetic chunks (~1,100 characters each, like 256-token chunks
+from chunking.py; one in four quotes amounts in rupees, as tariff handbooks
+do, and a single "₹" makes CPython store a whole str at 2 bytes per
+character) and compares, each in a fresh process:
+- dict:   {ID: text}, the previous RAGService.doc_registry after a rebuild
+- store:  DocumentStore filled in memory (ingestion: one buffer + offsets)
+- mapped: DocumentStore opened from its file (serving workers), measured
+          right after opening and again after the queries
+Reports the memory the structure adds to the process, split into heap
+(anonymous pages, private to every worker) and file-backed pages (the
+mapped store: page cache shared by all workers and reclaimable), and the
+time to look up the texts of a top-6 result.
+
+Usage: python bench_docstore.py [chunks ...]   default: 100000 1000000
+"""
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+WORDS = ("consumer complaint licensee supply tariff notice commission appeal penalty assessment "
+         "electricity charges meter reading deposit refund district order hearing section act "
+         "the of to and in shall be any by or such under").split()
+TOP_K = 6
+QUERIES = 20000
+
+
+def chunk_texts(count):
+    """Yields count distinct chunk texts (997 paragraph variants, numbered)."""
+    rng = random.Random(11)
+    paragraphs = [" ".join(rng.choice(WORDS) for _ in range(170)) for _ in range(997)]
+    paragraphs = [p + (" charges ₹ 5.50 per unit" if i % 4 == 0 else "") for i, p in enumerate(paragraphs)]
+    for i in range(count):
+        yield f"{paragraphs[i % 997]} ({i})"
+
+
+def chunk_ids(count):
+    return (f"handbook_{i // 5000}.pdf_chunk_{i}" for i in range(count))
+
+
+def memory_mb():
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return fields["Anonymous"], fields["Rss"] - fields["Anonymous"]
+
+
+def lookup_us(get_many, count):
+    rng = random.Random(5)
+    queries = [[f"handbook_{i // 5000}.pdf_chunk_{i}" for i in rng.sample(range(count), TOP_K)] for _ in range(QUERIES)]
+    start = time.perf_counter()
+    for ids in queries:
+        assert len(get_many(ids)) == TOP_K
+    return (time.perf_counter() - start) / QUERIES * 1e6
+
+
+def run_variant(variant, count, path):
+    """Child process: builds one variant and prints its measurements."""
+    from document_store import DocumentStore
+    heap0, file0 = memory_mb()
+    if variant == "dict":
+        registry = dict(zip(chunk_ids(count), chunk_texts(count)))
+        get_many = lambda ids: {doc_id: registry[doc_id] for doc_id in ids if doc_id in registry}
+    elif variant == "store":
+        store = DocumentStore()
+        ids, texts = chunk_ids(count), chunk_texts(count)
+        for _ in range(0, count, 10000):
+            store.add_many([next(ids) for _ in range(10000)], [next(texts) for _ in range(10000)])
+        get_many = store.get_many
+    else:
+        store = DocumentStore.load(path)
+        get_many = store.get_many
+        heap, file = memory_mb()
+        print(f"opened {heap - heap0:.1f} {file - file0:.1f}")
+    micros = lookup_us(get_many, count)
+    heap, file = memory_mb()
+    print(f"result {heap - heap0:.1f} {file - file0:.1f} {micros:.1f}")
+
+
+def measure(variant, count, path):
+    out = subprocess.run([sys.executable, __file__, "--variant", variant, str(count), path],
+                         capture_output=True, text=True, check=True).stdout
+    return {line.split()[0]: [float(v) for v in line.split()[1:]] for line in out.splitlines()}
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [100000, 1000000]
+    from document_store import DocumentStore
+    print(f"{'chunks':>8}  {'registry':<18}{'heap MB':>9}{'file MB':>9}{'top-6 lookup us':>17}")
+    for count in counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "docs.store")
+            DocumentStore.write(path, list(chunk_ids(count)), list(chunk_texts(count)))
+            size = os.path.getsize(path) / 1e6
+            for variant in ("dict", "store", "mapped"):
+                result = measure(variant, count, path)
+                if "opened" in result:
+                    heap, file = result["opened"]
+                    print(f"{count:>8}  {'mapped (opened)':<18}{heap:>9.1f}{file:>9.1f}{'':>17}")
+                heap, file, micros = result["result"]
+                label = "mapped (queried)" if variant == "mapped" else variant
+                print(f"{count:>8}  {label:<18}{heap:>9.1f}{file:>9.1f}{micros:>17.1f}")
+            print(f"{count:>8}  store file {size:.1f} MB\n")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--variant":
+        run_variant(sys.argv[2], int(sys.argv[3]), sys.argv[4])
+    else:
+        main()
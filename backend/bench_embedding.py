@@ -0,0 +1,150 @@
+"""
+Benchmark for the batched embedding pipeline.
+
+Drives the shipped code path (BatchEmbedder -> gemini_client.embed_texts,
+with its shared TokenBucket and 429 back-off) against a local fake of
+`genai.embed_content` (no network) that simulates per-request latency,
+per-text cost and an API quota that answers with 429 errors, the same way
+bench_load.py stubs the Gemini client. Reports chunks/second for the old
+one-call-per-chunk path and for BatchEmbedder at several concurrency levels.
+The batched runs are repeated with a per-worker limiter in place of the
+shared one (each worker backs off on its own after a 429), to measure what
+the shared limiter and its `penalize()` back-off save in rejected requests
+and wall time ("retries": 429s, each retried).
+
+Usage: python bench_embedding.py [num_chunks]
+"""
+import contextlib
+import io
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("GEMINI_API_KEY", "stub-key")
+
+import gemini_client
+from rate_limiter import TokenBucket
+from embedding_pipeline import BatchEmbedder
+
+REQUEST_LATENCY = 0.05   # seconds per request (network round-trip)
+PER_TEXT_LATENCY = 0.001 # seconds per text inside a request
+SERVER_RPS = 20          # requests/second the fake server accepts before 429s
+CLIENT_RPS = 30          # client-side limiter set above the server quota to exercise shared back-off
+BATCH_SIZE = 10          # Small batches, so a run makes enough requests to hit the quota
+DIM = 768
+
+
+class FakeEmbeddingBackend:
+    """Simulates the Gemini embedding endpoint in-process (replaces genai.embed_content)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._window_requests = 0
+        self.requests = 0
+        self.rejected = 0
+
+    def _admit(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= 1.0:
+                self._window_start = now
+                self._window_requests = 0
+            self._window_requests += 1
+            self.requests += 1
+            if self._window_requests > SERVER_RPS:
+                self.rejected += 1
+                return False
+            return True
+
+    def embed_content(self, model, content, task_type=None, request_options=None):
+        if not self._admit():
+            raise Exception("429 Resource has been exhausted (e.g. check quota).")
+        time.sleep(REQUEST_LATENCY + PER_TEXT_LATENCY * len(content))
+        return {"embedding": [[float(len(t) % 7)] * DIM for t in content]}
+
+
+class PerWorkerLimiter:
+    """
+    Stands in for the shared TokenBucket: every thread gets its own bucket,
+    so a 429 only pauses the worker that received it.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _bucket(self) -> TokenBucket:
+        if not hasattr(self._local, "bucket"):
+            self._local.bucket = TokenBucket(rate=CLIENT_RPS, capacity=CLIENT_RPS / 4)
+        return self._local.bucket
+
+    def acquire(self, tokens: float = 1.0, timeout: float = None) -> bool:
+        return self._bucket().acquire(tokens, timeout)
+
+    def penalize(self, seconds: float):
+        self._bucket().penalize(seconds)
+
+
+def install(shared: bool) -> FakeEmbeddingBackend:
+    """Points gemini_client at a fresh fake backend and limiter."""
+    backend = FakeEmbeddingBackend()
+    gemini_client.genai.embed_content = backend.embed_content
+    gemini_client.embedding_rate_limiter = (
+        TokenBucket(rate=CLIENT_RPS, capacity=CLIENT_RPS / 4) if shared else PerWorkerLimiter()
+    )
+    return backend
+
+
+def run_sequential(chunks):
+    backend = install(shared=True)
+    start = time.perf_counter()
+    for chunk in chunks:
+        gemini_client.embed_texts([chunk])
+    return time.perf_counter() - start, backend, None
+
+
+def run_batched(chunks, workers, shared):
+    """Returns (seconds, backend, error); error is set if a batch ran out of retries."""
+    backend = install(shared)
+    embedder = BatchEmbedder(batch_size=BATCH_SIZE, max_workers=workers) # Default embed_fn: embed_texts
+    start = time.perf_counter()
+    try:
+        vectors = embedder.embed(chunks)
+        assert len(vectors) == len(chunks)
+        error = None
+    except Exception as e:
+        error = str(e)
+    return time.perf_counter() - start, backend, error
+
+
+def report(label, limiter, num_chunks, run, *args):
+    # Silence the pipeline's progress and back-off prints while measuring
+    with contextlib.redirect_stdout(io.StringIO()):
+        elapsed, backend, error = run(*args)
+    rate = f"{num_chunks / elapsed:>12.1f}" if not error else f"{'failed':>12}"
+    print(f"{label:<28}{limiter:<14}{elapsed:>10.2f}{rate}{backend.requests:>10}{backend.rejected:>9}")
+
+
+def main():
+    num_chunks = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    chunks = [f"chunk {i} " + "lorem ipsum " * 80 for i in range(num_chunks)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        gemini_client.gemini_config.get()
+
+    print(f"--- Embedding benchmark: {num_chunks} chunks, server quota {SERVER_RPS} req/s ---")
+    print(f"{'mode':<28}{'limiter':<14}{'seconds':>10}{'chunks/s':>12}{'requests':>10}{'retries':>9}")
+
+    seq_chunks = chunks[:min(num_chunks, 100)]
+    report("sequential (1 per call)", "shared", len(seq_chunks), run_sequential, seq_chunks)
+
+    for workers in (1, 4, 16):
+        label = f"batched x{BATCH_SIZE}, {workers} workers"
+        report(label, "shared", num_chunks, run_batched, chunks, workers, True)
+        if workers > 1:
+            report(label, "per-worker", num_chunks, run_batched, chunks, workers, False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Benchmark for knowledge base ingestion (ingest_pipeline.py).
+
+Generates text PDFs shaped like the handbooks in ingest.PDF_FILES (dense
+pages of numbered sections) and ingests them twice with a simulated
+embedding backend (EMBED_LATENCY seconds per request of up to 50 texts,
+4 requests in flight, like BatchEmbedder against Gemini) and a no-op index:
+- before: one file at a time, whole text joined into one string, fixed
+  1000-character chunks, then embedding and writing in batches of 200
+- after:  IngestPipeline (process-pool page extraction, streaming
+  chunking, bounded queues between stages)
+Reports wall time, per-stage throughput and peak Python heap of the main
+process (measured in a separate run).
+
+Usage: python bench_ingest.py [files] [pages per file]   default: 4 150
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+from embedding_pipeline import BatchEmbedder
+from ingest_pipeline import IngestPipeline, print_report
+from pdf_text import extract_pages
+
+EMBED_LATENCY = 0.3
+WORDS = ("consumer complaint licensee supply tariff notice commission appeal penalty assessment "
+         "electricity charges meter reading deposit refund district order hearing").split()
+
+
+def make_pdf(path, pages, seed):
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    }))
+    section = 1
+    for p in range(pages):
+        lines = []
+        for i in range(48):
+            if i % 12 == 0:
+                lines.append(f"{(section - 1) % 500 + 1}. Rules for {WORDS[(seed + section) % len(WORDS)]}.- (1) The")
+                section += 1
+            else:
+                lines.append(" ".join(WORDS[(seed * 7 + p * 13 + i * 3 + k) % len(WORDS)] for k in range(12)) +
+                             ("." if i % 4 == 3 else ""))
+        ops = "BT /F1 9 Tf 11 TL 40 760 Td " + " ".join(f"({line}) Tj T*" for line in lines) + " ET"
+        stream = DecodedStreamObject()
+        stream.set_data(ops.encode("latin-1"))
+        page = writer.add_blank_page(612, 792)
+        page[NameObject("/Contents")] = writer._add_object(stream)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})
+        })
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+def fake_embed(texts):
+    time.sleep(EMBED_LATENCY)
+    return [[0.0] * 8 for _ in texts]
+
+
+def fixed_chunks(text, chunk_size=1000, overlap=100):
+    """The previous ingest.chunk_text."""
+    chunks, start = [], 0
+    while start < len(text):
+        end = min(start + chunk_size, len(text))
+        chunks.append(text[start:end].replace("\n", " "))
+        if end == len(text):
+            break
+        start += chunk_size - overlap
+    return chunks
+
+
+def before(files, embedder, write):
+    stats = {"pages": 0, "chunks": 0, "extract": 0.0, "embed": 0.0}
+    for name, path in files.items():
+        start = time.perf_counter()
+        pages = extract_pages(path)
+        text = ""
+        for page in pages:
+            text += page + "\n"
+        chunks = fixed_chunks(text)
+        stats["extract"] += time.perf_counter() - start
+        stats["pages"] += len(pages)
+        for i in range(0, len(chunks), 200):
+            batch = chunks[i:i + 200]
+            start = time.perf_counter()
+            vectors = embedder.embed(batch)
+            stats["embed"] += time.perf_counter() - start
+            write(batch, vectors, None, None)
+        stats["chunks"] += len(chunks)
+    return stats
+
+
+def measure(fn):
+    """Wall time of one run, then peak Python heap of a second (tracing slows pypdf down)."""
+    start = time.perf_counter()
+    result = fn()
+    wall = time.perf_counter() - start
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, wall, peak
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    pages = int(sys.argv[2]) if len(sys.argv) > 2 else 150
+    embedder = BatchEmbedder(embed_fn=fake_embed)
+    write = lambda documents, embeddings, metadatas, ids: None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {}
+        for i in range(count):
+            files[f"handbook_{i}.pdf"] = os.path.join(tmp, f"handbook_{i}.pdf")
+            make_pdf(files[f"handbook_{i}.pdf"], pages, i)
+        size = sum(os.path.getsize(p) for p in files.values()) / 1e6
+        print(f"{count} PDFs x {pages} pages ({size:.1f} MB), {os.cpu_count()} CPUs, "
+              f"embedding latency {EMBED_LATENCY}s/request\n")
+
+        stats, wall, peak = measure(lambda: before(files, embedder, write))
+        print(f"before: {wall:.2f}s wall, {stats['pages']} pages, {stats['chunks']} chunks, "
+              f"extract+chunk {stats['extract']:.2f}s, embed {stats['embed']:.2f}s, "
+              f"peak heap {peak / 1e6:.1f} MB")
+
+        report, wall, peak = measure(lambda: IngestPipeline(embed_fn=embedder.embed, write_fn=write).run(files))
+        print(f"after:  {wall:.2f}s wall, peak heap {peak / 1e6:.1f} MB (main process)")
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Load-test harness for /upload + /analyze and /tts against local stub backends.
+
+Gemini (vision, embeddings, generation) and Google TTS are replaced by
+in-process stubs that sleep for a realistic time, and the app runs in a
+temporary working directory with its own Chroma store. Requests are sent
+through httpx's ASGI transport, so the app and the clients share one event
+loop, exactly like uvicorn: any blocking call inside a handler stalls every
+other request.
+
+/analyze is measured end to end: submit the job, then poll /jobs/{id}
+until it is done. For comparison, a "blocking" variant (calling the
+pipeline directly inside the async handler, as originally) is mounted
+under /_blocking.
+
+Usage: python bench_load.py [concurrency levels...]   default: 1 10 100
+"""
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("GEMINI_API_KEY", "stub-key")
+os.environ.setdefault("JOB_WORKERS", "8")
+os.chdir(tempfile.mkdtemp(prefix="bench_load_"))
+
+VISION_SECONDS = 0.4
+EMBED_SECONDS = 0.05
+GENERATE_SECONDS = 0.6
+TTS_SECONDS = 0.3
+
+import gemini_client
+
+
+def stub_embed_texts(texts, task_type="retrieval_document", deadline=None):
+    time.sleep(EMBED_SECONDS)
+    return [[float(len(t) % 5), 1.0, float(t.count("e"))] for t in texts]
+
+
+def stub_process_document(file_path, mime_type):
+    time.sleep(VISION_SECONDS)
+    with open(file_path, "rb") as f:
+        tag = f.read().decode("utf-8", "ignore")
+    return f"Electricity bill {tag}. Section 135 theft of electricity. Amount due Rs 500."
+
+
+def stub_generate_explanation(doc_text, retrieved_context, language):
+    time.sleep(GENERATE_SECONDS)
+    return f"[{language}] This is an electricity bill."
+
+
+def stub_stream_speech(text, language_code="en-US"):
+    time.sleep(TTS_SECONDS)
+    yield b"ID3" + b"\0" * 4096
+
+
+gemini_client.embed_texts = stub_embed_texts
+import embedding_pipeline
+embedding_pipeline.embed_texts = stub_embed_texts
+import analysis_pipeline
+analysis_pipeline.process_document = stub_process_document
+analysis_pipeline.generate_explanation = stub_generate_explanation
+import tts_service
+tts_service.stream_speech = stub_stream_speech
+
+import httpx
+import seed_data
+import main
+from main import app, AnalyzeRequest
+from jobs import job_queue
+
+with contextlib.redirect_stdout(io.StringIO()):
+    seed_data.initialize_knowledge_base()
+
+
+@app.post("/_blocking/analyze")
+async def blocking_analyze(request: AnalyzeRequest):
+    """The old behaviour: blocking pipeline called directly in the event loop."""
+    file_path, _ = main.resolve_document(request.document_id, request.filename)
+    return analysis_pipeline.analyze_file(file_path, request.language)
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+async def upload_and_analyze(client, i, run_id, analyze_path):
+    # Unique content per request, so the analysis cache never short-circuits
+    name = f"bill_{run_id}_{i}.txt"
+    start = time.perf_counter()
+    r = await client.post("/upload", files={"file": (name, f"{run_id}-{i}".encode(), "text/plain")})
+    if r.status_code == 200:
+        r = await client.post(analyze_path, json={"document_id": r.json()["document_id"], "language": "Hindi"})
+    if r.status_code == 202:
+        job_url = r.json()["status_url"]
+        while True:
+            await asyncio.sleep(0.05)
+            job = (await client.get(job_url)).json()
+            if job["status"] in ("done", "failed"):
+                return (200 if job["status"] == "done" else 500), time.perf_counter() - start
+    return r.status_code, time.perf_counter() - start
+
+
+async def tts_request(client, i, run_id, _):
+    start = time.perf_counter()
+    r = await client.post("/tts", json={"text": f"Hello {run_id} {i}", "language": "English"})
+    return r.status_code, time.perf_counter() - start
+
+
+async def run_level(scenario, concurrency, run_id, path=None):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+        start = time.perf_counter()
+        results = await asyncio.gather(*[scenario(client, i, run_id, path) for i in range(concurrency)])
+        wall = time.perf_counter() - start
+    ok = [latency for status, latency in results if status == 200]
+    busy = sum(1 for status, _ in results if status == 503)
+    return {
+        "ok": len(ok),
+        "busy": busy,
+        "throughput": len(ok) / wall,
+        "p50": percentile(ok, 50) if ok else float("nan"),
+        "p99": percentile(ok, 99) if ok else float("nan"),
+    }
+
+
+async def main_async(levels):
+    print(f"{'scenario':<22}{'conc':>6}{'ok':>6}{'503':>6}{'req/s':>9}{'p50 s':>9}{'p99 s':>9}")
+    scenarios = [
+        ("analyze (blocking)", upload_and_analyze, "/_blocking/analyze"),
+        ("analyze (jobs)", upload_and_analyze, "/analyze"),
+        ("tts (executor)", tts_request, None),
+    ]
+    for run, (label, scenario, path) in enumerate(scenarios):
+        for concurrency in levels:
+            if label.endswith("(blocking)") and concurrency > 10:
+                print(f"{label:<22}{concurrency:>6}   (skipped: serial, would take ~{concurrency * (VISION_SECONDS + GENERATE_SECONDS):.0f}s)")
+                continue
+            # Silence the pipeline's progress prints while measuring
+            with contextlib.redirect_stdout(io.StringIO()):
+                stats = await run_level(scenario, concurrency, f"r{run}c{concurrency}", path)
+            print(f"{label:<22}{concurrency:>6}{stats['ok']:>6}{stats['busy']:>6}"
+                  f"{stats['throughput']:>9.1f}{stats['p50']:>9.2f}{stats['p99']:>9.2f}")
+
+
+if __name__ == "__main__":
+    levels = [int(a) for a in sys.argv[1:]] or [1, 10, 100]
+    job_queue.start()
+    try:
+        asyncio.run(main_async(levels))
+    finally:
+        job_queue.stop()
@@ -0,0 +1,61 @@
+"""
+Benchmark for server-side image preprocessing (image_preprocess.py).
+
+Generates synthetic "phone photos" of documents: an A4 page of text,
+perspective-warped onto a 4000x3000 background, with a shadow gradient,
+sensor noise and mild blur, saved as high-quality JPEG and as PNG (the two
+formats phones and screenshots produce). For each photo it reports the
+bytes that would be uploaded to Gemini and the end-to-end time of
+preprocessing + upload at a given uplink speed, before and after.
+
+Usage: python bench_preprocess.py [photos] [uplink Mbit/s]   default: 6 20
+"""
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from image_preprocess import find_document_corners, preprocess_image
+from test_image_preprocess import make_photo # The synthetic photos the tests use
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+    mbps = float(sys.argv[2]) if len(sys.argv) > 2 else 20.0
+    upload_seconds = lambda size: size * 8 / (mbps * 1e6)
+    rng = np.random.default_rng(7)
+
+    print(f"{'photo':<10}{'page found':>11}{'before KB':>11}{'after KB':>10}{'prep ms':>9}"
+          f"{'before s':>10}{'after s':>9}")
+    totals = [0, 0, 0.0, 0.0]
+    for i in range(count):
+        photo = make_photo(rng)
+        fmt = ".png" if i % 3 == 2 else ".jpg"
+        params = [cv2.IMWRITE_JPEG_QUALITY, 95] if fmt == ".jpg" else []
+        data = cv2.imencode(fmt, photo, params)[1].tobytes()
+
+        start = time.perf_counter()
+        prepared, _ = preprocess_image(data)
+        prep = time.perf_counter() - start
+
+        found = find_document_corners(photo) is not None
+        before = upload_seconds(len(data))
+        after = prep + upload_seconds(len(prepared))
+        totals[0] += len(data)
+        totals[1] += len(prepared)
+        totals[2] += before
+        totals[3] += after
+        print(f"{i}{fmt:<9}{str(found):>11}{len(data) / 1024:>11.0f}{len(prepared) / 1024:>10.0f}"
+              f"{prep * 1000:>9.0f}{before:>10.2f}{after:>9.2f}")
+
+    print(f"{'total':<10}{'':>11}{totals[0] / 1024:>11.0f}{totals[1] / 1024:>10.0f}{'':>9}"
+          f"{totals[2]:>10.2f}{totals[3]:>9.2f}")
+    print(f"Uploaded bytes: -{100 * (1 - totals[1] / totals[0]):.0f}%, "
+          f"preprocess + upload at {mbps:g} Mbit/s: {totals[2]:.2f}s -> {totals[3]:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark for server start-up: time from launching uvicorn to the first
+successful response.
+
+Seeds a knowledge base of DOCS synthetic chunks (random 8-dimensional
+embeddings, so no API calls) in a temporary working directory, then starts
+`uvicorn main:app` there RUNS times and polls until
+- `GET /` answers (liveness: the server accepts requests), and
+- `GET /ready` returns 200 (the retrieval index is loaded); without that
+  endpoint, ready is the first response.
+Runs once with the persisted BM25 index removed (rebuilt from the whole
+corpus) and once with it in place.
+
+Usage: python bench_startup.py [docs] [runs]   default: 20000 3
+"""
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+PORT = 8765
+WORDS = ("consumer complaint licensee supply tariff notice commission appeal penalty assessment "
+         "electricity charges meter reading deposit refund district order hearing section act").split()
+
+
+def seed(workdir: str, docs: int):
+    import chromadb
+    client = chromadb.PersistentClient(path=os.path.join(workdir, "db_storage"))
+    collection = client.get_or_create_collection(name="legal_knowledge_base", metadata={"hnsw:space": "cosine"})
+    rng = random.Random(7)
+    for start in range(0, docs, 5000):
+        ids = [f"doc_{i}" for i in range(start, min(start + 5000, docs))]
+        collection.add(
+            ids=ids,
+            documents=[" ".join(rng.choice(WORDS) for _ in range(120)) for _ in ids],
+            embeddings=[[rng.random() for _ in range(8)] for _ in ids],
+            metadatas=[{"source": "bench"} for _ in ids],
+        )
+
+
+def get(path: str):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{PORT}{path}", timeout=1) as response:
+            return response.status, json.loads(response.read() or b"null")
+    except urllib.error.HTTPError as e:
+        return e.code, None
+    except (urllib.error.URLError, ConnectionError, TimeoutError):
+        return None, None
+
+
+def start_once(workdir: str) -> dict:
+    env = dict(os.environ, GEMINI_API_KEY=os.environ.get("GEMINI_API_KEY", "bench"), CLIENT_WARMUP="0")
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", BACKEND_DIR, "--port", str(PORT),
+         "--log-level", "warning"],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    live = ready = None
+    try:
+        while time.perf_counter() - start < 120:
+            if live is None:
+                status, _ = get("/")
+                if status == 200:
+                    live = time.perf_counter() - start
+            if live is not None:
+                status, body = get("/ready")
+                if status == 404: # No readiness endpoint: ready once it answers
+                    ready = live
+                elif status == 200:
+                    ready = time.perf_counter() - start
+            if ready is not None:
+                break
+            time.sleep(0.01 if live is None else 0.1) # Light readiness polling, like a probe
+    finally:
+        server.terminate()
+        server.wait()
+    return {"live": live, "ready": ready}
+
+
+def main():
+    docs = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    workdir = tempfile.mkdtemp(prefix="bench_startup_")
+    try:
+        seed(workdir, docs)
+        print(f"{docs} documents in the knowledge base\n")
+        print(f"{'BM25 index':<14}{'run':>4}{'first response s':>18}{'ready s':>10}")
+        for label in ("rebuilt", "persisted"):
+            for run in range(runs):
+                if label == "rebuilt":
+                    index = os.path.join(workdir, "db_storage", "bm25.idx")
+                    if os.path.exists(index):
+                        os.remove(index)
+                result = start_once(workdir)
+                fmt = lambda v: f"{v:.2f}" if v is not None else "timeout"
+                print(f"{label:<14}{run + 1:>4}{fmt(result['live']):>18}{fmt(result['ready']):>10}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
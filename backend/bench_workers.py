@@ -0,0 +1,137 @@
+"""
+Benchmark for multi-worker serving: memory per uvicorn worker once the
+retrieval service is ready.
+
+Seeds a knowledge base of DOCS synthetic chunks (Zipf-distributed words
+from a 50k vocabulary, like bench_bm25_startup.py; random 8-dimensional
+embeddings, so no API calls) in a temporary working directory, then starts
+`uvicorn main:app --workers N` for N in 1, 4, 8 and waits until every
+worker has logged that the RAG service is ready:
+- cold:      no persisted BM25 index (the workers start together and must
+             build it)
+- persisted: the index saved by the cold run is opened
+Per worker it reports RSS, PSS (shared pages divided among the processes
+mapping them) and USS (pages private to the worker), from
+/proc/<pid>/smaps_rollup, plus the time until all workers were ready.
+
+Usage: python bench_workers.py [docs] [workers ...]   default: 100000 1 4 8
+"""
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from bench_bm25_startup import make_corpus
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+PORT = 8766
+READY_LINE = "Service 'rag' ready"
+
+
+def seed(workdir: str, docs: int):
+    import chromadb
+    client = chromadb.PersistentClient(path=os.path.join(workdir, "db_storage"))
+    collection = client.get_or_create_collection(name="legal_knowledge_base", metadata={"hnsw:space": "cosine"})
+    ids, texts = make_corpus(docs)
+    rng = random.Random(7)
+    for start in range(0, docs, 5000):
+        collection.add(
+            ids=ids[start:start + 5000],
+            documents=texts[start:start + 5000],
+            embeddings=[[rng.random() for _ in range(8)] for _ in ids[start:start + 5000]],
+            metadatas=[{"source": "bench"} for _ in ids[start:start + 5000]],
+        )
+
+
+def memory(pid: int) -> dict:
+    """RSS, PSS and USS of a process in MB."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "rss": fields["Rss"],
+        "pss": fields["Pss"],
+        "uss": fields["Private_Clean"] + fields["Private_Dirty"],
+    }
+
+
+def worker_pids(server_pid: int, workers: int) -> list:
+    """uvicorn runs a single worker in-process, several as spawned children."""
+    if workers == 1:
+        return [server_pid]
+    pids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            with open(f"/proc/{entry}/cmdline", "rb") as f:
+                cmdline = f.read()
+        except OSError:
+            continue
+        if ppid == server_pid and b"spawn_main" in cmdline:
+            pids.append(int(entry))
+    return pids
+
+
+def run(workdir: str, workers: int) -> dict:
+    env = dict(os.environ, GEMINI_API_KEY=os.environ.get("GEMINI_API_KEY", "bench"), CLIENT_WARMUP="0",
+               PYTHONUNBUFFERED="1")
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", BACKEND_DIR, "--port", str(PORT),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=workdir, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+    )
+    ready = threading.Semaphore(0)
+
+    def read_log():
+        for line in server.stdout:
+            if READY_LINE in line:
+                ready.release()
+
+    threading.Thread(target=read_log, daemon=True).start()
+    try:
+        for _ in range(workers):
+            if not ready.acquire(timeout=600):
+                raise TimeoutError("workers did not become ready")
+        seconds = time.perf_counter() - start
+        time.sleep(1) # Let start-up garbage settle
+        samples = [memory(pid) for pid in worker_pids(server.pid, workers)]
+    finally:
+        server.terminate()
+        server.wait()
+    mean = {key: sum(s[key] for s in samples) / len(samples) for key in ("rss", "pss", "uss")}
+    return {"seconds": seconds, "workers": len(samples), **mean}
+
+
+def main():
+    docs = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    counts = [int(arg) for arg in sys.argv[2:]] or [1, 4, 8]
+    workdir = tempfile.mkdtemp(prefix="bench_workers_")
+    index = os.path.join(workdir, "db_storage", "bm25.idx")
+    try:
+        seed(workdir, docs)
+        print(f"{docs} documents in the knowledge base, {os.cpu_count()} CPUs\n")
+        print(f"{'BM25 index':<11}{'workers':>8}{'ready s':>9}{'RSS MB':>9}{'PSS MB':>9}{'USS MB':>9}   (per worker)")
+        for workers in counts:
+            for label in ("cold", "persisted"):
+                if label == "cold" and os.path.exists(index):
+                    os.remove(index)
+                result = run(workdir, workers)
+                print(f"{label:<11}{workers:>8}{result['seconds']:>9.2f}{result['rss']:>9.1f}"
+                      f"{result['pss']:>9.1f}{result['uss']:>9.1f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
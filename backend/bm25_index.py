@@ -0,0 +1,587 @@
+import hashlib
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from mapped_file import map_sections, read_header, write_sections
+from string_table import StringTable
+
+# --- On-disk format ---
+# A mapped_file section file. The header records the format version, BM25
+# parameters, the corpus fingerprint and the section layout.
+# Sections are memory-mapped on load and used in place (terms and document
+# IDs as StringTables), so opening an index reads little more than the
+# header, and every process serving the same file shares one copy of it.
+INDEX_MAGIC = b"BM25IDX\0"
+FORMAT_VERSION = 3
+_MAX_TF = np.iinfo(np.uint16).max # Term frequencies are stored as uint16 (clamped)
+
+# Queries whose posting lists cover more than this share of the corpus are
+# scored densely (one pass + argpartition) instead of with MaxScore pruning.
+DENSE_QUERY_RATIO = 0.3
+
+_ARRAY_SECTIONS = {
+    "doc_len": np.int32,
+    "df": np.int32,
+    "max_tf": np.uint32,
+    "min_dl": np.int32,
+    "post_offsets": np.int64,
+    "post_slots": np.uint32,
+    "post_tfs": np.uint16,
+    "fwd_offsets": np.int64,
+    "fwd_terms": np.uint32,
+    "fwd_tfs": np.uint16,
+}
+_STRING_TABLES = ("terms", "doc_ids")
+
+
+def corpus_fingerprint(doc_ids: Iterable[str]) -> str:
+    """
+    Cheap, order-independent fingerprint of a document collection:
+    the document count plus a hash of the sorted IDs.
+    """
+    ids = sorted(doc_ids)
+    digest = hashlib.sha256("\n".join(ids).encode("utf-8")).hexdigest()
+    return f"{len(ids)}:{digest}"
+
+
+class BM25Index:
+    """
+    Incremental Okapi BM25 inverted index.
+
+    Scores are identical to `rank_bm25.BM25Okapi` built from scratch over the
+    live documents (same k1 / b / epsilon and the same negative-IDF flooring),
+    but documents can be added, updated and removed in time proportional to
+    the changed documents instead of rebuilding the whole index.
+
+    Layout:
+    - Each document occupies an integer slot. Slots are assigned in insertion
+      order and never reused, so every posting list stays sorted by slot.
+    - A compact, read-only base segment (CSR arrays, memory-mapped when loaded
+      from disk) holds the documents present at load/compaction time, with
+      its terms and document IDs in StringTables and its statistics arrays
+      used in place until the first change copies them.
+      Documents added afterwards go to small append-only tail postings.
+    - Removing a document only tombstones its slot and decrements the
+      document frequencies of its terms (via the forward index).
+    - Corpus statistics (live doc count, total length, df per term) are kept
+      up to date on every change; the IDF vector is derived lazily from them.
+    - `compact()` folds the tail and drops tombstones into a fresh base segment.
+    - Per-term max tf and min doc length give score upper bounds, which
+      `top_n` uses for MaxScore pruning (see `_top_n_maxscore`).
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25):
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+        self.fingerprint = None
+        self.meta = {}
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        # Slot tables: base slots [0, _num_base) are named by _base_ids,
+        # slots added since by _tail_ids / _slot_of
+        self._base_ids: Optional[StringTable] = None
+        self._tail_ids: List[Optional[str]] = []
+        self._slot_of: Dict[str, int] = {}
+        self._doc_len = array('i')
+        self._live = bytearray()
+        # Base segment (CSR arrays) covering slots [0, _num_base)
+        self._base: Optional[Dict[str, np.ndarray]] = None
+        self._num_base = 0
+        # Term tables: base terms [0, _num_base_terms), then _vocab for terms added since
+        self._base_terms: Optional[StringTable] = None
+        self._num_base_terms = 0
+        self._vocab: Dict[str, int] = {}
+        self._df = array('i')
+        self._max_tf = array('I')
+        self._min_dl = array('i')
+        # Tail segment: term_id -> (slots, tfs) and slot -> (term_ids, tfs)
+        self._tail_post: Dict[int, Tuple[array, array]] = {}
+        self._tail_fwd: Dict[int, Tuple[array, array]] = {}
+        # Running corpus statistics
+        self.num_docs = 0
+        self.total_len = 0
+        self._num_dead = 0
+        self._version = 0
+        self._idf_cache = (-1, None)
+
+    # --- Introspection ---
+
+    def __len__(self) -> int:
+        return self.num_docs
+
+    def __contains__(self, doc_id: str) -> bool:
+        return self.slot_of(doc_id) is not None
+
+    @property
+    def avgdl(self) -> float:
+        return self.total_len / self.num_docs if self.num_docs else 0.0
+
+    @property
+    def _num_slots(self) -> int:
+        return self._num_base + len(self._tail_ids)
+
+    def slot_of(self, doc_id: str) -> Optional[int]:
+        """Slot of a live document, or None."""
+        with self._lock:
+            slot = self._slot_of.get(doc_id)
+            if slot is None and self._base_ids is not None:
+                slot = self._base_ids.find(doc_id)
+                if slot is not None and not self._live[slot]:
+                    slot = None # Removed (or replaced by a tail slot)
+            return slot
+
+    def doc_id(self, slot: int) -> Optional[str]:
+        """ID of the document in `slot` (None if it was removed)."""
+        if slot < self._num_base:
+            return self._base_ids[slot] if self._live[slot] else None
+        return self._tail_ids[slot - self._num_base]
+
+    def live_doc_ids(self) -> List[str]:
+        """IDs of the live documents, in slot order."""
+        with self._lock:
+            ids = (self._base_ids.tolist() if self._base_ids is not None else []) + self._tail_ids
+            return [ids[slot] for slot in self.live_slots().tolist()]
+
+    def _term_id(self, term: str) -> Optional[int]:
+        term_id = self._vocab.get(term)
+        if term_id is None and self._base_terms is not None:
+            term_id = self._base_terms.find(term)
+        return term_id
+
+    def _make_writable(self):
+        """Copies the statistics arrays out of the (read-only) base segment before a change."""
+        if isinstance(self._df, np.ndarray):
+            self._doc_len = array('i', np.ascontiguousarray(self._doc_len, dtype=np.int32).tobytes())
+            self._df = array('i', np.ascontiguousarray(self._df, dtype=np.int32).tobytes())
+            self._max_tf = array('I', np.ascontiguousarray(self._max_tf, dtype=np.uint32).tobytes())
+            self._min_dl = array('i', np.ascontiguousarray(self._min_dl, dtype=np.int32).tobytes())
+
+    # --- Mutation ---
+
+    def add(self, doc_id: str, tokens: List[str]):
+        """Adds a document, replacing any existing document with the same ID."""
+        with self._lock:
+            self._make_writable()
+            if self.slot_of(doc_id) is not None:
+                self._remove_locked(doc_id)
+            self._add_locked(doc_id, tokens)
+            self._version += 1
+
+    def add_many(self, doc_ids: Iterable[str], token_lists: Iterable[List[str]]):
+        """Adds (or replaces) several documents at once."""
+        with self._lock:
+            self._make_writable()
+            for doc_id, tokens in zip(doc_ids, token_lists):
+                if self.slot_of(doc_id) is not None:
+                    self._remove_locked(doc_id)
+                self._add_locked(doc_id, tokens)
+            self._version += 1
+            self._maybe_compact()
+
+    def update(self, doc_id: str, tokens: List[str]):
+        """Re-indexes an existing document with new content."""
+        self.add(doc_id, tokens)
+
+    def remove(self, doc_id: str) -> bool:
+        """Removes a document. Returns False if it was not indexed."""
+        with self._lock:
+            if self.slot_of(doc_id) is None:
+                return False
+            self._make_writable()
+            self._remove_locked(doc_id)
+            self._version += 1
+            self._maybe_compact()
+            return True
+
+    def _add_locked(self, doc_id: str, tokens: List[str]):
+        slot = self._num_slots
+        frequencies: Dict[str, int] = {}
+        for token in tokens:
+            frequencies[token] = frequencies.get(token, 0) + 1
+
+        term_ids = array('I')
+        tfs = array('I')
+        for term, tf in frequencies.items():
+            term_id = self._term_id(term)
+            if term_id is None:
+                term_id = len(self._df)
+                self._vocab[term] = term_id
+                self._df.append(0)
+                self._max_tf.append(0)
+                self._min_dl.append(len(tokens))
+            postings = self._tail_post.get(term_id)
+            if postings is None:
+                postings = self._tail_post[term_id] = (array('I'), array('I'))
+            self._df[term_id] += 1
+            # Upper-bound statistics only widen; removals leave them valid
+            if tf > self._max_tf[term_id]:
+                self._max_tf[term_id] = tf
+            if len(tokens) < self._min_dl[term_id]:
+                self._min_dl[term_id] = len(tokens)
+            postings[0].append(slot)
+            postings[1].append(tf)
+            term_ids.append(term_id)
+            tfs.append(tf)
+
+        self._tail_ids.append(doc_id)
+        self._slot_of[doc_id] = slot
+        self._doc_len.append(len(tokens))
+        self._live.append(1)
+        self._tail_fwd[slot] = (term_ids, tfs)
+        self.num_docs += 1
+        self.total_len += len(tokens)
+
+    def _remove_locked(self, doc_id: str):
+        slot = self.slot_of(doc_id)
+        term_ids, _ = self._forward(slot)
+        for term_id in term_ids.tolist():
+            self._df[term_id] -= 1
+        if slot >= self._num_base:
+            del self._slot_of[doc_id]
+            self._tail_ids[slot - self._num_base] = None
+        self._tail_fwd.pop(slot, None)
+        self._live[slot] = 0
+        self.num_docs -= 1
+        self.total_len -= self._doc_len[slot]
+        self._num_dead += 1
+
+    def _maybe_compact(self):
+        if self._num_dead > 1000 and self._num_dead > self.num_docs:
+            self.compact()
+
+    def compact(self):
+        """Rebuilds the index as a single base segment without tombstones."""
+        with self._lock:
+            if not self._num_dead and not self._tail_fwd:
+                return
+            arrays, terms, doc_ids = self._export_arrays()
+            self._load_arrays(arrays, StringTable.from_strings(terms), StringTable.from_strings(doc_ids))
+            self._version += 1
+
+    # --- Segment access ---
+
+    def _forward(self, slot: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(term_ids, tfs) of the document in `slot`."""
+        if slot < self._num_base:
+            base = self._base
+            start, end = base["fwd_offsets"][slot], base["fwd_offsets"][slot + 1]
+            return base["fwd_terms"][start:end], base["fwd_tfs"][start:end]
+        term_ids, tfs = self._tail_fwd.get(slot, (array('I'), array('I')))
+        return np.frombuffer(term_ids, dtype=np.uint32), np.frombuffer(tfs, dtype=np.uint32)
+
+    def _postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(slots, tfs) of every document containing `term_id`, sorted by slot."""
+        parts_slots, parts_tfs = [], []
+        base = self._base
+        if base is not None and term_id + 1 < len(base["post_offsets"]):
+            start, end = base["post_offsets"][term_id], base["post_offsets"][term_id + 1]
+            if end > start:
+                parts_slots.append(base["post_slots"][start:end])
+                parts_tfs.append(base["post_tfs"][start:end])
+        tail = self._tail_post.get(term_id)
+        if tail is not None:
+            parts_slots.append(np.frombuffer(tail[0], dtype=np.uint32))
+            parts_tfs.append(np.frombuffer(tail[1], dtype=np.uint32))
+        if not parts_slots:
+            return np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.uint32)
+        if len(parts_slots) == 1:
+            return parts_slots[0], parts_tfs[0]
+        return np.concatenate(parts_slots), np.concatenate(parts_tfs)
+
+    def _export_arrays(self):
+        """
+        Builds compact CSR arrays for the live documents: slots renumbered
+        densely, unused terms dropped, postings grouped by term.
+        """
+        live_slots = self.live_slots().tolist()
+        doc_ids = self.live_doc_ids()
+
+        term_parts, tf_parts = [], []
+        for slot in live_slots:
+            term_ids, tfs = self._forward(slot)
+            term_parts.append(term_ids)
+            tf_parts.append(tfs)
+        lengths = np.array([len(part) for part in term_parts], dtype=np.int64)
+        old_terms = np.concatenate(term_parts) if term_parts else np.empty(0, dtype=np.uint32)
+        fwd_tfs = np.concatenate(tf_parts) if tf_parts else np.empty(0, dtype=np.uint32)
+
+        # Drop terms that no live document uses and renumber the rest
+        df = np.frombuffer(self._df, dtype=np.int32)
+        keep = df > 0
+        remap = np.cumsum(keep) - 1
+        all_terms = (self._base_terms.tolist() if self._base_terms is not None else []) + list(self._vocab)
+        terms = [term for term, kept in zip(all_terms, keep.tolist()) if kept]
+        fwd_terms = remap[old_terms].astype(np.uint32)
+
+        # Invert the forward index; a stable sort keeps postings ordered by slot
+        doc_of_entry = np.repeat(np.arange(len(live_slots), dtype=np.uint32), lengths)
+        order = np.argsort(fwd_terms, kind='stable')
+        counts = np.bincount(fwd_terms, minlength=len(terms)).astype(np.int64)
+        post_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        post_slots = doc_of_entry[order]
+        post_tfs = fwd_tfs[order]
+        doc_len = np.frombuffer(self._doc_len, dtype=np.int32)[live_slots]
+        if len(post_slots):
+            max_tf = np.maximum.reduceat(post_tfs, post_offsets[:-1])
+            min_dl = np.minimum.reduceat(doc_len[post_slots], post_offsets[:-1])
+        else:
+            max_tf = min_dl = np.empty(0)
+
+        arrays = {
+            "doc_len": doc_len,
+            "df": counts.astype(np.int32),
+            "max_tf": max_tf.astype(np.uint32),
+            "min_dl": min_dl.astype(np.int32),
+            "post_offsets": post_offsets,
+            "post_slots": post_slots,
+            "post_tfs": np.minimum(post_tfs, _MAX_TF).astype(np.uint16),
+            "fwd_offsets": np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64),
+            "fwd_terms": fwd_terms,
+            "fwd_tfs": np.minimum(fwd_tfs, _MAX_TF).astype(np.uint16),
+        }
+        return arrays, terms, doc_ids
+
+    def _load_arrays(self, arrays: Dict[str, np.ndarray], terms: StringTable, doc_ids: StringTable):
+        """Replaces the index contents with a base segment built from CSR arrays."""
+        self._reset()
+        self._base = arrays
+        self._num_base = len(doc_ids)
+        self._base_ids = doc_ids
+        self._base_terms = terms
+        self._num_base_terms = len(terms)
+        # Used in place (possibly memory-mapped) until _make_writable()
+        self._doc_len = arrays["doc_len"]
+        self._df = arrays["df"]
+        self._max_tf = arrays["max_tf"]
+        self._min_dl = arrays["min_dl"]
+        self._live = bytearray(b"\x01") * len(doc_ids)
+        self.num_docs = len(doc_ids)
+        self.total_len = int(np.asarray(arrays["doc_len"], dtype=np.int64).sum())
+
+    # --- Persistence ---
+
+    def save(self, path: str, fingerprint: Optional[str] = None, meta: Optional[Dict] = None):
+        """
+        Writes a compacted copy of the index to `path` atomically
+        (temp file + rename), tagged with the corpus fingerprint.
+        """
+        with self._lock:
+            arrays, terms, doc_ids = self._export_arrays()
+            params = {"k1": self.k1, "b": self.b, "epsilon": self.epsilon}
+
+        sections = {}
+        for name, strings in zip(_STRING_TABLES, (terms, doc_ids)):
+            sections.update(StringTable.sections(name, strings))
+        for name, dtype in _ARRAY_SECTIONS.items():
+            sections[name] = arrays[name].astype(dtype)
+        header = {
+            "format_version": FORMAT_VERSION,
+            "params": params,
+            "fingerprint": fingerprint,
+            "num_docs": len(doc_ids),
+            "num_terms": len(terms),
+            "meta": meta or {},
+        }
+        write_sections(path, INDEX_MAGIC, header, sections)
+
+    @staticmethod
+    def read_header(path: str) -> Dict:
+        """Reads only the JSON header of a saved index. Raises ValueError if invalid."""
+        header = read_header(path, INDEX_MAGIC, "BM25 index")
+        if header.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported BM25 index format version {header.get('format_version')}.")
+        return header
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "BM25Index":
+        """
+        Opens an index written by `save()`. Sections are memory-mapped
+        (read-only) unless `mmap` is False: the index is shared with other
+        processes opening the file, and only the pages a query touches are
+        read. New documents go to the tail segment.
+        """
+        header = cls.read_header(path)
+        index = cls(**header["params"])
+        sections = map_sections(path, header, mmap)
+        arrays = {name: sections[name] for name in _ARRAY_SECTIONS}
+        terms, doc_ids = (StringTable.from_sections(name, sections) for name in _STRING_TABLES)
+        with index._lock:
+            index._load_arrays(arrays, terms, doc_ids)
+        index.fingerprint = header.get("fingerprint")
+        index.meta = header.get("meta", {})
+        return index
+
+    # --- Scoring ---
+
+    def _idf_vector(self) -> np.ndarray:
+        """
+        Per-term IDF matching BM25Okapi: log((N - df + 0.5) / (df + 0.5)),
+        with negative values floored to epsilon * average IDF over the vocabulary.
+        """
+        version, idf = self._idf_cache
+        if version == self._version:
+            return idf
+
+        df = np.frombuffer(self._df, dtype=np.int32).astype(np.float64)
+        present = df > 0
+        idf = np.zeros_like(df)
+        idf[present] = np.log(self.num_docs - df[present] + 0.5) - np.log(df[present] + 0.5)
+        if present.any():
+            eps = self.epsilon * (idf[present].sum() / present.sum())
+            idf[present & (idf < 0)] = eps
+        self._idf_cache = (self._version, idf)
+        return idf
+
+    def get_scores(self, query_tokens: List[str]) -> np.ndarray:
+        """
+        Returns BM25 scores for every slot (tombstoned slots score 0).
+        Use `live_slots()` to map the array back to document IDs.
+        """
+        with self._lock:
+            scores = np.zeros(self._num_slots)
+            if not self.num_docs or not self.total_len:
+                return scores
+
+            idf = self._idf_vector()
+            doc_len = np.frombuffer(self._doc_len, dtype=np.int32)
+            live = np.frombuffer(self._live, dtype=np.uint8)
+            k1, b = self.k1, self.b
+            norm = k1 * (1 - b + b * doc_len / self.avgdl)
+
+            for token in query_tokens:
+                term_id = self._term_id(token)
+                if term_id is None or self._df[term_id] == 0:
+                    continue
+                slots, tfs = self._postings(term_id)
+                tfs = tfs.astype(np.float64)
+                contribution = idf[term_id] * (tfs * (k1 + 1)) / (tfs + norm[slots])
+                scores[slots] += contribution * live[slots]
+            return scores
+
+    def live_slots(self) -> np.ndarray:
+        """Slot numbers of live documents, in insertion order."""
+        with self._lock:
+            return np.flatnonzero(np.frombuffer(self._live, dtype=np.uint8))
+
+    def top_n(self, query_tokens: List[str], n: int) -> List[Tuple[str, float]]:
+        """
+        Returns the `n` best (doc_id, score) pairs, highest first, among
+        documents matching at least one query term. Ties keep insertion order,
+        like a stable sort over BM25Okapi scores.
+
+        Only the posting lists of the query terms are read. Sparse queries use
+        MaxScore pruning; dense ones (or ones with negative IDF weights, where
+        the bounds do not hold) fall back to a single scoring pass + argpartition.
+        """
+        with self._lock:
+            if n <= 0 or not self.num_docs or not self.total_len:
+                return []
+
+            idf = self._idf_vector()
+            weights: Dict[int, float] = {}
+            for token in query_tokens:
+                term_id = self._term_id(token)
+                if term_id is not None and self._df[term_id] > 0:
+                    # Repeated query terms count once per occurrence, as in BM25Okapi
+                    weights[term_id] = weights.get(term_id, 0.0) + idf[term_id]
+            if not weights:
+                return []
+
+            total_postings = sum(self._df[term_id] for term_id in weights)
+            dense = total_postings > DENSE_QUERY_RATIO * self.num_docs
+            if dense or min(weights.values()) < 0:
+                slots, scores = self._top_n_dense(weights, n)
+            else:
+                slots, scores = self._top_n_maxscore(weights, n)
+            return [(self.doc_id(slot), float(score)) for slot, score in zip(slots.tolist(), scores.tolist())]
+
+    def _term_contributions(self, term_id: int, weight: float, slots: np.ndarray, tfs: np.ndarray) -> np.ndarray:
+        """weight * BM25 term saturation for the given postings."""
+        k1, b = self.k1, self.b
+        doc_len = np.frombuffer(self._doc_len, dtype=np.int32)
+        tfs = tfs.astype(np.float64)
+        norm = k1 * (1 - b + b * doc_len[slots] / self.avgdl)
+        return weight * (tfs * (k1 + 1)) / (tfs + norm)
+
+    def _upper_bound(self, term_id: int, weight: float) -> float:
+        """Largest contribution `term_id` can make to any document's score."""
+        k1, b = self.k1, self.b
+        max_tf = float(self._max_tf[term_id])
+        norm = k1 * (1 - b + b * self._min_dl[term_id] / self.avgdl)
+        return weight * (max_tf * (k1 + 1)) / (max_tf + norm)
+
+    def _live_mask(self, slots: np.ndarray) -> np.ndarray:
+        return np.frombuffer(self._live, dtype=np.uint8)[slots].astype(bool)
+
+    @staticmethod
+    def _select_top(slots: np.ndarray, scores: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top `n` by score (ties -> lower slot first), via argpartition."""
+        if len(scores) > n:
+            # Keep everything tied with the n-th score so tie-breaking stays exact
+            kth = np.partition(scores, len(scores) - n)[len(scores) - n]
+            keep = scores >= kth
+            slots, scores = slots[keep], scores[keep]
+        order = np.lexsort((slots, -scores))[:n]
+        return slots[order], scores[order]
+
+    def _top_n_dense(self, weights: Dict[int, float], n: int) -> Tuple[np.ndarray, np.ndarray]:
+        scores = np.zeros(self._num_slots)
+        matched = np.zeros(self._num_slots, dtype=bool)
+        for term_id, weight in weights.items():
+            slots, tfs = self._postings(term_id)
+            scores[slots] += self._term_contributions(term_id, weight, slots, tfs)
+            matched[slots] = True
+        matched &= np.frombuffer(self._live, dtype=np.uint8).astype(bool)
+        candidates = np.flatnonzero(matched)
+        return self._select_top(candidates, scores[candidates], n)
+
+    def _top_n_maxscore(self, weights: Dict[int, float], n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Term-at-a-time MaxScore. Terms are processed in decreasing order of
+        their score upper bound. While the bounds of the remaining terms can
+        still lift an unseen document above the current n-th best score
+        (theta), a term is "essential" and its whole posting list is merged.
+        After that, remaining terms are only looked up (binary search in the
+        slot-sorted postings) for candidates that can still reach theta.
+        """
+        terms = sorted(weights, key=lambda t: self._upper_bound(t, weights[t]), reverse=True)
+        bounds = [self._upper_bound(t, weights[t]) for t in terms]
+        remaining = np.cumsum(bounds[::-1])[::-1].tolist() + [0.0]
+
+        cand_slots = np.empty(0, dtype=np.int64)
+        cand_scores = np.empty(0)
+        theta = -np.inf
+
+        for i, term_id in enumerate(terms):
+            slots, tfs = self._postings(term_id)
+
+            if remaining[i] >= theta:
+                # Essential: unseen documents can still make the top n
+                contrib = self._term_contributions(term_id, weights[term_id], slots, tfs)
+                merged_slots = np.concatenate([cand_slots, slots.astype(np.int64)])
+                merged_scores = np.concatenate([cand_scores, contrib])
+                cand_slots, inverse = np.unique(merged_slots, return_inverse=True)
+                cand_scores = np.bincount(inverse, weights=merged_scores, minlength=len(cand_slots))
+            else:
+                # Non-essential: score only candidates that can still reach theta
+                alive = cand_scores + remaining[i] >= theta
+                cand_slots, cand_scores = cand_slots[alive], cand_scores[alive]
+                pos = np.minimum(np.searchsorted(slots, cand_slots), len(slots) - 1)
+                found = slots[pos] == cand_slots
+                if found.any():
+                    hit = pos[found]
+                    cand_scores[found] += self._term_contributions(term_id, weights[term_id], slots[hit], tfs[hit])
+
+            live = self._live_mask(cand_slots)
+            if live.sum() >= n:
+                live_scores = cand_scores[live]
+                theta = np.partition(live_scores, len(live_scores) - n)[len(live_scores) - n]
+
+        live = self._live_mask(cand_slots)
+        return self._select_top(cand_slots[live], cand_scores[live], n)
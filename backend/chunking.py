@@ -0,0 +1,242 @@
+import os
+import re
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# --- Configuration ---
+CHUNK_TOKENS = int(os.environ.get("CHUNK_TOKENS", "256")) # Target size of a knowledge base chunk
+CHUNK_OVERLAP_TOKENS = int(os.environ.get("CHUNK_OVERLAP_TOKENS", "40")) # Repeated between chunks of one section
+MAX_HEADING_CHARS = 100
+MAX_PARAGRAPH_CHARS = 8000 # Longer runs without a break are split at a line, so memory stays bounded
+
+# Rough subword count: one token per word or punctuation mark, plus one per
+# 8 characters of long words (Indic words and legal compounds split into several)
+TOKEN_PIECE = re.compile(r"\w+|[^\w\s]")
+
+# "CHAPTER III", "PART A", "Section 126", "SECTION 2A"
+HEADING = re.compile(r"^(?:CHAPTER|Chapter|PART|Part|SCHEDULE|Schedule)\s+[IVXLC\d]+[A-Z]?\b")
+# Only as a title ("Section 126. Assessment"), not a wrapped cross-reference
+SECTION_LABEL = re.compile(r"^(?:SECTION|Section|Sec\.)\s+(\d{1,3}[A-Z]{0,2})\s*(?:[.:—–-]|$)")
+# Act-style section headings: "35. Manner in which complaint shall be made.—(1) ...",
+# also as "Section 126. Assessment.—(1) ..."
+SECTION_NUMBERED = re.compile(r"^(?:(?:SECTION|Section|Sec\.)\s+)?(\d{1,3}[A-Z]{0,2})\.\s+([A-Z][^\n]{2,150}?)\.?\s*[—–-]")
+CAPS_WORD = re.compile(r"\b[A-Z]{2,}\b")
+LIST_ITEM = re.compile(r"^(?:\(\w{1,4}\)|\d{1,2}\)|[•▪●◦*-])\s")
+
+# Sentence ends: Indic danda, Urdu/CJK full stops, or Latin .!? followed by
+# a capital/quote/bracket (so "Rs. 5.50" and "sub-sec. (2)" stay whole)
+SENTENCE_END = re.compile(r"(?<=[।॥۔。])\s*|(?<=[.!?])\s+(?=[^\sa-z\d])")
+
+
+def estimate_tokens(text: str) -> int:
+    return sum(1 + len(piece) // 8 for piece in TOKEN_PIECE.findall(text))
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in SENTENCE_END.split(text) if s and s.strip()]
+
+
+def _heading(line: str) -> Optional[Tuple[str, str, str]]:
+    """
+    Returns (section number or "", title, body text after the title) if the
+    line starts a new section, else None.
+    """
+    match = SECTION_NUMBERED.match(line)
+    if match:
+        return match.group(1), match.group(0).rstrip("—–- "), line[match.end():].strip()
+    if len(line) > MAX_HEADING_CHARS:
+        return None
+    match = SECTION_LABEL.match(line)
+    if match:
+        return match.group(1), line, ""
+    if HEADING.match(line):
+        return "", line, ""
+    letters = [c for c in line if c.isascii() and c.isalpha()]
+    if len(CAPS_WORD.findall(line)) >= 2 and all(c.isupper() for c in letters) and not line.endswith((",", ";")):
+        return "", line, "" # All-caps title line
+    return None
+
+
+def iter_blocks(pages: Iterable[str]) -> Iterator[Dict]:
+    """
+    Turns page texts into structural blocks, lazily and in order:
+    {"kind": "heading", "text", "section", "page"} or
+    {"kind": "paragraph", "text", "page", "page_end"}.
+    Wrapped lines are unwrapped (hyphenated breaks re-joined); a paragraph
+    ends at a blank line, a list item, a heading or a sentence end followed
+    by a short line. Paragraphs may continue across a page break; "page" is
+    the 1-based page where a block starts, "page_end" where it ends.
+    """
+    lines: List[str] = []
+    start_page = end_page = 0
+    width = 0 # Longest line seen: the text column width
+    size = 0 # Characters in the current paragraph
+
+    def flush():
+        nonlocal size
+        text = ""
+        for line in lines:
+            if text.endswith("-") and line[:1].islower():
+                text = text[:-1] + line # "electri-" + "city"
+            else:
+                text = f"{text} {line}" if text else line
+        lines.clear()
+        size = 0
+        return {"kind": "paragraph", "text": text, "page": start_page, "page_end": end_page} if text else None
+
+    for page_number, page in enumerate(pages, start=1):
+        for raw in page.splitlines():
+            line = " ".join(raw.split())
+            if not line:
+                block = flush()
+                if block:
+                    yield block
+                continue
+            heading = _heading(line)
+            # PDF text rarely has blank lines; a short last line ending a sentence closes a paragraph
+            ended = lines and lines[-1].endswith((".", ":", "।", "॥")) and len(lines[-1]) < 0.7 * width
+            if heading or LIST_ITEM.match(line) or ended or size > MAX_PARAGRAPH_CHARS:
+                block = flush()
+                if block:
+                    yield block
+            if heading:
+                section, title, line = heading
+                yield {"kind": "heading", "text": title, "section": section, "page": page_number}
+                if not line:
+                    continue
+            if not lines:
+                start_page = page_number
+            lines.append(line)
+            size += len(line) + 1
+            end_page = page_number
+            width = max(width, len(line))
+    block = flush()
+    if block:
+        yield block
+
+
+def _split_word(word: str, max_tokens: int, count_tokens: Callable[[str], int]) -> List[str]:
+    """Cuts a word longer than the budget (a URL, an encoded blob) into the longest pieces that fit."""
+    pieces = []
+    while word:
+        fits, too_long = 1, len(word) + 1 # Binary search for the longest prefix within the budget
+        while too_long - fits > 1:
+            middle = (fits + too_long) // 2
+            if count_tokens(word[:middle]) <= max_tokens:
+                fits = middle
+            else:
+                too_long = middle
+        pieces.append(word[:fits])
+        word = word[fits:]
+    return pieces
+
+
+def _split_oversized(sentence: str, max_tokens: int, count_tokens: Callable[[str], int]) -> List[str]:
+    """Splits a sentence longer than the budget at word boundaries, and words longer than it anywhere."""
+    parts, current = [], []
+    for word in sentence.split():
+        if count_tokens(word) > max_tokens:
+            if current:
+                parts.append(" ".join(current))
+            *whole, rest = _split_word(word, max_tokens, count_tokens)
+            parts.extend(whole)
+            current = [rest]
+            continue
+        if current and count_tokens(" ".join(current + [word])) > max_tokens:
+            parts.append(" ".join(current))
+            current = []
+        current.append(word)
+    if current:
+        parts.append(" ".join(current))
+    return parts
+
+
+def _truncate(text: str, max_tokens: int, count_tokens: Callable[[str], int]) -> str:
+    """`text` cut to its first `max_tokens` (at a word boundary where possible)."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    return _split_oversized(text, max_tokens, count_tokens)[0]
+
+
+def chunk_pages(pages: Iterable[str], max_tokens: int = CHUNK_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+                count_tokens: Callable[[str], int] = estimate_tokens) -> Iterator[Dict]:
+    """
+    Streaming, structure-aware chunker for knowledge base documents.
+    Consumes page texts lazily and yields chunks of at most `max_tokens`
+    (estimated by `count_tokens`) as soon as each is complete:
+    - a chunk never spans two sections; each heading starts a new one,
+    - it is filled with whole paragraphs, then whole sentences, and only
+      a sentence longer than the budget is cut at word boundaries (and a
+      single word longer than the budget, such as a URL, within the word),
+    - consecutive chunks of the same section share up to `overlap_tokens`
+      of trailing sentences,
+    - each chunk's text starts with its section heading (counted in the
+      budget, and truncated to half of it), so a clause matches queries
+      about the section's subject.
+    Each chunk is {"text", "section", "heading", "page_start", "page_end",
+    "tokens"} ("" for no section/heading, so it can be stored as metadata).
+    """
+    section, heading = "", ""
+    heading_tokens, budget = 0, max_tokens
+    sentences: List[Tuple[str, int, int, int]] = [] # (sentence, tokens, first page, last page)
+    total = 0
+    fresh = False # Holds more than the overlap carried from the previous chunk
+
+    def emit():
+        body = " ".join(item[0] for item in sentences)
+        return {
+            "text": f"{heading}\n{body}" if heading else body,
+            "section": section,
+            "heading": heading,
+            "page_start": sentences[0][2],
+            "page_end": sentences[-1][3],
+            "tokens": total + heading_tokens,
+        }
+
+    def carry_overlap():
+        nonlocal sentences, total
+        kept, size = [], 0
+        for item in reversed(sentences):
+            if size + item[1] > overlap_tokens:
+                break
+            kept.insert(0, item)
+            size += item[1]
+        sentences, total = kept, size
+
+    for block in iter_blocks(pages):
+        if block["kind"] == "heading":
+            if not sentences and heading and not block["section"]:
+                # Consecutive titles ("CHAPTER IV" + "CONSUMER DISPUTES ...") read as one
+                heading = f"{heading} {block['text']}"[:2 * MAX_HEADING_CHARS]
+            else:
+                if fresh:
+                    yield emit()
+                sentences, total, fresh = [], 0, False
+                section, heading = block["section"], block["text"]
+            heading = _truncate(heading, max_tokens // 2, count_tokens)
+            heading_tokens = count_tokens(heading)
+            budget = max_tokens - heading_tokens
+            continue
+
+        paragraph_tokens = count_tokens(block["text"])
+        if fresh and total + paragraph_tokens > budget and paragraph_tokens <= budget:
+            # Whole paragraph fits in a chunk of its own: break before it
+            yield emit()
+            carry_overlap()
+            fresh = False
+
+        for sentence in split_sentences(block["text"]):
+            tokens = count_tokens(sentence)
+            pieces = [sentence] if tokens <= budget else _split_oversized(sentence, budget, count_tokens)
+            for piece in pieces:
+                piece_tokens = tokens if len(pieces) == 1 else count_tokens(piece)
+                if sentences and total + piece_tokens > budget:
+                    if fresh:
+                        yield emit()
+                        carry_overlap()
+                    while sentences and total + piece_tokens > budget: # Overlap must leave room
+                        total -= sentences.pop(0)[1]
+                sentences.append((piece, piece_tokens, block["page"], block["page_end"]))
+                total += piece_tokens
+                fresh = True
+    if fresh:
+        yield emit()
@@ -0,0 +1,127 @@
+import os
+import tempfile
+import threading
+from typing import Dict
+
+import grpc
+import google.generativeai as genai
+from google.generativeai import client as genai_client
+from google.cloud import texttospeech
+
+# --- Configuration ---
+GENERATION_MODEL = "gemini-2.0-flash"
+WARMUP_TIMEOUT = float(os.environ.get("CLIENT_WARMUP_TIMEOUT", "5")) # seconds per service
+TTS_KEY_PATH = os.path.join(os.path.dirname(__file__), "keys", "tts-service-key.json")
+
+
+def load_tts_credentials():
+    """
+    Points the Google Cloud client library at the TTS service account:
+    the key file if present, else GOOGLE_CREDENTIALS_JSON (Render/Cloud),
+    written to a temp file. Runs once, when the first TTS client is created.
+    """
+    if os.path.exists(TTS_KEY_PATH):
+        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = TTS_KEY_PATH
+        return
+    creds_json = os.environ.get("GOOGLE_CREDENTIALS_JSON")
+    if creds_json:
+        # Create a temp file for the credentials
+        with tempfile.NamedTemporaryFile(mode="w", delete=False, suffix=".json") as temp:
+            temp.write(creds_json)
+            temp_path = temp.name
+        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = temp_path
+        print(f"Loaded Google Credentials from environment variable to {temp_path}")
+    else:
+        print("Warning: No Google Cloud TTS credentials found (File missing and GOOGLE_CREDENTIALS_JSON not set). TTS will fail.")
+
+
+def _wait_for_channel(client, timeout: float):
+    """Blocks until the client's gRPC channel is connected (DNS + TCP + TLS)."""
+    channel = getattr(client.transport, "grpc_channel", None)
+    if channel is not None: # REST transports have nothing to pre-connect
+        grpc.channel_ready_future(channel).result(timeout=timeout)
+
+
+class ClientPool:
+    """
+    Long-lived Google API clients, shared by every thread in the process.
+
+    - One TextToSpeechClient: its gRPC channel multiplexes concurrent calls,
+      so TLS and connection setup are paid once instead of per request.
+    - One GenerativeModel handle per model name. genai already shares the
+      underlying service client; reusing the handle avoids rebuilding it.
+
+    gRPC channels must not cross a fork, so everything is recreated when the
+    pool is used from a new process (e.g. a forked server worker).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._tts_client = None
+        self._credentials_loaded = False
+        self._models: Dict[str, genai.GenerativeModel] = {}
+        self.created = {"tts": 0, "models": 0}
+
+    def _check_pid_locked(self):
+        if os.getpid() != self._pid:
+            self._pid = os.getpid()
+            self._tts_client = None
+            self._models = {}
+
+    def tts(self) -> texttospeech.TextToSpeechClient:
+        with self._lock:
+            self._check_pid_locked()
+            if self._tts_client is None:
+                if not self._credentials_loaded:
+                    load_tts_credentials()
+                    self._credentials_loaded = True
+                self._tts_client = texttospeech.TextToSpeechClient()
+                self.created["tts"] += 1
+            return self._tts_client
+
+    def model(self, name: str = GENERATION_MODEL) -> genai.GenerativeModel:
+        with self._lock:
+            self._check_pid_locked()
+            model = self._models.get(name)
+            if model is None:
+                model = self._models[name] = genai.GenerativeModel(name)
+                self.created["models"] += 1
+            return model
+
+    def reset(self):
+        """Drops all clients; the next call creates fresh ones."""
+        with self._lock:
+            self._tts_client = None
+            self._models = {}
+
+    def warm_up(self, timeout: float = WARMUP_TIMEOUT) -> Dict[str, str]:
+        """
+        Creates the clients and opens their connections ahead of the first
+        request. Failures are reported, not raised: a cold client still
+        works, it is just slower on first use.
+        """
+        status = {}
+        for name, connect in (
+            ("tts", lambda: _wait_for_channel(self.tts(), timeout)),
+            ("gemini", lambda: (self.model(), _wait_for_channel(genai_client.get_default_generative_client(), timeout))),
+        ):
+            try:
+                connect()
+                status[name] = "ok"
+            except Exception as e:
+                status[name] = f"failed: {e.__class__.__name__}: {e}"
+        print(f"Client warm-up: {status}")
+        return status
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "created": dict(self.created),
+                "tts_ready": self._tts_client is not None,
+                "models": sorted(self._models),
+            }
+
+
+# Singleton Instance
+client_pool = ClientPool()
@@ -0,0 +1,58 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ServerBusyError(Exception):
+    """Raised when an executor's queue is full; maps to HTTP 503."""
+
+
+class BoundedExecutor:
+    """
+    Runs blocking SDK calls off the event loop on a dedicated thread pool.
+
+    At most `max_workers` calls run at once and at most `max_queue` more may
+    wait. Beyond that, `run()` fails fast with ServerBusyError instead of
+    letting requests pile up (backpressure).
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._in_flight = 0 # Only touched from the event loop thread
+        self.rejected = 0
+
+    async def run(self, fn, *args, **kwargs):
+        if self._in_flight >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise ServerBusyError(f"{self.name} is at capacity, retry shortly.")
+        self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+        finally:
+            self._in_flight -= 1
+
+    def stats(self):
+        return {
+            "in_flight": self._in_flight,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+        }
+
+
+# Separate pools so slow document analysis cannot starve TTS
+analysis_executor = BoundedExecutor(
+    "analysis",
+    max_workers=int(os.environ.get("ANALYZE_MAX_WORKERS", "8")),
+    max_queue=int(os.environ.get("ANALYZE_MAX_QUEUE", "64")),
+)
+tts_executor = BoundedExecutor(
+    "tts",
+    max_workers=int(os.environ.get("TTS_MAX_WORKERS", "8")),
+    max_queue=int(os.environ.get("TTS_MAX_QUEUE", "64")),
+)
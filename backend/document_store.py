@@ -0,0 +1,143 @@
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+from mapped_file import map_sections, read_header, write_sections
+from string_table import StringTable
+
+# --- On-disk format ---
+# A mapped_file section file holding two StringTables in document-number
+# order: "ids" (with its hash index, for ID -> number lookups) and "texts"
+# (read by position only).
+STORE_MAGIC = b"DOCSTOR\0"
+FORMAT_VERSION = 1
+
+
+class DocumentStore:
+    """
+    Compact store of the knowledge base's chunk texts, in place of a dict
+    of ID -> text (a Python str object per chunk, plus the dict itself).
+
+    - Documents are numbered 0..n-1. IDs map to numbers and back through a
+      StringTable; texts are one UTF-8 buffer plus an offsets array.
+    - A store opened from disk is memory-mapped and read-only: the texts
+      stay in the page cache, shared by every worker, and a text is only
+      decoded when get_many() returns it.
+    - Documents added afterwards (ingestion) are appended to an in-memory
+      tail with the same layout (bytearray + offsets) until the next save().
+      Adding an existing ID replaces its text.
+    """
+
+    def __init__(self):
+        self.fingerprint = None
+        self._lock = threading.RLock()
+        # Base: numbers [0, _num_base), from the loaded file
+        self._base_ids: Optional[StringTable] = None
+        self._base_texts: Optional[StringTable] = None
+        self._num_base = 0
+        # Tail: numbers from _num_base on, texts back to back in _tail_blob
+        self._tail_number: Dict[str, int] = {}
+        self._tail_ids: List[str] = []
+        self._tail_blob = bytearray()
+        self._tail_offsets = array('q', [0])
+
+    # --- Lookups ---
+
+    def __len__(self) -> int:
+        with self._lock:
+            replaced = sum(1 for doc_id in self._tail_number if self._base_number(doc_id) is not None)
+            return self._num_base + len(self._tail_number) - replaced
+
+    def __contains__(self, doc_id: str) -> bool:
+        return self.number(doc_id) is not None
+
+    def _base_number(self, doc_id: str) -> Optional[int]:
+        return self._base_ids.find(doc_id) if self._base_ids is not None else None
+
+    def number(self, doc_id: str) -> Optional[int]:
+        """Document number of `doc_id` (its latest text), or None."""
+        with self._lock:
+            number = self._tail_number.get(doc_id)
+            return number if number is not None else self._base_number(doc_id)
+
+    def doc_id(self, number: int) -> str:
+        if number < self._num_base:
+            return self._base_ids[number]
+        return self._tail_ids[number - self._num_base]
+
+    def text(self, number: int) -> str:
+        if number < self._num_base:
+            return self._base_texts[number]
+        pos = number - self._num_base
+        with self._lock:
+            data = self._tail_blob[self._tail_offsets[pos]:self._tail_offsets[pos + 1]]
+        return data.decode("utf-8")
+
+    def get(self, doc_id: str) -> Optional[str]:
+        number = self.number(doc_id)
+        return self.text(number) if number is not None else None
+
+    def get_many(self, doc_ids: Iterable[str]) -> Dict[str, str]:
+        """{ID: text} for the given IDs that are stored; only these texts are decoded."""
+        found = {}
+        for doc_id in doc_ids:
+            number = self.number(doc_id)
+            if number is not None:
+                found[doc_id] = self.text(number)
+        return found
+
+    # --- Mutation ---
+
+    def add_many(self, doc_ids: Iterable[str], texts: Iterable[str]):
+        """Adds (or replaces) documents in the in-memory tail."""
+        with self._lock:
+            for doc_id, text in zip(doc_ids, texts):
+                self._tail_number[doc_id] = self._num_base + len(self._tail_ids)
+                self._tail_ids.append(doc_id)
+                self._tail_blob += text.encode("utf-8")
+                self._tail_offsets.append(len(self._tail_blob))
+
+    # --- Persistence ---
+
+    @staticmethod
+    def write(path: str, doc_ids: List[str], texts: List[str], fingerprint: Optional[str] = None):
+        """Writes a store holding `texts` under `doc_ids`, numbered in list order, atomically."""
+        sections = StringTable.sections("ids", doc_ids)
+        sections.update(StringTable.sections("texts", texts, index=False))
+        header = {"format_version": FORMAT_VERSION, "fingerprint": fingerprint, "num_docs": len(doc_ids)}
+        write_sections(path, STORE_MAGIC, header, sections)
+
+    def save(self, path: str, doc_ids: List[str], fingerprint: Optional[str] = None):
+        """
+        Writes the texts of `doc_ids`, numbered in that order (e.g. the
+        keyword index's slot order, so both share one number space).
+        Raises KeyError if one of them is not stored.
+        """
+        with self._lock:
+            texts = []
+            for doc_id in doc_ids:
+                number = self.number(doc_id)
+                if number is None:
+                    raise KeyError(doc_id)
+                texts.append(self.text(number))
+        self.write(path, doc_ids, texts, fingerprint)
+
+    @staticmethod
+    def read_header(path: str) -> Dict:
+        """Reads only the JSON header of a saved store. Raises ValueError if invalid."""
+        header = read_header(path, STORE_MAGIC, "document store")
+        if header.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported document store format version {header.get('format_version')}.")
+        return header
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "DocumentStore":
+        """Opens a store written by save()/write(), memory-mapped unless `mmap` is False."""
+        header = cls.read_header(path)
+        sections = map_sections(path, header, mmap)
+        store = cls()
+        store._base_ids = StringTable.from_sections("ids", sections)
+        store._base_texts = StringTable.from_sections("texts", sections)
+        store._num_base = len(store._base_ids)
+        store.fingerprint = header.get("fingerprint")
+        return store
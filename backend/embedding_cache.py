@@ -0,0 +1,155 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+# --- Configuration ---
+CACHE_PATH = os.environ.get("EMBEDDING_CACHE_PATH", os.path.join("db_storage", "embedding_cache.sqlite3"))
+MAX_MEMORY_ENTRIES = int(os.environ.get("EMBEDDING_CACHE_MEMORY_ENTRIES", "2048"))
+MAX_DISK_ENTRIES = int(os.environ.get("EMBEDDING_CACHE_DISK_ENTRIES", "200000"))
+
+
+def cache_key(text: str, model: str, task_type: str) -> str:
+    """Content hash of the text, scoped to the model and task type."""
+    h = hashlib.sha256()
+    for part in (model, task_type, text):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache keyed by (model, task type, text hash).
+
+    - Memory tier: bounded LRU (OrderedDict) of the hottest vectors.
+    - Disk tier: SQLite table of float32 vectors that survives restarts,
+      pruned by least-recent use when it grows past `max_disk_entries`.
+
+    The SQLite file is opened lazily on first use, so importing this module
+    has no side effects.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = CACHE_PATH,
+        max_memory_entries: int = MAX_MEMORY_ENTRIES,
+        max_disk_entries: int = MAX_DISK_ENTRIES,
+    ):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._writes_since_prune = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _db(self) -> Optional[sqlite3.Connection]:
+        if self.path is None:
+            return None
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY, model TEXT, task_type TEXT,"
+                " vector BLOB, last_used REAL)"
+            )
+        return self._conn
+
+    def _remember(self, key: str, vector: List[float]):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, texts: List[str], model: str, task_type: str) -> List[Optional[List[float]]]:
+        """Returns cached vectors (or None) for each text, in order."""
+        keys = [cache_key(text, model, task_type) for text in texts]
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        with self._lock:
+            missing = []
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    results[i] = vector
+                else:
+                    missing.append(i)
+
+            db = self._db() if missing else None
+            if db is not None:
+                placeholders = ",".join("?" * len(missing))
+                rows = dict(db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    [keys[i] for i in missing]
+                ).fetchall())
+                if rows:
+                    db.execute(
+                        f"UPDATE embeddings SET last_used = ? WHERE key IN ({','.join('?' * len(rows))})",
+                        [time.time(), *rows]
+                    )
+                    db.commit()
+                for i in missing:
+                    blob = rows.get(keys[i])
+                    if blob is not None:
+                        vector = array('f', blob).tolist()
+                        self._remember(keys[i], vector)
+                        self.disk_hits += 1
+                        results[i] = vector
+
+            self.misses += sum(1 for vector in results if vector is None)
+        return results
+
+    def put_many(self, texts: List[str], vectors: List[List[float]], model: str, task_type: str):
+        """Stores vectors in both tiers."""
+        keys = [cache_key(text, model, task_type) for text in texts]
+        now = time.time()
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                self._remember(key, list(vector))
+            db = self._db()
+            if db is None:
+                return
+            db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, task_type, vector, last_used) VALUES (?, ?, ?, ?, ?)",
+                [(key, model, task_type, array('f', vector).tobytes(), now) for key, vector in zip(keys, vectors)]
+            )
+            db.commit()
+            self._writes_since_prune += len(keys)
+            if self._writes_since_prune >= 1000:
+                self._prune_disk(db)
+
+    def _prune_disk(self, db: sqlite3.Connection):
+        self._writes_since_prune = 0
+        (count,) = db.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        excess = count - self.max_disk_entries
+        if excess > 0:
+            db.execute(
+                "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                (excess,)
+            )
+            db.commit()
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for monitoring."""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
@@ -0,0 +1,70 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from gemini_client import embed_texts
+
+# --- Configuration ---
+# Gemini's batchEmbedContents accepts up to 100 texts per request.
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_MAX_WORKERS = 4
+
+
+class BatchEmbedder:
+    """
+    Embeds large lists of texts by splitting them into multi-text batches and
+    keeping up to `max_workers` batch requests in flight at once.
+
+    `embed_fn` takes a list of texts and returns their vectors in the same
+    order (defaults to `gemini_client.embed_texts`, which shares one
+    token-bucket rate limiter across all workers).
+    """
+
+    def __init__(
+        self,
+        embed_fn: Optional[Callable[[List[str]], List[List[float]]]] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+    ):
+        if batch_size < 1 or max_workers < 1:
+            raise ValueError("batch_size and max_workers must be at least 1")
+        self.embed_fn = embed_fn or embed_texts
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+
+    def _batches(self, texts: List[str]) -> List[List[str]]:
+        return [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        vectors = self.embed_fn(batch)
+        if len(vectors) != len(batch):
+            raise Exception(f"Embedding backend returned {len(vectors)} vectors for {len(batch)} texts.")
+        return vectors
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Returns one embedding per input text, in input order.
+        Any batch failure is raised after the remaining batches are cancelled.
+        """
+        if not texts:
+            return []
+
+        batches = self._batches(texts)
+        if len(batches) == 1 or self.max_workers == 1:
+            return [vec for batch in batches for vec in self._embed_batch(batch)]
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+            futures = [executor.submit(self._embed_batch, batch) for batch in batches]
+            embeddings = []
+            try:
+                for future in futures:
+                    embeddings.extend(future.result())
+            except Exception:
+                for future in futures:
+                    future.cancel()
+                raise
+
+        elapsed = time.perf_counter() - start
+        print(f"Embedded {len(texts)} texts in {len(batches)} batches ({elapsed:.2f}s).")
+        return embeddings
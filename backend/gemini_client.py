@@ -1,11 +1,31 @@
 import os
 import time
 import google.generativeai as genai
-from typing import List, Optional
+from typing import Iterator, List, Optional
 from dotenv import load_dotenv
+from rate_limiter import TokenBucket
+from embedding_cache import EmbeddingCache
+from clients import client_pool
+from lifecycle import LazyService, services
 
 load_dotenv()
 
+EMBEDDING_MODEL = "models/text-embedding-004"
+
+# Shared across all threads so concurrent embedding workers back off together.
+# EMBED_RPM is the request quota per minute for the embedding endpoint.
+embedding_rate_limiter = TokenBucket(
+    rate=float(os.environ.get("EMBED_RPM", "1500")) / 60.0,
+    capacity=float(os.environ.get("EMBED_BURST", "10")),
+)
+
+# Query embeddings are cached by content hash (memory LRU + SQLite on disk)
+embedding_cache = EmbeddingCache()
+
+def is_rate_limit_error(e: Exception) -> bool:
+    """True if the exception looks like a 429 / quota error from the API."""
+    return "429" in str(e) or "quota" in str(e).lower()
+
 
 # --- Configuration ---
 def configure_gemini(api_key: Optional[str] = None):
@@ -20,6 +40,9 @@ def configure_gemini(api_key: Optional[str] = None):
     genai.configure(api_key=key_to_use)
     print("Gemini API Configured successfully.")
 
+# Configured once, on the first Gemini call (or at app start-up)
+gemini_config = services.register(LazyService("gemini", configure_gemini))
+
 # --- Helper: File Processing ---
 def _wait_for_file_active(file_obj):
     """Waits for the uploaded file to be processed by Google's servers."""
@@ -41,14 +64,15 @@ def process_document(file_path: str, mime_type: str) -> str:
     Uploads a document (PDF/Image) to Gemini and extracts text concepts.
     Uses Gemini 1.5 Flash for speed and multimodal capabilities.
     """
+    gemini_config.get()
     print(f"Uploading {file_path} to Gemini...")
     uploaded_file = genai.upload_file(file_path, mime_type=mime_type)
     
     # Ensure file is ready
     uploaded_file = _wait_for_file_active(uploaded_file)
     
-    # Vision/Multimodal Model
-    model = genai.GenerativeModel("gemini-2.0-flash")
+    # Vision/Multimodal Model (shared handle)
+    model = client_pool.model()
     
     prompt = """
     Analyze this document. 
@@ -60,39 +84,78 @@ def process_document(file_path: str, mime_type: str) -> str:
     response = model.generate_content([uploaded_file, prompt])
     return response.text
 
-def embed_text(text: str) -> List[float]:
+def _time_left(deadline: Optional[float]) -> Optional[float]:
+    """Seconds until `deadline` (perf_counter time), or None without one; raises once it has passed."""
+    if deadline is None:
+        return None
+    remaining = deadline - time.perf_counter()
+    if remaining <= 0:
+        raise TimeoutError("Embedding deadline passed.")
+    return remaining
+
+def embed_texts(texts: List[str], task_type: str = "retrieval_document", deadline: Optional[float] = None) -> List[List[float]]:
     """
-    Generates an embedding vector for the given text using text-embedding-004.
-    Includes retry logic for rate limits.
+    Generates embedding vectors for several texts in a single batch request.
+    Rate limits are handled through the shared `embedding_rate_limiter`:
+    a 429 pauses every worker, not just the caller.
+    With a `deadline` (perf_counter time), waiting for the rate limiter, the
+    request itself and any retries stop when it passes (TimeoutError).
     """
+    if not texts:
+        return []
+    gemini_config.get()
+
     max_retries = 5
     base_delay = 2
-    
+
     for attempt in range(max_retries):
+        if not embedding_rate_limiter.acquire(timeout=_time_left(deadline)):
+            raise TimeoutError("Embedding deadline passed while rate limited.")
+        remaining = _time_left(deadline)
         try:
             result = genai.embed_content(
-                model="models/text-embedding-004",
-                content=text,
-                task_type="retrieval_document"
+                model=EMBEDDING_MODEL,
+                content=texts,
+                task_type=task_type,
+                request_options={"timeout": remaining} if remaining is not None else None
             )
             return result['embedding']
         except Exception as e:
-            if "429" in str(e) or "quota" in str(e).lower():
+            if is_rate_limit_error(e):
                 wait_time = base_delay * (2 ** attempt)
-                print(f"[Warn] Rate limit hit. Retrying in {wait_time}s...")
-                time.sleep(wait_time)
+                print(f"[Warn] Rate limit hit. Backing off all embedding workers for {wait_time}s...")
+                embedding_rate_limiter.penalize(wait_time)
             else:
                 raise e
     raise Exception("Max retries exceeded for embedding.")
 
-def generate_explanation(doc_text: str, retrieved_context: str, language: str) -> str:
+def embed_text(text: str, task_type: str = "retrieval_document", use_cache: bool = True) -> List[float]:
     """
-    Generates the final simplified explanation in the target local language.
-    Combines the Document Text with Retrieved Laws.
+    Generates an embedding vector for the given text using text-embedding-004.
+    Includes retry logic for rate limits. Results are cached by
+    (model, task type, text hash), so repeated queries skip the API.
     """
-    model = genai.GenerativeModel("gemini-2.0-flash")
-    
-    prompt = f"""
+    if use_cache:
+        return embed_texts_cached([text], task_type=task_type)[0]
+    return embed_texts([text], task_type=task_type)[0]
+
+def embed_texts_cached(texts: List[str], task_type: str = "retrieval_document", deadline: Optional[float] = None) -> List[List[float]]:
+    """
+    Embeddings of several texts (e.g. the sub-queries of one document): cached
+    ones from the embedding cache, the rest in a single batch request
+    (stopped at `deadline`, see embed_texts).
+    """
+    vectors = embedding_cache.get_many(texts, EMBEDDING_MODEL, task_type)
+    missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+    if missing:
+        fresh = dict(zip(missing, embed_texts(missing, task_type=task_type, deadline=deadline)))
+        embedding_cache.put_many(missing, list(fresh.values()), EMBEDDING_MODEL, task_type)
+        vectors = [vector if vector is not None else fresh[text] for text, vector in zip(texts, vectors)]
+    return vectors
+
+def build_explanation_prompt(doc_text: str, retrieved_context: str, language: str) -> str:
+    """The generation prompt shared by the blocking and streaming variants."""
+    return f"""
     You are a helpful assistant for citizens who struggle to understand official documents.
     
     TARGET LANGUAGE: {language}
@@ -110,6 +173,32 @@ def generate_explanation(doc_text: str, retrieved_context: str, language: str) -
     4. Provide the final response completely in {language}.
     5. Use Markdown formatting (bolding important dates/amounts).
     """
+
+def generate_explanation(doc_text: str, retrieved_context: str, language: str) -> str:
+    """
+    Generates the final simplified explanation in the target local language.
+    Combines the Document Text with Retrieved Laws.
+    """
+    gemini_config.get()
+    model = client_pool.model()
+    
+    prompt = build_explanation_prompt(doc_text, retrieved_context, language)
     
     response = model.generate_content(prompt)
     return response.text
+
+def generate_explanation_stream(doc_text: str, retrieved_context: str, language: str) -> Iterator[str]:
+    """
+    Streaming variant of `generate_explanation`: yields pieces of the
+    explanation as the model produces them. Joined, they equal the full text.
+    """
+    gemini_config.get()
+    model = client_pool.model()
+    
+    prompt = build_explanation_prompt(doc_text, retrieved_context, language)
+    
+    response = model.generate_content(prompt, stream=True)
+    for chunk in response:
+        # Chunks without parts (e.g. the final usage-only chunk) carry no text
+        if chunk.parts:
+            yield chunk.text
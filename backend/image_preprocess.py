@@ -0,0 +1,148 @@
+import os
+from typing import Optional, Tuple
+
+try:
+    import cv2
+    import numpy as np
+except ImportError: # Optional: without OpenCV, photos are uploaded unchanged
+    cv2 = None
+    np = None
+
+# --- Configuration ---
+TARGET_DPI = int(os.environ.get("IMAGE_TARGET_DPI", "200"))
+PAGE_LONG_SIDE_INCHES = 11.7 # A4; also close enough for Letter/Legal
+BINARIZE = os.environ.get("IMAGE_BINARIZE", "1") == "1"
+JPEG_QUALITY = 80
+DETECT_SIDE = 800 # Edge detection runs on a copy downscaled to this long side
+MIN_DOCUMENT_AREA = 0.2 # Detected page must cover this fraction of the photo
+MAX_DESKEW_DEGREES = 15
+
+
+def available() -> bool:
+    return cv2 is not None
+
+
+def _order_corners(pts: "np.ndarray") -> "np.ndarray":
+    """Orders 4 points as top-left, top-right, bottom-right, bottom-left."""
+    s = pts.sum(axis=1)
+    d = np.diff(pts, axis=1).ravel()
+    return np.array([pts[np.argmin(s)], pts[np.argmin(d)], pts[np.argmax(s)], pts[np.argmax(d)]], dtype=np.float32)
+
+
+def find_document_corners(image: "np.ndarray") -> Optional["np.ndarray"]:
+    """
+    Finds the page outline in a photo: the largest 4-sided contour in the
+    edge map of a downscaled copy. Returns its corners in full-resolution
+    coordinates, or None if no convincing page is found.
+    """
+    h, w = image.shape[:2]
+    scale = DETECT_SIDE / max(h, w)
+    small = cv2.resize(image, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA) if scale < 1 else image
+    scale = min(scale, 1.0)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+    edges = cv2.Canny(cv2.GaussianBlur(gray, (5, 5), 0), 50, 150)
+    edges = cv2.dilate(edges, np.ones((3, 3), np.uint8))
+
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    min_area = MIN_DOCUMENT_AREA * small.shape[0] * small.shape[1]
+    for contour in sorted(contours, key=cv2.contourArea, reverse=True)[:5]:
+        if cv2.contourArea(contour) < min_area:
+            break
+        approx = cv2.approxPolyDP(contour, 0.02 * cv2.arcLength(contour, True), True)
+        if len(approx) == 4 and cv2.isContourConvex(approx):
+            return _order_corners(approx.reshape(4, 2).astype(np.float32) / scale)
+    return None
+
+
+def warp_to_page(image: "np.ndarray", corners: "np.ndarray") -> "np.ndarray":
+    """Perspective-corrects the photo so the page fills the frame."""
+    tl, tr, br, bl = corners
+    width = int(max(np.linalg.norm(br - bl), np.linalg.norm(tr - tl)))
+    height = int(max(np.linalg.norm(tr - br), np.linalg.norm(tl - bl)))
+    target = np.array([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]], dtype=np.float32)
+    matrix = cv2.getPerspectiveTransform(corners, target)
+    return cv2.warpPerspective(image, matrix, (width, height), flags=cv2.INTER_LINEAR)
+
+
+def deskew(gray: "np.ndarray") -> "np.ndarray":
+    """Rotates a page so its text lines are horizontal (small angles only)."""
+    ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)[1]
+    coords = cv2.findNonZero(ink)
+    if coords is None:
+        return gray
+    angle = cv2.minAreaRect(coords)[-1]
+    # OpenCV >= 4.5 reports angles in [0, 90); map to the nearest horizontal
+    if angle > 45:
+        angle -= 90
+    if abs(angle) < 0.5 or abs(angle) > MAX_DESKEW_DEGREES:
+        return gray
+    h, w = gray.shape
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    return cv2.warpAffine(gray, matrix, (w, h), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+
+
+def downscale_to_dpi(image: "np.ndarray", dpi: int = TARGET_DPI) -> "np.ndarray":
+    """Shrinks the page so its long side matches `dpi` for a page-sized sheet."""
+    max_side = int(PAGE_LONG_SIDE_INCHES * dpi)
+    h, w = image.shape[:2]
+    if max(h, w) <= max_side:
+        return image
+    scale = max_side / max(h, w)
+    return cv2.resize(image, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+
+
+def preprocess_image(data: bytes, binarize: bool = BINARIZE, dpi: int = TARGET_DPI) -> Optional[Tuple[bytes, str]]:
+    """
+    Cleans up a phone photo of a document before it is sent to the vision model:
+    EXIF rotation (applied by imdecode), page detection and perspective crop
+    (or deskew if no page outline is found), grayscale, downscaling to the
+    target DPI and adaptive thresholding, then re-encoding (PNG for
+    black-and-white, JPEG otherwise).
+    Returns (encoded bytes, mime type), or None if OpenCV is unavailable or
+    the image cannot be decoded (e.g. HEIC); callers then upload the original.
+    """
+    if cv2 is None:
+        return None
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return None
+
+    corners = find_document_corners(image)
+    if corners is not None:
+        image = warp_to_page(image, corners)
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    gray = downscale_to_dpi(gray, dpi)
+    if corners is None:
+        gray = deskew(gray)
+
+    if binarize:
+        # Block size ~ a few text lines at the target DPI; evens out shadows
+        block = (dpi // 4) | 1
+        page = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, block, 15)
+        ok, encoded = cv2.imencode(".png", page, [cv2.IMWRITE_PNG_COMPRESSION, 6])
+        mime_type = "image/png"
+    else:
+        ok, encoded = cv2.imencode(".jpg", gray, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+        mime_type = "image/jpeg"
+    if not ok:
+        return None
+    return encoded.tobytes(), mime_type
+
+
+def preprocess_file(path: str, dest_dir: str) -> Optional[Tuple[str, str]]:
+    """
+    Preprocesses an image file into `dest_dir`. Returns (new path, mime type),
+    or None if the original should be uploaded as is, including when the
+    result would not be smaller.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    result = preprocess_image(data)
+    if result is None or len(result[0]) >= len(data):
+        return None
+    encoded, mime_type = result
+    ext = ".png" if mime_type == "image/png" else ".jpg"
+    dest = os.path.join(dest_dir, os.path.splitext(os.path.basename(path))[0] + "_prepared" + ext)
+    with open(dest, "wb") as f:
+        f.write(encoded)
+    return dest, mime_type
@@ -0,0 +1,251 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import pypdf
+
+from chunking import chunk_pages
+from pdf_text import page_text
+
+# --- Configuration ---
+INGEST_PROCESSES = int(os.environ.get("INGEST_PROCESSES", str(os.cpu_count() or 2))) # pypdf is CPU-bound
+INGEST_FILE_WORKERS = int(os.environ.get("INGEST_FILE_WORKERS", "2")) # PDFs read concurrently
+PAGES_PER_TASK = 8 # Pages parsed per worker task
+PENDING_TASKS_PER_FILE = 2 # Page tasks in flight per PDF (bounds memory)
+EMBED_BATCH_SIZE = 200 # Chunks per embedding call / index write
+QUEUE_BATCHES = 4 # Batches that may wait between two stages
+
+_DONE = object()
+
+
+@lru_cache(maxsize=4)
+def _reader(pdf_path: str) -> pypdf.PdfReader:
+    """Worker process: parsed PDFs, so later page ranges skip re-reading the file structure."""
+    return pypdf.PdfReader(pdf_path)
+
+
+def _page_count(pdf_path: str) -> int:
+    return len(_reader(pdf_path).pages)
+
+
+def _extract_page_range(pdf_path: str, start: int, stop: int) -> Tuple[List[str], float]:
+    """Worker process: text of pages [start, stop) and the seconds spent parsing."""
+    began = time.perf_counter()
+    reader = _reader(pdf_path)
+    return [page_text(reader.pages[i]) for i in range(start, stop)], time.perf_counter() - began
+
+
+def iter_pages_parallel(pdf_path: str, pool: ProcessPoolExecutor, pages_per_task: int = PAGES_PER_TASK,
+                        max_pending: int = PENDING_TASKS_PER_FILE,
+                        on_task: Optional[Callable[[int, float], None]] = None) -> Iterator[str]:
+    """
+    Yields a PDF's page texts in order while worker processes parse the next
+    page ranges; at most `max_pending` ranges are parsed ahead of the consumer.
+    `on_task(pages, seconds)` is called with each range's parse time.
+    """
+    # Counted in a worker too: pypdf loads the whole file to read the page tree
+    total = pool.submit(_page_count, pdf_path).result()
+    pending = deque()
+
+    def collect():
+        texts, seconds = pending.popleft().result()
+        if on_task:
+            on_task(len(texts), seconds)
+        return texts
+
+    for start in range(0, total, pages_per_task):
+        pending.append(pool.submit(_extract_page_range, pdf_path, start, min(start + pages_per_task, total)))
+        if len(pending) >= max_pending:
+            yield from collect()
+    while pending:
+        yield from collect()
+
+
+class StageStats:
+    """Items processed and time spent working (not waiting) by one stage."""
+
+    def __init__(self, name: str, unit: str):
+        self.name = name
+        self.unit = unit
+        self.items = 0
+        self.busy = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, items: int, seconds: float):
+        with self._lock:
+            self.items += items
+            self.busy += seconds
+
+    def report(self, wall: float) -> Dict:
+        return {
+            "items": self.items,
+            "unit": self.unit,
+            "busy_seconds": round(self.busy, 3),
+            "per_second": round(self.items / wall, 1) if wall > 0 else 0.0,
+        }
+
+
+class IngestPipeline:
+    """
+    Streams PDFs into the knowledge base through four stages connected by
+    bounded queues, so memory stays flat whatever the PDF sizes:
+
+      pages (process pool) -> chunks (chunking.chunk_pages, one thread per PDF)
+        -> embeddings (`embed_fn`, batches of `batch_size`) -> index writes (`write_fn`)
+
+    `embed_fn(texts)` returns one vector per text; `write_fn(documents,
+    embeddings, metadatas, ids)` stores a batch. A failing PDF or batch is
+    reported and skipped; the rest are still ingested.
+    """
+
+    def __init__(self, embed_fn: Callable[[List[str]], List[List[float]]], write_fn: Callable,
+                 processes: int = INGEST_PROCESSES, file_workers: int = INGEST_FILE_WORKERS,
+                 batch_size: int = EMBED_BATCH_SIZE, queue_batches: int = QUEUE_BATCHES,
+                 chunker: Callable[[Iterator[str]], Iterator[Dict]] = chunk_pages):
+        self.embed_fn = embed_fn
+        self.write_fn = write_fn
+        self.processes = processes
+        self.file_workers = file_workers
+        self.batch_size = batch_size
+        self.chunker = chunker
+        self._chunks = queue.Queue(maxsize=batch_size * queue_batches)
+        self._embedded = queue.Queue(maxsize=queue_batches)
+        self.stats = {
+            "extract": StageStats("extract", "pages"),
+            "chunk": StageStats("chunk", "chunks"),
+            "embed": StageStats("embed", "chunks"),
+            "write": StageStats("write", "chunks"),
+        }
+        self.errors: List[str] = []
+        self.chunk_counts: Dict[str, int] = {}
+
+    # --- Stages ---
+
+    def _produce(self, source: str, path: str, pool: ProcessPoolExecutor):
+        """Pages -> chunks for one PDF, on a file worker thread."""
+        waited = [0.0] # Time spent waiting for page text, excluded from chunking time
+
+        def timed_pages():
+            pages = iter_pages_parallel(path, pool, on_task=self.stats["extract"].add)
+            while True:
+                start = time.perf_counter()
+                page = next(pages, None)
+                waited[0] += time.perf_counter() - start
+                if page is None:
+                    return
+                yield page
+
+        chunks = self.chunker(timed_pages())
+        count = 0
+        try:
+            while True:
+                start, before = time.perf_counter(), waited[0]
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                self.stats["chunk"].add(1, time.perf_counter() - start - (waited[0] - before))
+                self._chunks.put((source, count, chunk)) # Blocks while the embedder is behind
+                count += 1
+        except Exception as e:
+            self.errors.append(f"{source}: {e}")
+            print(f"[ERROR] Failed to read {source}: {e}")
+        self.chunk_counts[source] = count
+        print(f"Chunked {source}: {count} chunks.")
+
+    def _embed(self):
+        """Chunks -> embedded batches, on its own thread."""
+        finished = False
+        while not finished:
+            batch = []
+            while len(batch) < self.batch_size:
+                item = self._chunks.get()
+                if item is _DONE:
+                    finished = True
+                    break
+                batch.append(item)
+            if not batch:
+                continue
+            start = time.perf_counter()
+            try:
+                vectors = self.embed_fn([chunk["text"] for _, _, chunk in batch])
+            except Exception as e:
+                self.errors.append(f"embedding batch of {len(batch)}: {e}")
+                print(f"  [ERROR] Failed to embed batch: {e}")
+                continue
+            self.stats["embed"].add(len(batch), time.perf_counter() - start)
+            self._embedded.put((batch, vectors))
+        self._embedded.put(_DONE)
+
+    def _write(self):
+        """Embedded batches -> knowledge base, on its own thread (single writer)."""
+        while True:
+            item = self._embedded.get()
+            if item is _DONE:
+                return
+            batch, vectors = item
+            start = time.perf_counter()
+            try:
+                self.write_fn(
+                    [chunk["text"] for _, _, chunk in batch],
+                    vectors,
+                    [chunk_metadata(source, index, chunk) for source, index, chunk in batch],
+                    [f"{source}_chunk_{index}" for source, index, _ in batch]
+                )
+            except Exception as e:
+                self.errors.append(f"writing batch of {len(batch)}: {e}")
+                print(f"  [ERROR] Failed to ingest batch: {e}")
+                continue
+            self.stats["write"].add(len(batch), time.perf_counter() - start)
+            print(f"  > Ingested {self.stats['write'].items} chunks...")
+
+    def run(self, files: Dict[str, str]) -> Dict:
+        """
+        Ingests {source name: PDF path}. Returns per-stage throughput,
+        chunk counts per source and errors.
+        """
+        start = time.perf_counter()
+        embedder = threading.Thread(target=self._embed, name="ingest-embed", daemon=True)
+        writer = threading.Thread(target=self._write, name="ingest-write", daemon=True)
+        embedder.start()
+        writer.start()
+        try:
+            # spawn: workers only import this module, never the caller's state
+            with ProcessPoolExecutor(max_workers=self.processes, mp_context=multiprocessing.get_context("spawn")) as pool, \
+                    ThreadPoolExecutor(max_workers=self.file_workers, thread_name_prefix="ingest-file") as producers:
+                for future in [producers.submit(self._produce, source, path, pool) for source, path in files.items()]:
+                    future.result()
+        finally:
+            self._chunks.put(_DONE)
+            embedder.join()
+            writer.join()
+        wall = time.perf_counter() - start
+        return {
+            "seconds": round(wall, 2),
+            "stages": {name: stage.report(wall) for name, stage in self.stats.items()},
+            "chunks": dict(self.chunk_counts),
+            "errors": list(self.errors),
+        }
+
+
+def chunk_metadata(source: str, index: int, chunk: Dict) -> Dict:
+    return {
+        "source": source,
+        "chunk_index": index,
+        "section": chunk["section"],
+        "heading": chunk["heading"],
+        "page_start": chunk["page_start"],
+        "page_end": chunk["page_end"],
+    }
+
+
+def print_report(report: Dict):
+    print(f"\nIngestion throughput ({report['seconds']}s wall):")
+    for name, stage in report["stages"].items():
+        print(f"  {name:<8}{stage['items']:>8} {stage['unit']:<7}{stage['per_second']:>9}/s"
+              f"   busy {stage['busy_seconds']}s")
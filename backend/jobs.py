@@ -0,0 +1,350 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+import analysis_pipeline
+from analysis_cache import sha256_file
+from concurrency import ServerBusyError
+
+# --- Configuration ---
+JOBS_DB_PATH = os.environ.get("JOBS_DB_PATH", os.path.join("db_storage", "jobs.sqlite3"))
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+JOB_STAGE_RETRIES = int(os.environ.get("JOB_STAGE_RETRIES", "2")) # Retries after the first attempt
+JOB_RETRY_DELAY = float(os.environ.get("JOB_RETRY_DELAY", "2")) # Seconds, doubled per retry
+JOB_STALE_SECONDS = float(os.environ.get("JOB_STALE_SECONDS", "900")) # Running jobs idle this long are re-queued
+JOB_HEARTBEAT_SECONDS = float(os.environ.get("JOB_HEARTBEAT_SECONDS", "60")) # Lease renewal while a job runs
+JOB_RETENTION_SECONDS = float(os.environ.get("JOB_RETENTION_SECONDS", str(7 * 24 * 3600))) # Finished jobs kept this long
+JOB_PURGE_INTERVAL = 3600 # Seconds between retention purges
+JOB_MAX_QUEUED = int(os.environ.get("JOB_MAX_QUEUED", "256")) # Queued jobs beyond this are rejected (backpressure)
+
+STAGES = ("extract", "retrieve", "explain")
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class _JobReclaimed(Exception):
+    """The job was re-claimed by another worker; this one must stop working on it."""
+
+
+class JobQueue:
+    """
+    Durable, SQLite-backed queue for document analysis jobs.
+
+    - `submit()` stores a job and returns its ID immediately. An identical
+      in-flight job (same file hash + language) is reused instead of queued twice.
+      With `max_queued` jobs already waiting, it raises ServerBusyError.
+    - Worker threads claim queued jobs atomically and run the pipeline stage by
+      stage, recording progress so `get()` can report it. Each stage is retried
+      with exponential back-off; completed stages are served from the analysis
+      cache on retry, so a late failure does not redo earlier work.
+    - Jobs left "running" by a dead process (same host) are re-queued on
+      `start()`. While a worker runs a job it renews the job's lease every
+      `heartbeat` seconds; jobs whose lease has not been renewed for
+      JOB_STALE_SECONDS are re-claimed by any worker. Claims are atomic, so several server
+      processes can share one queue file. Every claim has its own owner tag
+      and a worker only writes to a job it still owns, so the previous owner
+      of a re-claimed job cannot finish it.
+    - Done and failed jobs are deleted `retention` seconds after they
+      finish (see `purge()`, run by idle workers every JOB_PURGE_INTERVAL).
+    """
+
+    def __init__(self, path: str = JOBS_DB_PATH, workers: int = JOB_WORKERS,
+                 stage_retries: int = JOB_STAGE_RETRIES, retry_delay: float = JOB_RETRY_DELAY,
+                 max_queued: int = JOB_MAX_QUEUED, heartbeat: float = JOB_HEARTBEAT_SECONDS,
+                 retention: float = JOB_RETENTION_SECONDS):
+        self.path = path
+        self.workers = workers
+        self.max_queued = max_queued
+        self.heartbeat = heartbeat
+        self.retention = retention
+        self.rejected = 0
+        self.purged = 0
+        self._next_purge = 0.0
+        self.stage_retries = stage_retries
+        self.retry_delay = retry_delay
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._conn = None
+        self._host = socket.gethostname()
+        self._owner = f"{self._host}:{os.getpid()}"
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, file_path TEXT, file_hash TEXT, language TEXT,"
+                " status TEXT, stage TEXT, stages TEXT, result TEXT, error TEXT,"
+                " owner TEXT, created REAL, updated REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_dedup ON jobs (file_hash, language, status)")
+        return self._conn
+
+    # --- Public API ---
+
+    def submit(self, file_path: str, language: str, file_hash: Optional[str] = None) -> Tuple[str, bool]:
+        """
+        Queues an analysis job. Returns (job_id, deduplicated), where
+        deduplicated is True if an identical in-flight job was reused.
+        Raises ServerBusyError if `max_queued` jobs are already waiting.
+        """
+        file_hash = file_hash or sha256_file(file_path)
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            existing = db.execute(
+                "SELECT id FROM jobs WHERE file_hash = ? AND language = ? AND status IN (?, ?)"
+                " ORDER BY created LIMIT 1",
+                (file_hash, language, *ACTIVE_STATUSES)
+            ).fetchone()
+            if existing:
+                return existing["id"], True
+            queued = db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            if queued >= self.max_queued:
+                self.rejected += 1
+                raise ServerBusyError(f"The analysis queue is full ({queued} jobs waiting), retry shortly.")
+
+            job_id = uuid.uuid4().hex
+            stages = {stage: {"status": "pending", "attempts": 0} for stage in STAGES}
+            db.execute(
+                "INSERT INTO jobs (id, file_path, file_hash, language, status, stage, stages, created, updated)"
+                " VALUES (?, ?, ?, ?, 'queued', NULL, ?, ?, ?)",
+                (job_id, file_path, file_hash, language, json.dumps(stages), now, now)
+            )
+            db.commit()
+        self._wakeup.set()
+        return job_id, False
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Returns the job's status, per-stage progress and (when done) result."""
+        with self._lock:
+            row = self._db().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "job_id": row["id"],
+            "status": row["status"],
+            "stage": row["stage"],
+            "stages": json.loads(row["stages"]),
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "created": row["created"],
+            "updated": row["updated"],
+        }
+
+    def active_file_paths(self) -> List[str]:
+        """Files referenced by queued or running jobs (must not be deleted)."""
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT DISTINCT file_path FROM jobs WHERE status IN (?, ?)", ACTIVE_STATUSES
+            ).fetchall()
+        return [row["file_path"] for row in rows]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            rows = self._db().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {
+            "workers": self.workers,
+            "max_queued": self.max_queued,
+            "rejected": self.rejected,
+            "purged": self.purged,
+            **{row["status"]: row["n"] for row in rows}
+        }
+
+    def purge(self) -> int:
+        """Deletes done and failed jobs finished more than `retention` seconds ago. Returns the count."""
+        with self._lock:
+            db = self._db()
+            deleted = db.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated < ?",
+                (time.time() - self.retention,)
+            ).rowcount
+            db.commit()
+        self.purged += deleted
+        return deleted
+
+    # --- Workers ---
+
+    def _owner_alive(self, owner: Optional[str]) -> bool:
+        host, _, pid = (owner or "").partition("/")[0].rpartition(":")
+        if host != self._host or not pid.isdigit():
+            return True # Cannot check other hosts; the stale timeout covers them
+        try:
+            os.kill(int(pid), 0)
+            return True
+        except ProcessLookupError:
+            return False
+        except OSError:
+            return True
+
+    def start(self):
+        """Re-queues jobs interrupted by a dead process and starts the worker threads."""
+        with self._lock:
+            db = self._db()
+            running = db.execute("SELECT id, owner FROM jobs WHERE status = 'running'").fetchall()
+            orphaned = [row["id"] for row in running if not self._owner_alive(row["owner"])]
+            db.executemany(
+                "UPDATE jobs SET status = 'queued', owner = NULL, updated = ? WHERE id = ? AND status = 'running'",
+                [(time.time(), job_id) for job_id in orphaned]
+            )
+            db.commit()
+        if orphaned:
+            print(f"Re-queued {len(orphaned)} interrupted jobs.")
+        self._stopping.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"Job queue started with {self.workers} workers.")
+
+    def stop(self, timeout: float = 5.0):
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _claim(self) -> Optional[Tuple[sqlite3.Row, str]]:
+        """
+        Atomically moves the oldest claimable job to 'running' for this process.
+        Returns the job and the claim's owner tag ("host:pid/claim").
+        """
+        with self._lock:
+            db = self._db()
+            now = time.time()
+            candidates = db.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' OR (status = 'running' AND updated < ?)"
+                " ORDER BY created LIMIT 5",
+                (now - JOB_STALE_SECONDS,)
+            ).fetchall()
+            for row in candidates:
+                owner = f"{self._owner}/{uuid.uuid4().hex[:8]}"
+                claimed = db.execute(
+                    "UPDATE jobs SET status = 'running', owner = ?, updated = ?"
+                    " WHERE id = ? AND status = ? AND updated = ?",
+                    (owner, now, row["id"], row["status"], row["updated"])
+                ).rowcount
+                db.commit()
+                if claimed:
+                    return row, owner
+            return None
+
+    def _worker_loop(self):
+        while not self._stopping.is_set():
+            claim = self._claim()
+            if claim is None:
+                if time.monotonic() >= self._next_purge:
+                    self._next_purge = time.monotonic() + JOB_PURGE_INTERVAL
+                    try:
+                        self.purge()
+                    except sqlite3.Error as e:
+                        print(f"Error purging finished jobs: {e}")
+                self._wakeup.wait(timeout=1.0)
+                self._wakeup.clear()
+                continue
+            row, owner = claim
+            try:
+                self._run_job(row, owner)
+            except Exception as e:
+                print(f"[Job {row['id']}] Failed: {e}")
+
+    def _update(self, job_id: str, owner: str, **fields):
+        """
+        Updates a running job this claim still owns. Raises _JobReclaimed if
+        another worker has re-claimed it meanwhile (nothing is written).
+        """
+        fields["updated"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            db = self._db()
+            updated = db.execute(
+                f"UPDATE jobs SET {columns} WHERE id = ? AND owner = ? AND status = 'running'",
+                (*fields.values(), job_id, owner)
+            ).rowcount
+            db.commit()
+        if not updated:
+            raise _JobReclaimed(job_id)
+
+    @contextmanager
+    def _lease(self, job_id: str, owner: str):
+        """
+        Renews the job's lease (its `updated` time) every `heartbeat` seconds
+        while the worker is busy with it, so a long stage is not mistaken for
+        a stalled one and run a second time elsewhere.
+        """
+        done = threading.Event()
+
+        def renew():
+            while not done.wait(self.heartbeat):
+                try:
+                    self._update(job_id, owner)
+                except _JobReclaimed:
+                    return
+                except sqlite3.Error as e:
+                    print(f"[Job {job_id}] Could not renew its lease: {e}")
+
+        thread = threading.Thread(target=renew, name=f"job-lease-{job_id[:8]}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            done.set()
+            thread.join()
+
+    def _run_stage(self, job_id: str, owner: str, stages: Dict, stage: str, fn: Callable):
+        """Runs one stage with retries, persisting its progress."""
+        info = stages[stage]
+        for attempt in range(self.stage_retries + 1):
+            info.update(status="running", attempts=info["attempts"] + 1, started=time.time())
+            self._update(job_id, owner, stage=stage, stages=json.dumps(stages))
+            try:
+                result = fn()
+                info.update(status="done", finished=time.time(), error=None)
+                self._update(job_id, owner, stages=json.dumps(stages))
+                return result
+            except _JobReclaimed:
+                raise
+            except Exception as e:
+                info.update(status="retrying" if attempt < self.stage_retries else "failed", error=str(e))
+                self._update(job_id, owner, stages=json.dumps(stages))
+                print(f"[Job {job_id}] Stage '{stage}' attempt {attempt + 1} failed: {e}")
+                if attempt < self.stage_retries:
+                    time.sleep(self.retry_delay * (2 ** attempt))
+        raise Exception(f"Stage '{stage}' failed: {info['error']}")
+
+    def _run_job(self, row: sqlite3.Row, owner: str):
+        job_id = row["id"]
+        stages = json.loads(row["stages"])
+        with self._lease(job_id, owner):
+            try:
+                extraction = self._run_stage(job_id, owner, stages, "extract", lambda: analysis_pipeline.extract_text(
+                    row["file_path"], row["file_hash"]))
+                context = self._run_stage(job_id, owner, stages, "retrieve", lambda: analysis_pipeline.retrieve_context(
+                    extraction["text"], extraction["text_hash"]))
+                explanation = self._run_stage(job_id, owner, stages, "explain", lambda: analysis_pipeline.explain(
+                    extraction["text"], extraction["text_hash"], context, row["language"]))
+                result = analysis_pipeline.build_response(extraction, context, explanation)
+                self._update(job_id, owner, status="done", stage=None, result=json.dumps(result, ensure_ascii=False))
+            except _JobReclaimed:
+                print(f"[Job {job_id}] Re-claimed by another worker; dropping this run.")
+            except Exception as e:
+                try:
+                    self._update(job_id, owner, status="failed", error=str(e))
+                except _JobReclaimed:
+                    print(f"[Job {job_id}] Re-claimed by another worker; dropping this run.")
+
+# Singleton Instance (workers are started by the FastAPI app)
+job_queue = JobQueue()
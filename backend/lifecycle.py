@@ -0,0 +1,147 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class LazyService:
+    """
+    A service built on first use instead of at import time.
+
+    `get()` returns the instance, building it with `factory()` in the
+    calling thread, or waiting if a build is already running (e.g. the
+    background build from `start()`). A failed build is reported by
+    `status()` and retried on the next `get()`.
+
+    Attribute access is forwarded to the instance, so a module-level
+    `service = LazyService(...)` can stand in for the old singleton:
+    `service.query(...)` builds it if needed.
+    """
+
+    def __init__(self, name: str, factory: Callable, critical: bool = True):
+        self.name = name
+        self.critical = critical # Needed for the app to report ready
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._built = threading.Event()
+        self._building = False
+        self._instance = None
+        self._error: Optional[str] = None
+        self._seconds: Optional[float] = None
+
+    def _build(self):
+        start = time.perf_counter()
+        try:
+            instance = self._factory()
+        except Exception as e:
+            with self._lock:
+                self._building = False
+                self._error = f"{e.__class__.__name__}: {e}"
+            print(f"Service '{self.name}' failed to start: {self._error}")
+            raise
+        with self._lock:
+            self._instance = instance
+            self._building = False
+            self._error = None
+            self._seconds = round(time.perf_counter() - start, 3)
+            self._built.set()
+        print(f"Service '{self.name}' ready in {self._seconds}s.")
+        return instance
+
+    def get(self, timeout: Optional[float] = None):
+        """Returns the instance, building it first if needed."""
+        while True:
+            with self._lock:
+                if self._built.is_set():
+                    return self._instance
+                build_here = not self._building
+                if build_here:
+                    self._building = True
+            if build_here:
+                return self._build()
+            # Another thread is building: wait for it (then retry if it failed)
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while not self._built.wait(0.05):
+                with self._lock:
+                    if not self._building:
+                        break
+                if deadline is not None and time.monotonic() > deadline:
+                    raise TimeoutError(f"Service '{self.name}' is still starting.")
+            if self._built.is_set():
+                return self._instance
+            with self._lock:
+                error = self._error
+            if error is not None:
+                raise RuntimeError(f"Service '{self.name}' failed to start: {error}")
+
+    def start(self):
+        """Builds the service in a background thread (no-op if built or building)."""
+        with self._lock:
+            if self._built.is_set() or self._building:
+                return
+            self._building = True
+
+        def run():
+            try:
+                self._build()
+            except Exception:
+                pass # Recorded in status(); the next get() retries
+
+        threading.Thread(target=run, name=f"start-{self.name}", daemon=True).start()
+
+    @property
+    def ready(self) -> bool:
+        return self._built.is_set()
+
+    def status(self) -> Dict:
+        with self._lock:
+            if self._built.is_set():
+                state = "ready"
+            elif self._building:
+                state = "starting"
+            elif self._error is not None:
+                state = "failed"
+            else:
+                state = "not started"
+            return {"status": state, "seconds": self._seconds, "error": self._error}
+
+    def reset(self):
+        """Drops the instance; the next get() builds a new one."""
+        with self._lock:
+            self._instance = None
+            self._error = None
+            self._built.clear()
+
+    def __getattr__(self, attr):
+        # Only called for attributes LazyService itself does not define
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        return getattr(self.get(), attr)
+
+
+class ServiceRegistry:
+    """The app's lazily built services, for background start-up and readiness."""
+
+    def __init__(self):
+        self._services: List[LazyService] = []
+
+    def register(self, service: LazyService) -> LazyService:
+        self._services.append(service)
+        return service
+
+    def start_all(self):
+        """Starts building every service in the background; returns immediately."""
+        for service in self._services:
+            service.start()
+
+    def ready(self) -> bool:
+        return all(service.ready for service in self._services if service.critical)
+
+    def status(self) -> Dict:
+        return {
+            "ready": self.ready(),
+            "services": {service.name: service.status() for service in self._services},
+        }
+
+
+# Singleton Instance
+services = ServiceRegistry()
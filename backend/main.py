@@ -1,11 +1,21 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+import asyncio
 import shutil
 import os
-import io
+import json
+import threading
+import tempfile
+import zipfile
+from typing import Dict, List, Optional, Tuple
 from tempfile import NamedTemporaryFile
+from starlette.concurrency import run_in_threadpool
 import tts_service
+from page_extraction import IMAGE_TYPES, PAGE_BUNDLE_COMMENT
+from concurrency import analysis_executor, tts_executor, ServerBusyError
+from storage import blob_store, StorageManager, UploadTooLarge
+from lifecycle import services
 
 # Initialize App
 app = FastAPI(title="Document Scanner & Explainer API")
@@ -23,95 +33,296 @@ app.add_middleware(
 UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-def save_upload_file(upload_file: UploadFile, destination: str):
+# Multipart framing around the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    """Rejects oversized uploads from their Content-Length, before the body is read."""
+    if request.method == "POST" and request.url.path.startswith("/upload"):
+        length = request.headers.get("content-length")
+        if length and length.isdigit() and int(length) > blob_store.max_bytes + MULTIPART_OVERHEAD:
+            return JSONResponse(status_code=413, content={
+                "detail": f"Upload exceeds the {blob_store.max_bytes // (1024 * 1024)} MB limit."
+            })
+    return await call_next(request)
+
+def save_upload_file(upload_file: UploadFile) -> Dict:
     try:
-        with open(destination, "wb") as buffer:
-            shutil.copyfileobj(upload_file.file, buffer)
+        return blob_store.save_fileobj(upload_file.file)
     finally:
         upload_file.file.close()
 
+def resolve_document(document_id: Optional[str], filename: Optional[str]) -> Tuple[str, Optional[str]]:
+    """
+    Returns (path, content hash) for a document handle from /upload, or for
+    the filename of a file uploaded before content addressing.
+    """
+    if document_id:
+        if not blob_store.exists(document_id):
+            raise HTTPException(status_code=404, detail="File not found")
+        try:
+            # Brings it back from the cold tier and refreshes its retention clock
+            return blob_store.materialize(document_id), document_id
+        except FileNotFoundError: # Evicted meanwhile
+            raise HTTPException(status_code=404, detail="File not found")
+    file_path = f"{UPLOAD_DIR}/{os.path.basename(filename or '')}"
+    if not filename or not os.path.isfile(file_path):
+        raise HTTPException(status_code=404, detail="File not found")
+    os.utime(file_path)
+    return file_path, None
+
 # --- Routes ---
 
 @app.get("/")
 def health_check():
     """
-    Simple health check to verify backend is running.
+    Liveness: the process is up and serving. Answers as soon as the server
+    starts, before the retrieval index has loaded (see /ready).
     """
     return {"status": "ok", "message": "Document Scanner API is active"}
 
+@app.get("/ready")
+def readiness_check():
+    """
+    Readiness: 200 once the services analysis depends on (Gemini config,
+    retrieval index) are up, 503 with per-service status while they start.
+    /upload and /tts work before this.
+    """
+    status = services.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
 @app.post("/upload")
 async def upload_document(file: UploadFile = File(...)):
     """
     Endpoint to handle file uploads.
-    Saves the file locally and returns the path.
+    Streams the file into the content-addressed blob store and returns its
+    SHA-256 as `document_id`, the handle for /analyze. Identical uploads
+    share one blob.
     """
     try:
-        file_location = f"{UPLOAD_DIR}/{file.filename}"
-        save_upload_file(file, file_location)
+        stored = await run_in_threadpool(save_upload_file, file)
         return {
             "info": "File saved successfully",
+            "document_id": stored["document_id"],
             "filename": file.filename,
             "content_type": file.content_type,
-            "path": file_location
+            "size": stored["size"],
+            "deduplicated": stored["deduplicated"]
         }
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"File upload failed: {str(e)}")
+
+def save_page_bundle(upload_files: List[UploadFile]) -> Dict:
+    """Stores several page images as one ZIP (pages in upload order)."""
+    fd, bundle_path = tempfile.mkstemp(dir=blob_store.tmp_dir, suffix=".zip")
+    try:
+        with os.fdopen(fd, "wb") as bundle, zipfile.ZipFile(bundle, "w", compression=zipfile.ZIP_STORED) as archive:
+            archive.comment = PAGE_BUNDLE_COMMENT # Marks it as a page bundle for split_units
+            for i, upload_file in enumerate(upload_files):
+                ext = os.path.splitext(upload_file.filename or "")[1].lower()
+                with archive.open(f"page_{i:04d}{ext}", "w") as member:
+                    shutil.copyfileobj(upload_file.file, member)
+        return blob_store.save_file(bundle_path)
+    finally:
+        os.remove(bundle_path)
+        for upload_file in upload_files:
+            upload_file.file.close()
+
+@app.post("/upload/pages")
+async def upload_pages(files: List[UploadFile] = File(...)):
+    """
+    Multi-image upload (e.g. one photo per page). The images are bundled
+    into a single document that /analyze processes page by page.
+    """
+    for upload_file in files:
+        if os.path.splitext(upload_file.filename or "")[1].lower() not in IMAGE_TYPES:
+            raise HTTPException(status_code=400, detail=f"Unsupported page image: {upload_file.filename}")
+    try:
+        stored = await run_in_threadpool(save_page_bundle, files)
+        return {
+            "info": "Pages saved successfully",
+            "document_id": stored["document_id"],
+            "filename": files[0].filename,
+            "content_type": "application/zip",
+            "pages": len(files),
+            "size": stored["size"],
+            "deduplicated": stored["deduplicated"]
+        }
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"File upload failed: {str(e)}")
 
 # --- Analysis Endpoint ---
 from pydantic import BaseModel
-import mimetypes
-from gemini_client import process_document, generate_explanation
-from rag_service import rag_service
+from gemini_client import embedding_cache, gemini_config
+from analysis_pipeline import analysis_cache, page_stats
+from jobs import job_queue
+from clients import client_pool
+import analysis_pipeline
+
+# Uploads referenced by queued or running jobs are never evicted
+storage_manager = StorageManager(blob_store, active_paths=job_queue.active_file_paths)
+storage_task = None
+
+@app.get("/metrics")
+def metrics():
+    """
+    Cache and pipeline counters for monitoring.
+    """
+    return {
+        "embedding_cache": embedding_cache.stats(),
+        "analysis_cache": analysis_cache.stats(),
+        "pages": page_stats,
+        "tts_cache": tts_service.audio_cache.stats(),
+        "jobs": job_queue.stats(),
+        "storage": storage_manager.stats(),
+        "services": services.status()["services"],
+        "clients": client_pool.stats(),
+        "executors": {
+            "analysis": analysis_executor.stats(),
+            "tts": tts_executor.stats()
+        }
+    }
 
 class AnalyzeRequest(BaseModel):
-    filename: str
+    document_id: Optional[str] = None # Handle returned by /upload
+    filename: Optional[str] = None # Files uploaded before content addressing
     language: str = "English"
 
-@app.post("/analyze")
+@app.on_event("startup")
+def start_job_workers():
+    job_queue.start()
+
+@app.on_event("startup")
+def start_services():
+    # The retrieval index loads in the background: the server accepts
+    # requests immediately and /ready reports when analysis can run
+    services.start_all()
+
+@app.on_event("startup")
+def warm_up_clients():
+    # Connect to the Google APIs in the background; startup does not wait
+    def warm_up():
+        try:
+            gemini_config.get() # The Gemini client needs the API key configured first
+        except Exception:
+            pass # Reported by /ready; warm_up records the failed connection
+        client_pool.warm_up()
+
+    if os.environ.get("CLIENT_WARMUP", "1") == "1":
+        threading.Thread(target=warm_up, name="client-warmup", daemon=True).start()
+
+@app.on_event("startup")
+async def start_storage_sweeper():
+    global storage_task
+    storage_task = asyncio.create_task(storage_manager.run_forever())
+
+@app.on_event("shutdown")
+def stop_job_workers():
+    job_queue.stop()
+
+@app.on_event("shutdown")
+async def stop_storage_sweeper():
+    if storage_task is not None:
+        storage_task.cancel()
+
+@app.post("/analyze", status_code=202)
 async def analyze_document(request: AnalyzeRequest):
     """
-    Orchestrates the full flow:
-    1. Read file from uploads/
+    Queues the full flow as a background job and returns its ID.
+    Poll GET /jobs/{job_id} for stage-by-stage progress and the result.
+    1. Read the uploaded blob
     2. Vision API (Gemini) -> Extract Text
     3. RAG Search -> Find Laws
     4. Generation (Gemini) -> Explain in Loc Lang
     """
-    file_path = f"{UPLOAD_DIR}/{request.filename}"
-    
-    if not os.path.exists(file_path):
-        raise HTTPException(status_code=404, detail="File not found")
-        
-    # 1. Determine Mime Type
-    mime_type, _ = mimetypes.guess_type(file_path)
-    if not mime_type:
-        mime_type = "application/octet-stream" # Default
+    file_path, file_hash = await run_in_threadpool(resolve_document, request.document_id, request.filename)
         
     try:
-        # 2. Extract Text (Vision)
-        print(f"Processing {request.filename} (Vision)...")
-        doc_text = process_document(file_path, mime_type)
-        
-        # 3. Retrieve Knowledge (RAG)
-        # We use a snippet of the doc text to query the DB (First 1000 chars)
-        query_text = doc_text[:1000] 
-        print("Querying Knowledge Base...")
-        retrieved_docs = rag_service.query(query_text)
-        context_str = "\n\n".join(retrieved_docs)
-        
-        # 4. Generate Explanation
-        print(f"Generating Explanation in {request.language}...")
-        explanation = generate_explanation(doc_text, context_str, request.language)
-        
-        return {
-            "original_text_summary": doc_text[:200] + "...",
-            "explanation": explanation,
-            "related_laws": retrieved_docs
-        }
+        # Identical in-flight jobs (same file content + language) are reused
+        job_id, deduplicated = await run_in_threadpool(job_queue.submit, file_path, request.language, file_hash)
+        return {"job_id": job_id, "status_url": f"/jobs/{job_id}", "deduplicated": deduplicated}
         
+    except ServerBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
-        print(f"Error during analysis: {e}")
+        print(f"Error queueing analysis: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def sse_event(event: str, data) -> str:
+    """Formats one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.get("/analyze/stream")
+async def analyze_document_stream(document_id: Optional[str] = None, filename: Optional[str] = None,
+                                  language: str = "English"):
+    """
+    Runs the flow and streams progress as Server-Sent Events (GET, so the
+    browser's EventSource can consume it):
+    - `summary`: the extracted text preview, as soon as extraction finishes
+    - `context`: the related laws, as soon as retrieval finishes
+    - `token`:   explanation text, piece by piece, as it is generated
+    - `done`:    the same payload as a finished /analyze job
+    - `error`:   {"status", "detail"} if a stage fails
+    """
+    file_path, file_hash = await run_in_threadpool(resolve_document, document_id, filename)
+
+    async def events():
+        # Not evicted while this stream reads it
+        with blob_store.pin(file_path):
+            stream = None
+            try:
+                extraction = await analysis_executor.run(analysis_pipeline.extract_text, file_path, file_hash)
+                yield sse_event("summary", {"original_text_summary": analysis_pipeline.summarize(extraction["text"])})
+
+                context = await analysis_executor.run(
+                    analysis_pipeline.retrieve_context, extraction["text"], extraction["text_hash"])
+                yield sse_event("context", {"related_laws": context["documents"], "retrieval": context["retrieval"]})
+
+                # Each step of the (blocking) model stream runs on the executor
+                stream = analysis_pipeline.explain_stream(
+                    extraction["text"], extraction["text_hash"], context, language)
+                while True:
+                    item = await analysis_executor.run(next, stream, None)
+                    if item is None:
+                        break
+                    if "delta" in item:
+                        yield sse_event("token", {"text": item["delta"]})
+                    else:
+                        explanation = item
+
+                yield sse_event("done", analysis_pipeline.build_response(extraction, context, explanation))
+            except ServerBusyError as e:
+                yield sse_event("error", {"status": 503, "detail": str(e)})
+            except Exception as e:
+                print(f"Error during streaming analysis: {e}")
+                yield sse_event("error", {"status": 500, "detail": str(e)})
+            finally:
+                # On client disconnect a `next` may still be running in a worker
+                if stream is not None and not stream.gi_running:
+                    stream.close()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Reports a job's status (queued/running/done/failed), per-stage progress
+    and, once done, the analysis result.
+    """
+    job = await run_in_threadpool(job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 # --- TTS Endpoint ---
 class TTSRequest(BaseModel):
     text: str
@@ -121,7 +332,8 @@ class TTSRequest(BaseModel):
 async def text_to_speech(request: TTSRequest):
     """
     Generates speech from text using Google Cloud TTS.
-    Returns an MP3 audio stream.
+    Returns an MP3 audio stream; audio for the first sentences is sent
+    while the rest is still being synthesized.
     """
     try:
         print(f"Received TTS request. Text length: {len(request.text)}, Language: {request.language}")
@@ -144,12 +356,28 @@ async def text_to_speech(request: TTSRequest):
         # Default to English if not found
         lang_code = lang_map.get(request.language, "en-US")
         
-        audio_content = tts_service.generate_speech(request.text, lang_code)
-        
+        # Chunks are synthesized concurrently and streamed in order. The
+        # first chunk is awaited here, so errors still map to an HTTP status.
+        chunks = tts_service.stream_speech(request.text, lang_code)
+        first_chunk = await tts_executor.run(next, chunks, None)
+
+        async def audio_stream():
+            try:
+                chunk = first_chunk
+                while chunk is not None:
+                    yield chunk
+                    chunk = await tts_executor.run(next, chunks, None)
+            finally:
+                # On client disconnect a `next` may still be running in a worker
+                if not chunks.gi_running:
+                    chunks.close()
+
         return StreamingResponse(
-            io.BytesIO(audio_content), 
+            audio_stream(), 
             media_type="audio/mpeg"
         )
+    except ServerBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
         print(f"TTS Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
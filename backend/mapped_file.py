@@ -0,0 +1,59 @@
+import json
+import os
+import struct
+from typing import Dict
+
+import numpy as np
+
+# --- File layout ---
+# [8-byte magic][uint64 header length][JSON header][8-byte aligned sections]
+# The header is the caller's metadata plus, for every section, its byte
+# offset, dtype and size, so sections can be memory-mapped in place.
+_ALIGN = 8
+
+
+def write_sections(path: str, magic: bytes, header: Dict, sections: Dict[str, np.ndarray]):
+    """Writes a section file atomically (temp file + rename)."""
+    layout = {}
+    offset = 0
+    for name, data in sections.items():
+        layout[name] = {"offset": offset, "nbytes": data.nbytes, "dtype": data.dtype.str}
+        offset += data.nbytes + (-data.nbytes % _ALIGN)
+
+    encoded = json.dumps(dict(header, sections=layout)).encode("utf-8")
+    encoded += b" " * (-(len(magic) + 8 + len(encoded)) % _ALIGN)
+
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(magic)
+        f.write(struct.pack("<Q", len(encoded)))
+        f.write(encoded)
+        for data in sections.values():
+            f.write(np.ascontiguousarray(data).tobytes())
+            f.write(b"\0" * (-data.nbytes % _ALIGN))
+    os.replace(tmp_path, path)
+
+
+def read_header(path: str, magic: bytes, kind: str) -> Dict:
+    """Reads only the JSON header. Raises ValueError if `path` is not a `kind` file."""
+    with open(path, "rb") as f:
+        if f.read(len(magic)) != magic:
+            raise ValueError(f"{path} is not a {kind} file.")
+        (header_len,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_len))
+    header["data_offset"] = len(magic) + 8 + header_len
+    return header
+
+
+def map_sections(path: str, header: Dict, mmap: bool = True) -> Dict[str, np.ndarray]:
+    """
+    Every section as an array of its dtype: read-only memory-mapped views of
+    the file (pages shared by all processes mapping it), or copies if `mmap`
+    is False.
+    """
+    raw = np.memmap(path, dtype=np.uint8, mode="r") if mmap else np.fromfile(path, dtype=np.uint8)
+    arrays = {}
+    for name, info in header["sections"].items():
+        start = header["data_offset"] + info["offset"]
+        arrays[name] = raw[start:start + info["nbytes"]].view(np.dtype(info["dtype"]))
+    return arrays
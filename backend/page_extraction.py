@@ -0,0 +1,155 @@
+import hashlib
+import os
+import shutil
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, List
+
+import pypdf
+
+from pdf_text import is_usable_text, page_fingerprint, page_text, write_page
+from storage import COPY_CHUNK_BYTES, MAX_UPLOAD_BYTES
+
+# --- Configuration ---
+PAGE_WORKERS = int(os.environ.get("PAGE_WORKERS", "4")) # Concurrent vision calls, shared by all requests
+PAGE_RETRIES = int(os.environ.get("PAGE_RETRIES", "2")) # Retries after the first attempt
+PAGE_RETRY_DELAY = float(os.environ.get("PAGE_RETRY_DELAY", "1")) # Seconds, doubled per retry
+
+# Page images accepted inside a multi-image (.zip) upload
+IMAGE_TYPES = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".webp": "image/webp",
+    ".heic": "image/heic",
+}
+# ZIP comment marking a bundle written by /upload/pages; other ZIPs (.docx,
+# .xlsx, arbitrary archives) are not page bundles
+PAGE_BUNDLE_COMMENT = b"document-scanner page bundle v1"
+MAX_BUNDLE_PAGES = int(os.environ.get("MAX_BUNDLE_PAGES", "200"))
+
+_page_pool = ThreadPoolExecutor(max_workers=PAGE_WORKERS, thread_name_prefix="page")
+
+
+def _sha256_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def bundle_members(archive: zipfile.ZipFile) -> List[zipfile.ZipInfo]:
+    """
+    The page images of a /upload/pages bundle, in page order. Checked from
+    the central directory before anything is decompressed: the bundle must
+    carry PAGE_BUNDLE_COMMENT, hold at most MAX_BUNDLE_PAGES uncompressed
+    (ZIP_STORED) page images and no other members, and total at most
+    MAX_UPLOAD_BYTES. Raises ValueError otherwise.
+    """
+    if archive.comment != PAGE_BUNDLE_COMMENT:
+        raise ValueError("Unsupported ZIP upload: only page bundles from /upload/pages are accepted.")
+    members = archive.infolist()
+    if not members or len(members) > MAX_BUNDLE_PAGES:
+        raise ValueError(f"A page bundle must hold 1 to {MAX_BUNDLE_PAGES} pages.")
+    for info in members:
+        if (info.is_dir() or info.compress_type != zipfile.ZIP_STORED
+                or os.path.splitext(info.filename)[1].lower() not in IMAGE_TYPES):
+            raise ValueError(f"Unexpected member in page bundle: {info.filename}")
+    if sum(info.file_size for info in members) > MAX_UPLOAD_BYTES:
+        raise ValueError(f"Page bundle exceeds the {MAX_UPLOAD_BYTES // (1024 * 1024)} MB limit.")
+    return sorted(members, key=lambda info: info.filename)
+
+
+def split_units(file_path: str, mime_type: str, workdir: str) -> List[Dict]:
+    """
+    Breaks an upload into page units, in reading order:
+    - PDF: one unit per page. Pages with a usable text layer carry their
+      `text`; the others are written to single-page PDFs in `workdir`.
+    - Page bundle from /upload/pages: one unit per image, by name (other
+      ZIPs are rejected, see bundle_members).
+    - Anything else (a single image): one unit.
+    Units that need the vision model have `path`, `mime_type` and a content
+    `hash`; locally readable units have `text` instead.
+    """
+    if mime_type == "application/pdf":
+        units = []
+        for i, page in enumerate(pypdf.PdfReader(file_path).pages):
+            text = page_text(page)
+            if is_usable_text(text):
+                units.append({"index": i, "text": text})
+                continue
+            path = os.path.join(workdir, f"page_{i}.pdf")
+            write_page(page, path)
+            units.append({"index": i, "path": path, "mime_type": mime_type, "hash": page_fingerprint(page)})
+        return units
+
+    if mime_type in ("application/zip", "application/x-zip-compressed"):
+        units = []
+        with zipfile.ZipFile(file_path) as archive:
+            for i, info in enumerate(bundle_members(archive)):
+                ext = os.path.splitext(info.filename)[1].lower()
+                path = os.path.join(workdir, f"page_{i}{ext}")
+                with archive.open(info) as member, open(path, "wb") as f:
+                    shutil.copyfileobj(member, f, COPY_CHUNK_BYTES)
+                with open(path, "rb") as f:
+                    page_hash = _sha256_bytes(f.read())
+                units.append({"index": i, "path": path, "mime_type": IMAGE_TYPES[ext], "hash": page_hash})
+        return units
+
+    with open(file_path, "rb") as f:
+        file_hash = _sha256_bytes(f.read())
+    return [{"index": 0, "path": file_path, "mime_type": mime_type, "hash": file_hash}]
+
+
+def _extract_with_retry(unit: Dict, vision_fn: Callable[[str, str], str], retries: int) -> str:
+    for attempt in range(retries + 1):
+        try:
+            return vision_fn(unit["path"], unit["mime_type"])
+        except Exception as e:
+            if attempt == retries:
+                raise
+            print(f"[Page {unit['index'] + 1}] Attempt {attempt + 1} failed: {e}. Retrying...")
+            time.sleep(PAGE_RETRY_DELAY * (2 ** attempt))
+
+
+def extract_units(units: List[Dict], vision_fn: Callable[[str, str], str], cache=None,
+                  retries: int = PAGE_RETRIES) -> Dict:
+    """
+    Extracts every page unit and reassembles the text in page order.
+    Units needing vision run concurrently on the shared page pool, each with
+    its own retries. With an AnalysisCache, results are cached per page
+    content hash (stage "page"), so re-uploads only reprocess changed pages
+    and a failed extraction keeps the pages that did succeed.
+    Returns {"text", "pages": {"total", "local", "remote", "cached"}}.
+    """
+    texts: Dict[int, str] = {}
+    futures = {}
+    cached = 0
+    for unit in units:
+        if "text" in unit:
+            texts[unit["index"]] = unit["text"]
+            continue
+        hit = cache.get("page", unit["hash"]) if cache is not None else None
+        if hit is not None:
+            texts[unit["index"]] = hit
+            cached += 1
+        else:
+            futures[_page_pool.submit(_extract_with_retry, unit, vision_fn, retries)] = unit
+
+    # Wait for every page, so successful ones are cached even if another fails
+    wait(futures)
+    errors = []
+    for future, unit in futures.items():
+        try:
+            texts[unit["index"]] = future.result()
+        except Exception as e:
+            errors.append(f"page {unit['index'] + 1}: {e}")
+            continue
+        if cache is not None:
+            cache.put("page", unit["hash"], texts[unit["index"]])
+    if errors:
+        raise Exception(f"Failed to extract {len(errors)} of {len(units)} pages ({'; '.join(errors)})")
+
+    local = sum(1 for unit in units if "text" in unit)
+    return {
+        "text": "\n".join(texts[i] for i in sorted(texts)),
+        "pages": {"total": len(units), "local": local, "remote": len(futures), "cached": cached},
+    }
@@ -0,0 +1,78 @@
+import hashlib
+import os
+from typing import Iterator, List
+
+import pypdf
+
+# --- Configuration ---
+# A page needs at least this many non-space characters of embedded text, and
+# mostly real characters, to skip the vision model.
+MIN_PAGE_CHARS = int(os.environ.get("PDF_MIN_PAGE_CHARS", "80"))
+MIN_PRINTABLE_RATIO = 0.85
+
+
+def page_text(page: pypdf.PageObject) -> str:
+    """The page's embedded text ("" if it has none or fails to parse)."""
+    try:
+        return page.extract_text() or ""
+    except Exception as e:
+        print(f"Error extracting page text: {e}")
+        return ""
+
+
+def iter_pages(pdf_path: str) -> Iterator[str]:
+    """
+    Yields the embedded text of each page in order, parsing one page at a
+    time ("" where a page has none or fails to parse). Raises if the file
+    is not a readable PDF.
+    """
+    reader = pypdf.PdfReader(pdf_path)
+    for page in reader.pages:
+        yield page_text(page)
+
+
+def extract_pages(pdf_path: str) -> List[str]:
+    """Returns the embedded text of every page (see iter_pages)."""
+    return list(iter_pages(pdf_path))
+
+
+def is_usable_text(text: str) -> bool:
+    """
+    True if a page's text layer looks like real text rather than a scan:
+    long enough, and not dominated by glyph garbage (missing font maps
+    produce replacement characters, "(cid:123)" runs or control codes).
+    """
+    chars = "".join(text.split())
+    if len(chars) < MIN_PAGE_CHARS or "(cid:" in text:
+        return False
+    printable = sum(1 for c in chars if c.isprintable() and c != "�")
+    return printable / len(chars) >= MIN_PRINTABLE_RATIO
+
+
+def page_fingerprint(page: pypdf.PageObject) -> str:
+    """
+    Content hash of a single page: its drawing commands, the raw data of the
+    images/forms it references, its size and rotation. Identical pages in
+    different files (or re-uploads) hash the same.
+    """
+    h = hashlib.sha256()
+    h.update(f"{list(page.mediabox)}:{page.get('/Rotate', 0)}".encode())
+    contents = page.get_contents()
+    if contents is not None:
+        h.update(contents.get_data())
+    resources = page.get("/Resources")
+    xobjects = resources.get_object().get("/XObject") if resources else None
+    if xobjects:
+        xobjects = xobjects.get_object()
+        for name in sorted(xobjects):
+            h.update(name.encode())
+            h.update(getattr(xobjects[name].get_object(), "_data", b"") or b"")
+    return h.hexdigest()
+
+
+def write_page(page: pypdf.PageObject, destination: str):
+    """Writes a single page to a new PDF file."""
+    writer = pypdf.PdfWriter()
+    writer.add_page(page)
+    with open(destination, "wb") as f:
+        writer.write(f)
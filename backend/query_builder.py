@@ -0,0 +1,99 @@
+import os
+import re
+from typing import Dict, List
+
+from chunking import chunk_pages, estimate_tokens
+from text_analyzer import Analyzer
+
+# --- Configuration ---
+MULTI_QUERY = os.environ.get("RAG_MULTI_QUERY", "1") == "1" # Else: one query from the opening characters
+MAX_SUB_QUERIES = int(os.environ.get("RAG_MAX_SUB_QUERIES", "4"))
+PASSAGE_TOKENS = 96 # Size of a passage sub-query (a few sentences)
+SINGLE_QUERY_CHARS = 1000 # The query when multi-query retrieval is off
+MAX_ENTITIES = 8 # Per kind, in order of first mention
+MIN_PASSAGE_CUES = 2 # Distinct cue words / references a passage needs to become a sub-query
+
+# --- Entities ---
+# "Section 135", "Sec. 56(1)", "u/s 126", "S. 43A"
+SECTION_REF = re.compile(r"\b(?:Section|Sec\.|u/s|S\.)\s*(\d{1,3}[A-Z]{0,2}(?:\s*\(\d{1,2}\))*)", re.IGNORECASE)
+# "Electricity Act, 2003", "Consumer Protection Act 2019", "National Food Security Act"
+ACT_NAME = re.compile(r"\b((?:[A-Z][A-Za-z&'-]*\s+){1,6}Act)\b(?:,?\s*((?:19|20)\d\d))?")
+# "Rs. 1,250.00", "₹ 500", "INR 12,000"
+AMOUNT = re.compile(r"(?:₹|\bRs\.?|\bINR)\s*\d[\d,]*(?:\.\d+)?", re.IGNORECASE)
+
+# Words marking the passages of a notice or bill that say what the law
+# requires, compared as keyword terms (so "payments", "धाराओं" and
+# "சட்டத்தின்" count too)
+_ANALYZER = Analyzer()
+LEGAL_CUES = frozenset(_ANALYZER.analyze("""
+act section rule regulation clause penalty fine liable offence due pay payment arrears surcharge
+disconnection notice default court order appeal complaint hearing assessment tariff
+scheme eligible subsidy entitled beneficiary
+अधिनियम धारा नियम जुर्माना दंड बकाया भुगतान नोटिस शिकायत अपील आदेश योजना पात्र
+சட்டம் பிரிவு விதி அபராதம் நிலுவை கட்டணம் அறிவிப்பு புகார் மேல்முறையீடு உத்தரவு திட்டம் தகுதி
+"""))
+
+
+def _unique(values: List[str], limit: int) -> List[str]:
+    return list(dict.fromkeys(values))[:limit]
+
+
+def _section_label(number: str) -> str:
+    """Normalized label of a section number, e.g. "56 (1)" -> "Section 56(1)"."""
+    return "Section " + re.sub(r"\s+", "", number).upper()
+
+
+def extract_entities(text: str) -> Dict[str, List[str]]:
+    """Acts, section numbers and amounts mentioned in `text`, normalized, in order of first mention."""
+    acts = []
+    for name, year in ACT_NAME.findall(text):
+        name = re.sub(r"^(?:The|This|Under|And|Of)\s+", "", " ".join(name.split()))
+        acts.append(f"{name}, {year}" if year else name)
+    sections = [_section_label(number) for number in SECTION_REF.findall(text)]
+    amounts = [" ".join(amount.split()) for amount in AMOUNT.findall(text)]
+    return {
+        "acts": _unique(acts, MAX_ENTITIES),
+        "sections": _unique(sections, MAX_ENTITIES),
+        "amounts": _unique(amounts, MAX_ENTITIES),
+    }
+
+
+def cue_count(text: str) -> int:
+    """Distinct legal cue words in `text`, plus two per act, section or amount."""
+    hits = len(LEGAL_CUES.intersection(_ANALYZER.analyze(text)))
+    return hits + 2 * (len(SECTION_REF.findall(text)) + len(ACT_NAME.findall(text)) + len(AMOUNT.findall(text)))
+
+
+def build_queries(doc_text: str, max_queries: int = MAX_SUB_QUERIES) -> List[Dict]:
+    """
+    Sub-queries covering the whole document, instead of its opening only:
+    - "opening": the first passage (what the document is: bill, notice, ...),
+    - "entities": the acts, sections and amounts it mentions,
+    - "passage": its passages densest in legal references and cue words,
+      wherever they are (demands and citations are often near the end).
+    Each is {"kind", "text"}; a short document is a single query.
+    With MULTI_QUERY off, returns the opening SINGLE_QUERY_CHARS only.
+    """
+    doc_text = doc_text.strip()
+    if not MULTI_QUERY or max_queries <= 1:
+        return [{"kind": "opening", "text": doc_text[:SINGLE_QUERY_CHARS]}]
+
+    chunks = list(chunk_pages([doc_text], max_tokens=PASSAGE_TOKENS, overlap_tokens=0))
+    if len(chunks) <= 1:
+        return [{"kind": "opening", "text": doc_text}]
+    # Without the section heading chunk_pages repeats at the start of each passage
+    passages = [c["text"][len(c["heading"]):].strip() if c["heading"] and i else c["text"] for i, c in enumerate(chunks)]
+
+    queries = [{"kind": "opening", "text": passages[0]}]
+    entities = extract_entities(doc_text)
+    entity_text = " ".join(entities["acts"] + entities["sections"] + entities["amounts"])
+    if entity_text:
+        queries.append({"kind": "entities", "text": entity_text})
+
+    # Densest first: cue words per token
+    cues = {i: cue_count(passages[i]) for i in range(1, len(passages))}
+    candidates = [i for i in cues if cues[i] >= MIN_PASSAGE_CUES]
+    candidates.sort(key=lambda i: cues[i] / (1 + estimate_tokens(passages[i])), reverse=True)
+    chosen = sorted(candidates[:max(0, max_queries - len(queries))]) # In document order
+    queries.extend({"kind": "passage", "text": passages[i]} for i in chosen)
+    return queries
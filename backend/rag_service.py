@@ -1,14 +1,105 @@
-import chromadb
-from chromadb.utils import embedding_functions
-from typing import List, Dict
+from typing import List, Dict, Optional
+import multiprocessing
 import os
-import pickle
-from rank_bm25 import BM25Okapi
-from gemini_client import embed_text, configure_gemini
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from bm25_index import BM25Index, corpus_fingerprint
+from document_store import DocumentStore
+from gemini_client import embed_texts_cached, gemini_config
+from embedding_pipeline import BatchEmbedder
+from lifecycle import LazyService, services
+from text_analyzer import Analyzer
+
+try:
+    import fcntl
+except ImportError: # Windows: no cross-process index lock (run a single worker)
+    fcntl = None
 
 # --- Configuration ---
 PERSIST_DIRECTORY = "db_storage"
-BM25_PERSIST_PATH = os.path.join(PERSIST_DIRECTORY, "bm25.pkl")
+BM25_PERSIST_PATH = os.path.join(PERSIST_DIRECTORY, "bm25.idx")
+BM25_LOCK_PATH = os.path.join(PERSIST_DIRECTORY, "bm25.lock")
+DOCS_PERSIST_PATH = os.path.join(PERSIST_DIRECTORY, "docs.store") # Chunk texts, numbered like the index slots
+# How often (seconds) a worker checks whether another process published a new index
+RELOAD_CHECK_INTERVAL = float(os.environ.get("RAG_RELOAD_INTERVAL", "2"))
+# Keyword analysis (text_analyzer.py), shared by indexing and queries
+ANALYZER = Analyzer(
+    stop_words=os.environ.get("RAG_STOP_WORDS", "1") == "1",
+    stem=os.environ.get("RAG_STEMMING", "1") == "1"
+)
+TOKENIZER_NAME = ANALYZER.name # Stored with the index; a change forces a rebuild
+
+# Per-leg deadlines (seconds) for hybrid retrieval
+VECTOR_LEG_TIMEOUT = float(os.environ.get("RAG_VECTOR_TIMEOUT", "10"))
+KEYWORD_LEG_TIMEOUT = float(os.environ.get("RAG_KEYWORD_TIMEOUT", "2"))
+# Total latency budget (seconds) of one retrieval, every sub-query included
+QUERY_BUDGET = float(os.environ.get("RAG_QUERY_BUDGET", "10"))
+# Runs of one leg allowed at once, stragglers past their deadline included;
+# beyond it the leg is skipped, so a hung backend cannot occupy every thread
+LEG_MAX_IN_FLIGHT = int(os.environ.get("RAG_LEG_MAX_IN_FLIGHT", "4"))
+RETRIEVAL_LEGS = ("vector", "keyword")
+
+def tokenize(text: str) -> List[str]:
+    """Keyword index terms of a document or query (the same analysis for both)."""
+    return ANALYZER.analyze(text)
+
+@contextmanager
+def index_lock():
+    """
+    Exclusive lock on the persisted index, shared by every process using
+    PERSIST_DIRECTORY (uvicorn workers, ingestion): one process builds or
+    publishes the index while the others wait, then open its file.
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(BM25_LOCK_PATH, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def fetch_collection(collection, include_documents: bool, page_size: int = 5000):
+    """
+    Reads IDs (and optionally documents) from Chroma in pages;
+    one unbounded get() fails on large collections.
+    """
+    ids, documents = [], []
+    offset = 0
+    while True:
+        page = collection.get(
+            include=["documents"] if include_documents else [],
+            limit=page_size,
+            offset=offset
+        )
+        ids.extend(page['ids'])
+        if include_documents:
+            documents.extend(page['documents'])
+        if len(page['ids']) < page_size:
+            return ids, documents
+        offset += page_size
+
+def build_index_file() -> str:
+    """
+    Builds the BM25 index and the document store from every document in the
+    collection and saves them to BM25_PERSIST_PATH / DOCS_PERSIST_PATH.
+    Returns the corpus fingerprint they were built for.
+    Run in a short-lived process (see RAGService._build_index_file), so a
+    serving worker never holds the whole corpus or the in-memory build.
+    """
+    import chromadb
+    collection = chromadb.PersistentClient(path=PERSIST_DIRECTORY).get_collection("legal_knowledge_base")
+    ids, documents = fetch_collection(collection, include_documents=True)
+    bm25 = BM25Index()
+    bm25.add_many(ids, ANALYZER.analyze_many(documents))
+    fingerprint = corpus_fingerprint(ids)
+    # Store first: a worker that sees the new index file finds a matching store
+    DocumentStore.write(DOCS_PERSIST_PATH, ids, documents, fingerprint=fingerprint)
+    bm25.save(BM25_PERSIST_PATH, fingerprint=fingerprint, meta={"tokenizer": TOKENIZER_NAME})
+    return fingerprint
 
 class RAGService:
     def __init__(self):
@@ -17,63 +108,256 @@ class RAGService:
         Uses a local persistent storage.
         """
         print("Initializing RAG Service...")
-        configure_gemini() # Ensure API is set up
+        gemini_config.get() # Ensure API is set up
         
         # Ensure directory exists
         os.makedirs(PERSIST_DIRECTORY, exist_ok=True)
         
+        import chromadb # Deferred: importing it takes longer than the rest of the app
         self.client = chromadb.PersistentClient(path=PERSIST_DIRECTORY)
         
         # Create or Get a collection
-        self.collection = self.client.get_or_create_collection(
-            name="legal_knowledge_base",
-            metadata={"hnsw:space": "cosine"} # Cosine similarity for semantic search
-        )
+        self.collection = self._open_collection()
         
+        # Batched, concurrent embedding for ingestion
+        self.embedder = BatchEmbedder()
+
+        # Runs the vector and keyword retrieval legs of a query in parallel;
+        # a thread for every leg run allowed in flight, so none waits for a thread
+        self._executor = ThreadPoolExecutor(
+            max_workers=LEG_MAX_IN_FLIGHT * len(RETRIEVAL_LEGS),
+            thread_name_prefix="rag-leg"
+        )
+        self._leg_slots = {name: threading.BoundedSemaphore(LEG_MAX_IN_FLIGHT) for name in RETRIEVAL_LEGS}
+
         # Initialize BM25
         self.bm25 = None
-        self.doc_registry = {} # ID -> Document Text mapping for fast lookup
+        self.documents = DocumentStore() # Chunk texts; the mapped store file once one matches
+        self._kb_version = "empty" # Corpus fingerprint; changes whenever documents are added
+        self._kb_stale = False # Documents were added since _kb_version was computed
+        self._kb_lock = threading.Lock() # Guards _kb_version / _kb_stale
+        self._index_stamp = None # (inode, mtime) of the index file in use, to detect a newer one
+        self._next_reload_check = 0.0
+        self._reload_lock = threading.Lock()
         self._sync_bm25()
         
         print(f"RAG Service Initialized. Collection count: {self.collection.count()}")
 
+    def _open_collection(self):
+        return self.client.get_or_create_collection(
+            name="legal_knowledge_base",
+            metadata={"hnsw:space": "cosine"} # Cosine similarity for semantic search
+        )
+
+    @property
+    def kb_version(self) -> str:
+        self._maybe_reload()
+        return self._current_kb_version()
+
+    def _current_kb_version(self) -> str:
+        """
+        The corpus fingerprint, recomputed only when it is needed after a change:
+        hashing every live ID on each add would make ingestion quadratic.
+        Readers arriving during the recomputation wait for the new version.
+        """
+        with self._kb_lock:
+            if self._kb_stale:
+                self._kb_version = corpus_fingerprint(self.bm25.live_doc_ids())
+                self._kb_stale = False
+            return self._kb_version
+
     def _sync_bm25(self):
         """
         Syncs the BM25 index with the ChromaDB collection.
-        Since BM25 is in-memory, we rebuild it or load it. 
-        For simplicity and robustness, we fetch all docs from Chroma to ensure 100% sync.
+        Opens the persisted index if its fingerprint (count + ID hash) matches
+        the collection; otherwise rebuilds it from all documents and saves it.
+        With several workers, only one rebuilds (under index_lock) and the
+        others open the file it saved; every worker serves from that file.
+        After startup, add_documents updates the index incrementally.
         """
         print("Syncing BM25 Index...")
         try:
-            # Fetch all documents from existing collection
-            data = self.collection.get()
-            ids = data['ids']
-            documents = data['documents']
+            # IDs only: cheap compared to fetching every document
+            ids, _ = fetch_collection(self.collection, include_documents=False)
             
             if not ids:
                 print("Knowledge Base is empty. Skipping BM25 build.")
                 return
 
-            self.doc_registry = dict(zip(ids, documents))
-            
-            # Simple tokenization by splitting on whitespace
-            tokenized_corpus = [doc.lower().split() for doc in documents]
-            self.bm25 = BM25Okapi(tokenized_corpus)
-            self.bm25_ids = ids # Keep track of ID order in BM25
-            print("BM25 Index synced successfully.")
+            fingerprint = corpus_fingerprint(ids)
+            self._kb_version = fingerprint
+            if self._load_bm25(fingerprint):
+                print("BM25 Index loaded from disk.")
+                return
+
+            with index_lock():
+                # Another worker may have built it while this one waited
+                if self._load_bm25(fingerprint):
+                    print("BM25 Index loaded from disk (built by another process).")
+                    return
+
+                fingerprint = self._build_index_file()
+            if self._load_bm25(fingerprint):
+                self._kb_version = fingerprint
+                print("BM25 Index rebuilt successfully.")
             
         except Exception as e:
             print(f"Error syncing BM25: {e}")
 
+    def _build_index_file(self) -> str:
+        """Runs build_index_file in a child process (here if processes are unavailable)."""
+        if multiprocessing.current_process().daemon: # e.g. a multiprocessing.Pool worker
+            return build_index_file()
+        try:
+            # spawn: the child imports this module only, not the app or its threads
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                return pool.submit(build_index_file).result()
+        except (OSError, NotImplementedError, multiprocessing.ProcessError) as e:
+            print(f"Could not build the BM25 index in a child process ({e}); building here.")
+            return build_index_file()
+
+    def _load_bm25(self, fingerprint: str) -> bool:
+        """Loads the on-disk index if it matches the collection. Returns success."""
+        if not os.path.exists(BM25_PERSIST_PATH):
+            return False
+        try:
+            header = BM25Index.read_header(BM25_PERSIST_PATH)
+            if header.get("fingerprint") != fingerprint:
+                print("Persisted BM25 index is stale (fingerprint mismatch).")
+                return False
+            if header.get("meta", {}).get("tokenizer") != TOKENIZER_NAME:
+                print("Persisted BM25 index uses a different tokenizer.")
+                return False
+            stamp = self._file_stamp()
+            self.bm25 = BM25Index.load(BM25_PERSIST_PATH)
+            self.documents = self._load_documents(fingerprint)
+            self._index_stamp = stamp
+            return True
+        except Exception as e:
+            print(f"Could not load persisted BM25 index: {e}")
+            return False
+
+    @staticmethod
+    def _load_documents(fingerprint: str) -> DocumentStore:
+        """The persisted document store if it matches, else an empty one (texts then come from Chroma)."""
+        try:
+            if DocumentStore.read_header(DOCS_PERSIST_PATH).get("fingerprint") == fingerprint:
+                return DocumentStore.load(DOCS_PERSIST_PATH)
+            print("Persisted document store is stale; texts will be read from Chroma.")
+        except FileNotFoundError:
+            print("No persisted document store; texts will be read from Chroma.")
+        except Exception as e:
+            print(f"Could not load persisted document store: {e}")
+        return DocumentStore()
+
+    def persist_bm25(self):
+        """
+        Saves the keyword index next to the Chroma data for fast cold starts.
+        Call after a batch of add_documents (e.g. at the end of ingestion):
+        serving workers notice the new file and reload (see _maybe_reload).
+        """
+        with index_lock():
+            self._save_bm25()
+
+    def _save_bm25(self):
+        """Writes the document store and index files; the caller holds index_lock."""
+        if not self.bm25:
+            return
+        try:
+            self._save_documents()
+            self.bm25.save(
+                BM25_PERSIST_PATH,
+                fingerprint=self._current_kb_version(),
+                meta={"tokenizer": TOKENIZER_NAME}
+            )
+            self._index_stamp = self._file_stamp() # Our own file: nothing to reload
+            print(f"BM25 Index saved to {BM25_PERSIST_PATH}.")
+        except Exception as e:
+            print(f"Error saving BM25 index: {e}")
+
+    def _save_documents(self, page_size: int = 5000):
+        """
+        Writes the texts of the indexed documents, numbered in the index's slot
+        order; texts the store lacks (no store file yet) are read from Chroma.
+        """
+        ids = self.bm25.live_doc_ids()
+        missing = [doc_id for doc_id in ids if doc_id not in self.documents]
+        for start in range(0, len(missing), page_size):
+            page = self.collection.get(ids=missing[start:start + page_size], include=["documents"])
+            self.documents.add_many(page['ids'], page['documents'])
+        self.documents.save(DOCS_PERSIST_PATH, ids, fingerprint=self._current_kb_version())
+
+    @staticmethod
+    def _file_stamp() -> Optional[tuple]:
+        try:
+            stat = os.stat(BM25_PERSIST_PATH)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns)
+
+    def _maybe_reload(self):
+        """
+        Hot reload for multi-process serving. Another process (ingestion, or
+        a worker that rebuilt the index) publishes documents by saving a new
+        index file under index_lock; the file is replaced atomically, so a
+        stat every RELOAD_CHECK_INTERVAL seconds is enough to notice it.
+        The worker then maps the new file and reopens Chroma (whose vector
+        index is cached per process); queries in flight finish on the old ones.
+        """
+        now = time.monotonic()
+        if now < self._next_reload_check or not self._reload_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_reload_check = now + RELOAD_CHECK_INTERVAL
+            stamp = self._file_stamp()
+            if stamp is None or stamp == self._index_stamp:
+                return
+            header = BM25Index.read_header(BM25_PERSIST_PATH)
+            fingerprint = header.get("fingerprint")
+            if fingerprint == self._current_kb_version() or header.get("meta", {}).get("tokenizer") != TOKENIZER_NAME:
+                self._index_stamp = stamp
+                return
+            bm25 = BM25Index.load(BM25_PERSIST_PATH)
+            documents = self._load_documents(fingerprint)
+            self.client.clear_system_cache()
+            import chromadb
+            self.client = chromadb.PersistentClient(path=PERSIST_DIRECTORY)
+            self.collection = self._open_collection()
+            self.bm25, self.documents = bm25, documents
+            with self._kb_lock:
+                self._kb_version, self._kb_stale = fingerprint, False
+            self._index_stamp = stamp
+            print(f"Reloaded knowledge base: {bm25.num_docs} documents.")
+        except Exception as e:
+            print(f"Error reloading knowledge base: {e}")
+        finally:
+            self._reload_lock.release()
+
+    def _index_documents(self, documents: List[str], ids: List[str]):
+        """Adds new or changed documents to the keyword index and document store."""
+        if self.bm25 is None:
+            self.bm25 = BM25Index()
+        self.bm25.add_many(ids, ANALYZER.analyze_many(documents))
+        self.documents.add_many(ids, documents)
+        with self._kb_lock:
+            self._kb_stale = True
+
     def add_documents(self, documents: List[str], metadatas: List[Dict], ids: List[str]):
         """
         Adds documents to the knowledge base (Vector + Keyword).
         """
         print(f"Adding {len(documents)} documents to Knowledge Base...")
         
-        # 1. Generate Embeddings using Gemini
-        embeddings = [embed_text(doc) for doc in documents]
-        
+        # 1. Generate Embeddings using Gemini (batched, several requests in flight)
+        embeddings = self.embedder.embed(documents)
+        self.add_embedded(documents, embeddings, metadatas, ids)
+        print("Documents added successfully.")
+
+    def add_embedded(self, documents: List[str], embeddings: List[List[float]], metadatas: List[Dict], ids: List[str]):
+        """
+        Stores documents whose embeddings were already computed (e.g. by the
+        ingestion pipeline's embedding stage) in Chroma and the BM25 index.
+        """
         # 2. Add to Chroma
         self.collection.add(
             documents=documents,
@@ -82,71 +366,194 @@ class RAGService:
             ids=ids
         )
         
-        # 3. Update BM25 (Re-sync is safest for consistency)
-        self._sync_bm25()
+        # 3. Update BM25 incrementally (only the new documents are tokenized)
+        self._index_documents(documents, ids)
+
+    def _vector_leg(self, query_texts: List[str], n: int, deadline: float) -> Dict:
+        """
+        Embeddings (one batch request) + one Chroma ANN search for all queries,
+        until `deadline` (perf_counter time): the embedding request is cut off
+        at it, and the search is not started once it has passed (TimeoutError).
+        Returns {"ids": ranked IDs per query, "embed_ms", "search_ms"}.
+        """
+        start = time.perf_counter()
+        query_embeddings = embed_texts_cached(query_texts, deadline=deadline)
+        embedded = time.perf_counter()
+        if embedded >= deadline:
+            raise TimeoutError("Vector leg deadline passed before the search.")
+        vector_results = self.collection.query(
+            query_embeddings=query_embeddings,
+            n_results=n
+        )
+        return {
+            "ids": vector_results['ids'] or [[] for _ in query_texts],
+            "embed_ms": round((embedded - start) * 1000, 1),
+            "search_ms": round((time.perf_counter() - embedded) * 1000, 1),
+        }
+
+    def _keyword_leg(self, query_texts: List[str], n: int, deadline: float) -> Dict:
+        """
+        BM25 top-k search per query, until `deadline` (perf_counter time);
+        queries left when it passes are skipped.
+        Returns {"ids": ranked IDs per query, "ms": time per query (None if skipped)}.
+        """
+        if not self.bm25:
+            return {"ids": [[] for _ in query_texts], "ms": [0.0 for _ in query_texts]}
+        ids, times = [], []
+        for query_text in query_texts:
+            start = time.perf_counter()
+            if start >= deadline:
+                ids.append([])
+                times.append(None)
+                continue
+            top_n = self.bm25.top_n(tokenize(query_text), n)
+            ids.append([doc_id for doc_id, _ in top_n])
+            times.append(round((time.perf_counter() - start) * 1000, 2))
+        return {"ids": ids, "ms": times}
+
+    @staticmethod
+    def _rrf_fuse(ranked_lists: List[List[str]], n_results: int, k: int = 60) -> List[str]:
+        """Reciprocal Rank Fusion over several ranked ID lists."""
+        rrf_scores = {}
+        for ranked_ids in ranked_lists:
+            for rank, doc_id in enumerate(ranked_ids):
+                rrf_scores[doc_id] = rrf_scores.get(doc_id, 0) + (1 / (k + rank))
+
+        sorted_ids = sorted(rrf_scores.items(), key=lambda x: x[1], reverse=True)[:n_results]
+        return [doc_id for doc_id, _ in sorted_ids]
+
+    def _fetch_documents(self, doc_ids: List[str]) -> List[str]:
+        """
+        Texts of the final top results only: decoded from the document store,
+        with one batched Chroma fetch for any it lacks.
+        """
+        found = self.documents.get_many(doc_ids)
+        missing = [doc_id for doc_id in doc_ids if doc_id not in found]
+        if missing:
+            res = self.collection.get(ids=missing)
+            found.update(zip(res['ids'], res['documents']))
         
-        print("Documents added successfully.")
+        return [found[doc_id] for doc_id in doc_ids if doc_id in found]
 
-    def query(self, query_text: str, n_results: int = 3) -> List[str]:
+    def _run_legs(self, legs: Dict[str, tuple]) -> Dict[str, Dict]:
         """
-        Retrieves relevant context using Hybrid Search (RRF).
+        Runs retrieval legs concurrently, each with its own deadline.
+        `legs` maps name -> (callable taking the deadline, timeout seconds);
+        each leg's report holds its return value as "result". A leg that times
+        out, raises, or already has LEG_MAX_IN_FLIGHT runs going ("busy") is
+        reported with its status instead of failing the query.
+        A running leg cannot be cancelled, so legs stop themselves at their
+        deadline (perf_counter time) and give their thread back.
+        """
+        start = time.perf_counter()
+
+        def timed(fn, deadline):
+            leg_start = time.perf_counter()
+            result = fn(deadline)
+            return result, (time.perf_counter() - leg_start) * 1000
+
+        futures, report = {}, {}
+        for name, (fn, timeout) in legs.items():
+            slots = self._leg_slots[name]
+            if not slots.acquire(blocking=False):
+                print(f"[Warn] {name} retrieval skipped: {LEG_MAX_IN_FLIGHT} runs still in flight.")
+                report[name] = {"status": "busy", "ms": 0.0, "result": None}
+                continue
+            futures[name] = self._executor.submit(timed, fn, start + timeout)
+            futures[name].add_done_callback(lambda _, slots=slots: slots.release())
+        for name, future in futures.items():
+            timeout = legs[name][1]
+            remaining = max(0.0, timeout - (time.perf_counter() - start))
+            try:
+                result, elapsed_ms = future.result(timeout=remaining)
+                report[name] = {"status": "ok", "ms": round(elapsed_ms, 1), "result": result}
+            except FutureTimeoutError:
+                print(f"[Warn] {name} retrieval missed its {timeout}s deadline.")
+                report[name] = {"status": "timeout", "ms": round(timeout * 1000, 1), "result": None}
+            except Exception as e:
+                print(f"[Warn] {name} retrieval failed: {e}")
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                report[name] = {"status": "error", "ms": round(elapsed_ms, 1), "result": None, "error": str(e)}
+        return {name: report[name] for name in legs}
+
+    def query_with_metadata(self, query_text: str, n_results: int = 3, budget: Optional[float] = None) -> Dict:
+        """
+        Hybrid Search (RRF) for one query; see query_many.
         """
         print(f"Querying RAG for: '{query_text}'")
+        return self.query_many([query_text], n_results, budget)
+
+    def query_many(self, query_texts: List[str], n_results: int = 3, budget: Optional[float] = None) -> Dict:
+        """
+        Hybrid Search (RRF) for several sub-queries of one request (see
+        query_builder.py), with the vector and keyword legs running in parallel:
+        - vector: all sub-queries embedded in one batch and searched in one
+          Chroma query,
+        - keyword: one BM25 search per sub-query,
+        then every ranked list (two per sub-query) fused with RRF.
+        The request gets `budget` seconds (default QUERY_BUDGET) in total;
+        each leg keeps its own, shorter deadline within it.
+        Returns {"documents": [...], "retrieval": {...}} where "retrieval" holds
+        per-leg status/timings and per-sub-query timings and hits. If one leg
+        is slow or fails, results come from the other leg; only if both fail
+        is an exception raised.
+        """
+        start = time.perf_counter()
+        budget = QUERY_BUDGET if budget is None else budget
+        self._maybe_reload()
         
         # If empty, return empty
-        if self.collection.count() == 0:
-            return []
+        if not query_texts or self.collection.count() == 0:
+            return {"documents": [], "retrieval": {"legs": {}, "sub_queries": [], "degraded": False, "total_ms": 0.0}}
 
-        # --- 1. Vector Search ---
-        query_embedding = embed_text(query_text)
-        vector_results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=n_results * 2 # Fetch more for re-ranking
-        )
-        
-        vector_ids = vector_results['ids'][0] if vector_results['ids'] else []
-        
-        # --- 2. Keyword Search (BM25) ---
-        bm25_ids = []
-        if self.bm25:
-            tokenized_query = query_text.lower().split()
-            # Get scores for all docs is cleaner for RRF but slower. 
-            # We'll get top N*2 docs
-            # rank_bm25 doesn't give IDs directly, gives docs. 
-            # We maintained self.bm25_ids corresponding to the corpus used in init.
-            
-            scores = self.bm25.get_scores(tokenized_query)
-            top_n_indices = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:n_results * 2]
-            bm25_ids = [self.bm25_ids[i] for i in top_n_indices]
+        # Fetch more than needed from each leg for re-ranking
+        fetch_n = n_results * 2
+        remaining = max(0.0, budget - (time.perf_counter() - start))
+        report = self._run_legs({
+            "vector": (lambda deadline: self._vector_leg(query_texts, fetch_n, deadline), min(VECTOR_LEG_TIMEOUT, remaining)),
+            "keyword": (lambda deadline: self._keyword_leg(query_texts, fetch_n, deadline), min(KEYWORD_LEG_TIMEOUT, remaining)),
+        })
 
-        # --- 3. Reciprocal Rank Fusion (RRF) ---
-        k = 60 # RRF constant
-        rrf_scores = {}
+        if all(leg["status"] != "ok" for leg in report.values()):
+            details = ", ".join(f"{name}: {leg.get('error', leg['status'])}" for name, leg in report.items())
+            raise Exception(f"All retrieval legs failed ({details})")
 
-        # Rank Vector Results
-        for rank, doc_id in enumerate(vector_ids):
-            rrf_scores[doc_id] = rrf_scores.get(doc_id, 0) + (1 / (k + rank))
+        # --- Reciprocal Rank Fusion (RRF) ---
+        ranked = {name: (leg["result"] or {}).get("ids") or [[] for _ in query_texts] for name, leg in report.items()}
+        top_ids = self._rrf_fuse(ranked["vector"] + ranked["keyword"], n_results)
+        documents = self._fetch_documents(top_ids)
 
-        # Rank BM25 Results
-        for rank, doc_id in enumerate(bm25_ids):
-            rrf_scores[doc_id] = rrf_scores.get(doc_id, 0) + (1 / (k + rank))
+        legs = {}
+        for name, leg in report.items():
+            legs[name] = {key: value for key, value in leg.items() if key != "result"}
+            legs[name]["hits"] = sum(len(ids) for ids in ranked[name])
+        if report["vector"]["status"] == "ok":
+            legs["vector"].update({key: report["vector"]["result"][key] for key in ("embed_ms", "search_ms")})
+        keyword_ms = report["keyword"]["result"]["ms"] if report["keyword"]["status"] == "ok" else [None] * len(query_texts)
+        legs["keyword"]["skipped"] = keyword_ms.count(None) if report["keyword"]["status"] == "ok" else 0
+        sub_queries = [{
+            "query": query_text[:80],
+            "vector_hits": len(vector_ids),
+            "keyword_hits": len(keyword_ids),
+            "keyword_ms": ms, # None: skipped (budget spent) or the keyword leg failed
+        } for query_text, vector_ids, keyword_ids, ms in zip(query_texts, ranked["vector"], ranked["keyword"], keyword_ms)]
+        return {
+            "documents": documents,
+            "retrieval": {
+                "legs": legs,
+                "sub_queries": sub_queries,
+                "degraded": any(leg["status"] != "ok" for leg in report.values()) or legs["keyword"]["skipped"] > 0,
+                "total_ms": round((time.perf_counter() - start) * 1000, 1),
+            }
+        }
 
-        # Sort by RRF Score
-        sorted_ids = sorted(rrf_scores.items(), key=lambda x: x[1], reverse=True)[:n_results]
-        
-        # Retrieve Documents
-        final_docs = []
-        for doc_id, _ in sorted_ids:
-            # We can get doc from registry
-            if doc_id in self.doc_registry:
-                final_docs.append(self.doc_registry[doc_id])
-            else:
-                 # Fallback if registry out of sync
-                 res = self.collection.get(ids=[doc_id])
-                 if res['documents']:
-                     final_docs.append(res['documents'][0])
-        
-        return final_docs
+    def query(self, query_text: str, n_results: int = 3) -> List[str]:
+        """
+        Retrieves relevant context using Hybrid Search (RRF).
+        """
+        return self.query_with_metadata(query_text, n_results)["documents"]
 
 # Singleton Instance
-rag_service = RAGService()
+# Built on first use, or in the background at app start-up (see main.py):
+# opening Chroma and loading the BM25 index no longer happens on import
+rag_service = services.register(LazyService("rag", RAGService))
@@ -0,0 +1,64 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token-bucket rate limiter shared by every worker that talks to
+    the same API quota.
+
+    Tokens refill continuously at `rate` per second up to `capacity`.
+    When the backend reports a rate-limit error, `penalize()` pauses the whole
+    bucket, so all concurrent workers back off together instead of each
+    retrying on its own schedule.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._last_refill = now
+
+    def acquire(self, tokens: float = 1.0, timeout: float = None) -> bool:
+        """
+        Blocks until `tokens` are available, then consumes them.
+        With a `timeout` (seconds), gives up once it would pass and returns False.
+        """
+        if tokens > self.capacity:
+            raise ValueError("Requested more tokens than the bucket capacity.")
+        give_up = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._refill(now)
+                    if self._tokens >= tokens:
+                        self._tokens -= tokens
+                        return True
+                    wait = (tokens - self._tokens) / self.rate
+                if give_up is not None and now + wait > give_up:
+                    return False
+            time.sleep(wait)
+
+    def penalize(self, seconds: float):
+        """
+        Pauses the bucket for `seconds` and drains it, e.g. after a 429.
+        Overlapping penalties extend the pause rather than stacking.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + seconds)
+            self._tokens = 0.0
+            self._last_refill = self._paused_until
@@ -45,6 +45,7 @@ def initialize_knowledge_base():
              return
 
         rag_service.add_documents(documents, metadatas, ids)
+        rag_service.persist_bm25()
         print("[SUCCESS] Seeding Complete.")
         
     except Exception as e:
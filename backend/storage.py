@@ -0,0 +1,326 @@
+import asyncio
+import codecs
+import gzip
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import BinaryIO, Callable, Dict, Iterable, List, Optional
+
+# --- Configuration ---
+UPLOAD_DIR = "uploads"
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+COPY_CHUNK_BYTES = 1024 * 1024
+
+# Retention (see StorageManager)
+STORAGE_TTL = float(os.environ.get("STORAGE_TTL_SECONDS", str(7 * 24 * 3600))) # Unused this long -> deleted
+STORAGE_QUOTA_BYTES = int(os.environ.get("STORAGE_QUOTA_BYTES", str(2 * 1024 * 1024 * 1024)))
+STORAGE_COLD_TIER = os.environ.get("STORAGE_COLD_TIER", "0") == "1" # gzip blobs unused for STORAGE_COLD_AFTER
+STORAGE_COLD_AFTER = float(os.environ.get("STORAGE_COLD_AFTER_SECONDS", str(24 * 3600)))
+STORAGE_SWEEP_INTERVAL = float(os.environ.get("STORAGE_SWEEP_INTERVAL", "600"))
+STALE_PART_SECONDS = 3600 # Abandoned partial uploads
+
+# Already-compressed formats gain nothing from the cold tier
+PRECOMPRESSED_TYPES = {"image/jpeg", "image/png", "image/webp", "image/heic", "image/gif", "application/zip"}
+
+_HANDLE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds the size limit; maps to HTTP 413."""
+
+
+def sniff_mime_type(head: bytes) -> Optional[str]:
+    """Detects the document type from its first bytes (blobs have no extension)."""
+    if head.startswith(b"%PDF"):
+        return "application/pdf"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"PK\x03\x04"):
+        return "application/zip"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:8] == b"ftyp" and head[8:12] in (b"heic", b"heix", b"mif1", b"msf1"):
+        return "image/heic"
+    if head.startswith((b"GIF87a", b"GIF89a")):
+        return "image/gif"
+    try:
+        # Incremental: a multi-byte character cut off at the end is fine
+        codecs.getincrementaldecoder("utf-8")().decode(head)
+    except UnicodeDecodeError:
+        return None
+    return "text/plain" if b"\0" not in head else None
+
+
+class BlobStore:
+    """
+    Content-addressed store for uploaded documents.
+
+    Each upload is copied in fixed-size chunks to a temporary file while its
+    SHA-256 is computed and its size checked, then renamed to
+    `<root>/blobs/<first 2 hex digits>/<sha256>`. The hash is the document
+    handle: identical uploads share one blob, and later stages cache on it.
+    """
+
+    def __init__(self, root: str = UPLOAD_DIR, max_bytes: int = MAX_UPLOAD_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.blob_dir = os.path.join(root, "blobs")
+        self.tmp_dir = os.path.join(root, "tmp")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        self._pins = Counter()
+        self._pin_lock = threading.Lock()
+
+    @staticmethod
+    def is_handle(handle: str) -> bool:
+        return bool(_HANDLE.match(handle or ""))
+
+    def path(self, handle: str) -> str:
+        if not self.is_handle(handle):
+            raise ValueError(f"Invalid document handle: {handle!r}")
+        return os.path.join(self.blob_dir, handle[:2], handle)
+
+    def cold_path(self, handle: str) -> str:
+        return self.path(handle) + ".gz"
+
+    def exists(self, handle: str) -> bool:
+        return self.is_handle(handle) and (os.path.exists(self.path(handle)) or os.path.exists(self.cold_path(handle)))
+
+    def materialize(self, handle: str) -> str:
+        """
+        Returns the path of a readable blob, decompressing it from the cold
+        tier if needed, and marks it as recently used (mtime drives retention).
+        Raises FileNotFoundError if the blob is in neither tier.
+        """
+        path = self.path(handle)
+        try:
+            os.utime(path)
+            return path
+        except FileNotFoundError:
+            pass
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as out, gzip.open(self.cold_path(handle), "rb") as cold:
+                shutil.copyfileobj(cold, out, COPY_CHUNK_BYTES)
+            os.replace(tmp_path, path)
+        except FileNotFoundError:
+            # Another request rehydrated it between our two checks
+            if not os.path.exists(path):
+                raise
+            return path
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        try:
+            os.remove(self.cold_path(handle))
+        except FileNotFoundError: # Rehydrated concurrently
+            pass
+        return path
+
+    @contextmanager
+    def pin(self, path: str):
+        """Protects a stored file from retention while a request is using it."""
+        path = os.path.abspath(path)
+        with self._pin_lock:
+            self._pins[path] += 1
+        try:
+            yield
+        finally:
+            with self._pin_lock:
+                self._pins[path] -= 1
+                if self._pins[path] <= 0:
+                    del self._pins[path]
+
+    def pinned_paths(self) -> List[str]:
+        with self._pin_lock:
+            return list(self._pins)
+
+    def save_fileobj(self, fileobj: BinaryIO) -> Dict:
+        """
+        Streams a file object into the store. Raises UploadTooLarge as soon
+        as more than `max_bytes` have been read (nothing is kept).
+        Returns {"document_id", "size", "deduplicated"}.
+        """
+        h = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for chunk in iter(lambda: fileobj.read(COPY_CHUNK_BYTES), b""):
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise UploadTooLarge(f"Upload exceeds the {self.max_bytes // (1024 * 1024)} MB limit.")
+                    h.update(chunk)
+                    out.write(chunk)
+            return self._commit(tmp_path, h.hexdigest(), size)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def save_file(self, src_path: str) -> Dict:
+        """Stores a local file (e.g. a generated page bundle)."""
+        with open(src_path, "rb") as f:
+            return self.save_fileobj(f)
+
+    def _commit(self, tmp_path: str, handle: str, size: int) -> Dict:
+        dest = self.path(handle)
+        if self.exists(handle):
+            self.materialize(handle) # Refreshes its retention clock
+            return {"document_id": handle, "size": size, "deduplicated": True}
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        os.replace(tmp_path, dest) # Atomic: readers never see a partial blob
+        return {"document_id": handle, "size": size, "deduplicated": False}
+
+
+class StorageManager:
+    """
+    Retention for the upload store. Each `sweep()`:
+    - deletes abandoned partial uploads,
+    - deletes blobs (and pre-content-addressing files in the upload root)
+      unused for `ttl` seconds,
+    - optionally gzips blobs unused for `cold_after` seconds into a cold
+      tier (skipping formats that are already compressed); they are
+      decompressed again on next use,
+    - evicts least-recently-used files until the total is within `quota`.
+    Files referenced by queued/running jobs (`active_paths`) or pinned by a
+    request in progress are never touched. `run_forever()` sweeps every
+    `interval` seconds as a background task.
+    """
+
+    def __init__(self, store: BlobStore, active_paths: Callable[[], Iterable[str]] = lambda: [],
+                 ttl: float = STORAGE_TTL, quota: int = STORAGE_QUOTA_BYTES, cold_tier: bool = STORAGE_COLD_TIER,
+                 cold_after: float = STORAGE_COLD_AFTER, interval: float = STORAGE_SWEEP_INTERVAL):
+        self.store = store
+        self.active_paths = active_paths
+        self.ttl = ttl
+        self.quota = quota
+        self.cold_tier = cold_tier
+        self.cold_after = cold_after
+        self.interval = interval
+        self._lock = threading.Lock()
+        self.stored = {"hot_bytes": 0, "cold_bytes": 0, "files": 0}
+        self.evicted = {"ttl_files": 0, "ttl_bytes": 0, "quota_files": 0, "quota_bytes": 0}
+        self.cold = {"files": 0, "bytes_saved": 0}
+        self.last_sweep = None
+
+    def _files(self) -> List[Dict]:
+        """Every stored file with its size, mtime and tier."""
+        files = []
+        for entry in os.scandir(self.store.root): # Legacy flat uploads
+            if entry.is_file():
+                stat = entry.stat()
+                files.append({"path": entry.path, "size": stat.st_size, "mtime": stat.st_mtime, "cold": False})
+        for shard in os.scandir(self.store.blob_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                stat = entry.stat()
+                cold = entry.name.endswith(".gz")
+                files.append({"path": entry.path, "size": stat.st_size, "mtime": stat.st_mtime, "cold": cold,
+                              "handle": entry.name[:-3] if cold else entry.name})
+        return files
+
+    def _compress(self, path: str) -> Optional[int]:
+        """Moves a blob to the cold tier; returns bytes saved, or None if skipped."""
+        with open(path, "rb") as f:
+            if sniff_mime_type(f.read(16)) in PRECOMPRESSED_TYPES:
+                return None
+        stat = os.stat(path)
+        cold_path = path + ".gz"
+        fd, tmp_path = tempfile.mkstemp(dir=self.store.tmp_dir, suffix=".part")
+        try:
+            with open(path, "rb") as src, os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as out:
+                shutil.copyfileobj(src, out, COPY_CHUNK_BYTES)
+            os.utime(tmp_path, (stat.st_atime, stat.st_mtime)) # Keep the retention clock
+            os.replace(tmp_path, cold_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        os.remove(path)
+        return stat.st_size - os.path.getsize(cold_path)
+
+    def _remove(self, path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def sweep(self) -> Dict:
+        with self._lock:
+            start = time.time()
+            now = start
+            for entry in os.scandir(self.store.tmp_dir):
+                if entry.is_file() and now - entry.stat().st_mtime > STALE_PART_SECONDS:
+                    self._remove(entry.path)
+
+            protected = {os.path.abspath(p) for p in list(self.active_paths()) + self.store.pinned_paths()}
+            is_protected = lambda f: os.path.abspath(f["path"][:-3] if f["cold"] else f["path"]) in protected
+
+            kept = []
+            for f in self._files():
+                if now - f["mtime"] > self.ttl and not is_protected(f):
+                    if self._remove(f["path"]):
+                        self.evicted["ttl_files"] += 1
+                        self.evicted["ttl_bytes"] += f["size"]
+                    continue
+                if (self.cold_tier and not f["cold"] and "handle" in f
+                        and now - f["mtime"] > self.cold_after and not is_protected(f)):
+                    saved = self._compress(f["path"])
+                    if saved is not None:
+                        self.cold["files"] += 1
+                        self.cold["bytes_saved"] += saved
+                        f = {**f, "path": f["path"] + ".gz", "size": f["size"] - saved, "cold": True}
+                kept.append(f)
+
+            total = sum(f["size"] for f in kept)
+            if total > self.quota:
+                for f in sorted(kept, key=lambda f: f["mtime"]):
+                    if total <= self.quota:
+                        break
+                    if is_protected(f) or not self._remove(f["path"]):
+                        continue
+                    total -= f["size"]
+                    self.evicted["quota_files"] += 1
+                    self.evicted["quota_bytes"] += f["size"]
+                    kept.remove(f)
+
+            self.stored = {
+                "hot_bytes": sum(f["size"] for f in kept if not f["cold"]),
+                "cold_bytes": sum(f["size"] for f in kept if f["cold"]),
+                "files": len(kept),
+            }
+            self.last_sweep = {"at": start, "seconds": round(time.time() - start, 3)}
+            return self.stats()
+
+    async def run_forever(self):
+        """Sweeps periodically off the event loop; cancel the task to stop."""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self.sweep)
+            except Exception as e:
+                print(f"Storage sweep failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> Dict:
+        return {
+            "stored": dict(self.stored), # As of the last sweep
+            "evicted": dict(self.evicted),
+            "cold_tier": {"enabled": self.cold_tier, **self.cold},
+            "quota_bytes": self.quota,
+            "ttl_seconds": self.ttl,
+            "last_sweep": self.last_sweep,
+        }
+
+
+# Singleton Instance
+blob_store = BlobStore()
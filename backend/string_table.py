@@ -0,0 +1,102 @@
+import hashlib
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+# Arrays making up a table, as stored in mapped files (see mapped_file.py)
+SECTIONS = {
+    "blob": np.uint8,     # All strings, UTF-8 encoded, back to back
+    "offsets": np.int64,  # String i is blob[offsets[i]:offsets[i + 1]]
+    "hashes": np.uint64,  # Sorted 64-bit hashes of the strings ...
+    "hash_ids": np.uint32, # ... and the position of the string with each hash
+}
+
+
+def string_hash(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+class StringTable:
+    """
+    Read-only list of strings kept as flat arrays instead of Python objects:
+    one UTF-8 buffer, an offsets array and a sorted hash index for
+    string -> position lookups. The arrays may be memory-mapped, so
+    processes opening the same file share one copy of the table and a
+    string is only decoded when it is read.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        """`arrays` as returned by build() (or mapped from a file), keyed by SECTIONS."""
+        self._blob = arrays["blob"]
+        self._offsets = arrays["offsets"]
+        self._hashes = arrays["hashes"]
+        self._hash_ids = arrays["hash_ids"]
+
+    @staticmethod
+    def build(strings: Iterable[str], index: bool = True) -> Dict[str, np.ndarray]:
+        """
+        The arrays of a table holding `strings` (see SECTIONS). Without
+        `index`, the hash arrays are left empty and find() never matches
+        (for tables only read by position, such as document texts).
+        """
+        blob = bytearray() # Appended in place: no list of encoded copies
+        offsets = array('q', [0])
+        hashes = array('Q')
+        for s in strings:
+            data = s.encode("utf-8")
+            blob += data
+            offsets.append(len(blob))
+            if index:
+                hashes.append(string_hash(data))
+        hashes = np.frombuffer(hashes, dtype=np.uint64)
+        order = np.argsort(hashes, kind="stable")
+        return {
+            "blob": np.frombuffer(blob, dtype=np.uint8),
+            "offsets": np.frombuffer(offsets, dtype=np.int64),
+            "hashes": hashes[order],
+            "hash_ids": order.astype(np.uint32),
+        }
+
+    @classmethod
+    def from_strings(cls, strings: Iterable[str], index: bool = True) -> "StringTable":
+        return cls(cls.build(strings, index))
+
+    @staticmethod
+    def sections(name: str, strings: Iterable[str], index: bool = True) -> Dict[str, np.ndarray]:
+        """build() as file sections named "<name>.<part>"."""
+        return {f"{name}.{part}": array for part, array in StringTable.build(strings, index).items()}
+
+    @classmethod
+    def from_sections(cls, name: str, sections: Dict[str, np.ndarray]) -> "StringTable":
+        """The table stored as sections(name, ...) in a file."""
+        return cls({part: sections[f"{name}.{part}"] for part in SECTIONS})
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        start, end = self._offsets[i], self._offsets[i + 1]
+        return self._blob[start:end].tobytes().decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.tolist())
+
+    def tolist(self) -> List[str]:
+        """All strings, decoded in one pass."""
+        data = self._blob.tobytes()
+        offsets = self._offsets.tolist()
+        return [data[start:end].decode("utf-8") for start, end in zip(offsets, offsets[1:])]
+
+    def find(self, s: str) -> Optional[int]:
+        """Position of `s` in the table, or None."""
+        data = s.encode("utf-8")
+        h = np.uint64(string_hash(data))
+        pos = int(np.searchsorted(self._hashes, h))
+        while pos < len(self._hashes) and self._hashes[pos] == h:
+            i = int(self._hash_ids[pos])
+            start, end = self._offsets[i], self._offsets[i + 1]
+            if self._blob[start:end].tobytes() == data:
+                return i
+            pos += 1 # Hash collision
+        return None
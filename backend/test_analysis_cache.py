@@ -0,0 +1,40 @@
+import os
+import tempfile
+import time
+
+from analysis_cache import AnalysisCache
+
+
+def test_stage_cache_eviction_and_invalidation():
+    print("--- Testing analysis cache ---")
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = AnalysisCache(path=os.path.join(tmp, "cache.sqlite3"), max_bytes=2000, max_age=3600)
+
+        cache.put("text", "filehash", "Electricity bill text")
+        assert cache.get("text", "filehash") == "Electricity bill text"
+        assert cache.get("text", "other") is None
+
+        # Retrieval results are tied to a knowledge-base version
+        cache.put("context", "t1:kb1", {"documents": ["law"]}, kb_version="kb1")
+        assert cache.invalidate_kb("kb1") == 0
+        assert cache.invalidate_kb("kb2") == 1
+        assert cache.get("context", "t1:kb1") is None
+
+        # Size limit evicts least recently used entries first
+        for i in range(20):
+            cache.put("explanation", f"t1:c1:lang{i}", "x" * 200)
+            time.sleep(0.001)
+        assert cache.stats()["bytes"] <= 2000
+        assert cache.get("explanation", "t1:c1:lang19") == "x" * 200
+        assert cache.get("explanation", "t1:c1:lang0") is None
+        assert cache.stats()["evictions"] > 0
+
+        # Entries older than max_age are treated as misses
+        cache.max_age = 0
+        assert cache.get("text", "filehash") is None
+        cache._conn.close()
+    print("[SUCCESS] Analysis cache evicts by size/age and invalidates on KB change.")
+
+
+if __name__ == "__main__":
+    test_stage_cache_eviction_and_invalidation()
@@ -0,0 +1,159 @@
+import os
+import random
+import tempfile
+
+import numpy as np
+from rank_bm25 import BM25Okapi
+
+from bm25_index import BM25Index, corpus_fingerprint
+
+VOCAB = [f"term{i}" for i in range(60)] + ["electricity", "theft", "section", "135", "penalty"]
+
+
+def _random_doc(rng):
+    # Skewed term distribution so some terms end up with negative IDF
+    return [rng.choice(VOCAB[:5]) if rng.random() < 0.4 else rng.choice(VOCAB) for _ in range(rng.randint(1, 40))]
+
+
+def _assert_parity(index, corpus, queries):
+    """Compares the incremental index against BM25Okapi built from scratch over `corpus`."""
+    ids = list(corpus)
+    reference = BM25Okapi([corpus[doc_id] for doc_id in ids])
+    slots = index.live_slots()
+    assert [index.doc_id(s) for s in slots] == ids
+
+    for query in queries:
+        expected = reference.get_scores(query)
+        actual = index.get_scores(query)[slots]
+        assert np.allclose(actual, expected, rtol=1e-9, atol=1e-12), query
+
+
+def test_incremental_parity():
+    print("--- Testing incremental BM25 parity with BM25Okapi ---")
+    rng = random.Random(7)
+    index = BM25Index()
+    corpus = {}
+    queries = [[rng.choice(VOCAB) for _ in range(rng.randint(1, 5))] for _ in range(25)]
+    queries.append(["unknown", "electricity", "electricity"])
+    next_id = 0
+
+    for step in range(30):
+        # Add a batch, like ingest.py does
+        batch_ids = [f"doc_{next_id + i}" for i in range(rng.randint(1, 20))]
+        next_id += len(batch_ids)
+        batch_docs = [_random_doc(rng) for _ in batch_ids]
+        index.add_many(batch_ids, batch_docs)
+        corpus.update(zip(batch_ids, batch_docs))
+
+        # Update some documents in place (moves them to the end of the order)
+        for doc_id in rng.sample(list(corpus), k=min(2, len(corpus))):
+            new_doc = _random_doc(rng)
+            index.update(doc_id, new_doc)
+            del corpus[doc_id]
+            corpus[doc_id] = new_doc
+
+        # Delete some documents
+        for doc_id in rng.sample(list(corpus), k=min(3, len(corpus) - 1)):
+            assert index.remove(doc_id)
+            del corpus[doc_id]
+
+        _assert_parity(index, corpus, queries)
+
+    assert len(index) == len(corpus)
+    assert not index.remove("missing")
+
+    index.compact()
+    _assert_parity(index, corpus, queries)
+    print("[SUCCESS] Incremental index matches a from-scratch BM25Okapi build.")
+
+
+def test_top_n_matches_sorted_scores():
+    rng = random.Random(11)
+    docs = [_random_doc(rng) for _ in range(200)]
+    index = BM25Index()
+    index.add_many([f"d{i}" for i in range(len(docs))], docs)
+    reference = BM25Okapi(docs)
+
+    for _ in range(20):
+        query = [rng.choice(VOCAB) for _ in range(3)]
+        scores = reference.get_scores(query)
+        expected = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:6]
+        assert [doc_id for doc_id, _ in index.top_n(query, 6)] == [f"d{i}" for i in expected]
+
+
+def test_top_n_pruned_matches_exhaustive():
+    """MaxScore and dense paths must return the same top-k as scoring everything."""
+    rng = random.Random(5)
+    vocab = [f"w{i}" for i in range(2000)]
+    weights = [1.0 / (rank + 1) for rank in range(len(vocab))]
+    index = BM25Index()
+    index.add_many([f"d{i}" for i in range(3000)], [rng.choices(vocab, weights, k=rng.randint(5, 60)) for _ in range(3000)])
+    for i in range(0, 3000, 7):
+        index.remove(f"d{i}")
+    index.compact()
+    index.add_many([f"t{i}" for i in range(200)], [rng.choices(vocab, weights, k=30) for _ in range(200)])
+    index.remove("t3")
+
+    for _ in range(60):
+        query = rng.choices(vocab, k=rng.randint(1, 6)) + rng.choices(vocab, weights, k=rng.randint(0, 2))
+        all_scores = index.get_scores(query)
+        for n in (1, 6, 25):
+            result = index.top_n(query, n)
+            slots = index.live_slots()
+            matched = sorted((s for s in slots if all_scores[s] > 0), key=lambda s: -all_scores[s])
+            expected = [all_scores[s] for s in matched[:n]]
+            assert np.allclose([score for _, score in result], expected), (query, n)
+            for doc_id, score in result:
+                assert np.isclose(all_scores[index.slot_of(doc_id)], score)
+
+
+def test_save_load_round_trip():
+    print("--- Testing BM25 index persistence ---")
+    rng = random.Random(3)
+    corpus = {f"doc_{i}": _random_doc(rng) for i in range(300)}
+    index = BM25Index()
+    index.add_many(list(corpus), list(corpus.values()))
+    index.remove("doc_5")
+    del corpus["doc_5"]
+    queries = [[rng.choice(VOCAB) for _ in range(3)] for _ in range(20)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bm25.idx")
+        fingerprint = corpus_fingerprint(corpus)
+        index.save(path, fingerprint=fingerprint)
+        assert BM25Index.read_header(path)["fingerprint"] == fingerprint
+
+        loaded = BM25Index.load(path)
+        assert loaded.fingerprint == fingerprint
+        _assert_parity(loaded, corpus, queries)
+        # Served from the mapped file: no per-process copies of its tables
+        assert isinstance(loaded._df, np.memmap) and not loaded._vocab and not loaded._slot_of
+        assert "doc_1" in loaded and "doc_5" not in loaded
+
+        # The memory-mapped base segment stays usable for incremental changes
+        extra_ids = [f"new_{i}" for i in range(10)]
+        extra_docs = [_random_doc(rng) for _ in extra_ids]
+        loaded.add_many(extra_ids, extra_docs)
+        corpus.update(zip(extra_ids, extra_docs))
+        for doc_id in ["doc_0", "doc_17", "new_3"]:
+            loaded.remove(doc_id)
+            del corpus[doc_id]
+        _assert_parity(loaded, corpus, queries)
+
+        loaded.compact()
+        _assert_parity(loaded, corpus, queries)
+        del loaded
+    print("[SUCCESS] Saved index reloads with identical scores.")
+
+
+def test_fingerprint_ignores_order():
+    assert corpus_fingerprint(["a", "b"]) == corpus_fingerprint(["b", "a"])
+    assert corpus_fingerprint(["a", "b"]) != corpus_fingerprint(["a", "c"])
+
+
+if __name__ == "__main__":
+    test_incremental_parity()
+    test_top_n_matches_sorted_scores()
+    test_top_n_pruned_matches_exhaustive()
+    test_save_load_round_trip()
+    test_fingerprint_ignores_order()
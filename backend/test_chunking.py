@@ -0,0 +1,111 @@
+from chunking import MAX_PARAGRAPH_CHARS, chunk_pages, estimate_tokens, iter_blocks
+
+ACT_PAGE_1 = """CHAPTER IV
+CONSUMER DISPUTES REDRESSAL COMMISSION
+35. Manner in which complaint shall be made.—(1) A complaint, in relation to any goods sold or delivered or
+agreed to be sold or delivered or any service provided or agreed to be provided, may be filed with a District
+Commission by the consumer to whom such goods are sold or delivered or agreed to be sold or delivered or
+such service provided or agreed to be provided.
+(a) a recognised consumer association, whether the consumer is a member of such association or not;
+(b) the Central Government or the State Government, as the case may be.
+36. Proceedings before District Commission.—(1) Every proceeding before the District Commission shall be"""
+
+ACT_PAGE_2 = """conducted by the President of that Commission and at least one member thereof, sitting together.
+Section 126. Assessment
+If on an inspection of any place the assessing officer comes to the conclusion that such person is indulging in
+unauthorized use of electri-
+city, he shall provisionally assess the electricity charges payable. The order of provisional assessment shall be
+served upon the person in occupation of such premises."""
+
+
+def test_blocks_follow_document_structure():
+    print("--- Testing structural blocks ---")
+    blocks = list(iter_blocks([ACT_PAGE_1, ACT_PAGE_2]))
+    headings = [(b["section"], b["text"]) for b in blocks if b["kind"] == "heading"]
+    assert headings == [
+        ("", "CHAPTER IV"),
+        ("", "CONSUMER DISPUTES REDRESSAL COMMISSION"),
+        ("35", "35. Manner in which complaint shall be made."),
+        ("36", "36. Proceedings before District Commission."),
+        ("126", "Section 126. Assessment"),
+    ]
+    paragraphs = [b for b in blocks if b["kind"] == "paragraph"]
+    assert paragraphs[1]["text"].startswith("(a) a recognised") # List items are paragraphs
+    # Wrapped lines are joined, including across the page break
+    spanning = [p for p in paragraphs if "sitting together" in p["text"]][0]
+    assert spanning["text"].startswith("(1) Every proceeding") and spanning["page"] == 1
+    assert any("unauthorized use of electricity, he shall" in p["text"] for p in paragraphs)
+    (heading, body) = iter_blocks(["Section 43. Duty to supply on request.—(1) Every licensee shall supply."])
+    assert (heading["section"], heading["text"], body["text"]) == (
+        "43", "Section 43. Duty to supply on request.", "(1) Every licensee shall supply.")
+    print("[SUCCESS] Headings, sections and paragraphs detected.")
+
+
+def test_chunks_respect_sections_and_budget():
+    print("--- Testing chunk boundaries ---")
+    chunks = list(chunk_pages([ACT_PAGE_1, ACT_PAGE_2], max_tokens=100, overlap_tokens=30))
+    for chunk in chunks:
+        assert chunk["tokens"] <= 100 and estimate_tokens(chunk["text"]) <= 100
+        assert chunk["text"].startswith(chunk["heading"] + "\n")
+        assert chunk["text"][-1] in ".;" # Whole sentences only
+    assert [c["section"] for c in chunks] == ["35", "35", "36", "126"]
+    assert chunks[0]["heading"] == "35. Manner in which complaint shall be made."
+    assert chunks[1]["text"].split("\n")[1].startswith("(a) a recognised") # Breaks between paragraphs
+    assert (chunks[2]["page_start"], chunks[2]["page_end"]) == (1, 2)
+    assert (chunks[3]["page_start"], chunks[3]["page_end"]) == (2, 2)
+
+    # Consecutive chunks of one section share whole trailing sentences
+    rules = "Section 43. Duty to supply\n" + " ".join(f"Rule {i} applies to every licensee." for i in range(12))
+    chunks = list(chunk_pages([rules], max_tokens=40, overlap_tokens=10))
+    assert len(chunks) > 2 and {c["section"] for c in chunks} == {"43"}
+    for previous, current in zip(chunks, chunks[1:]):
+        assert previous["text"].split(". ")[-1] in current["text"]
+    print(f"[SUCCESS] {len(chunks)} chunks, none crossing a section.")
+
+
+def test_chunking_is_lazy():
+    consumed = []
+
+    def pages():
+        for i in range(1000):
+            consumed.append(i)
+            yield f"Section {i + 1}. Title\nSome text for section {i + 1}."
+
+    first = next(chunk_pages(pages()))
+    assert first["section"] == "1" and len(consumed) <= 3
+
+
+def test_oversized_sentence_is_split():
+    text = "Heading free text " + " ".join(f"word{i}" for i in range(300)) + "."
+    chunks = list(chunk_pages([text], max_tokens=50, overlap_tokens=0))
+    assert len(chunks) > 1 and all(c["tokens"] <= 50 for c in chunks)
+    assert " ".join(c["text"] for c in chunks).split() == text.split()
+
+
+
+def test_budget_holds_for_long_headings_and_words():
+    title = "Powers of the appropriate commission to make regulations for the supply of electricity in rural areas"
+    text = f"12. {title}.—(1) The commission may specify the conditions of supply. " * 3
+    chunks = list(chunk_pages([text], max_tokens=20, overlap_tokens=0))
+    assert chunks and all(c["tokens"] <= 20 and estimate_tokens(c["text"]) <= 20 for c in chunks)
+    assert all(c["text"].startswith(c["heading"]) and c["heading"].startswith("12. Powers") for c in chunks)
+
+    blob = "https://example.org/" + "QUJDRA" * 400 # Long URL / base64 without spaces
+    chunks = list(chunk_pages([f"See {blob} for details."], max_tokens=50, overlap_tokens=0))
+    assert len(chunks) > 1 and all(c["tokens"] <= 50 and estimate_tokens(c["text"]) <= 50 for c in chunks)
+    assert "".join(c["text"] for c in chunks).replace(" ", "") == f"See{blob}fordetails."
+
+
+def test_unbroken_text_is_bounded():
+    page = "\n".join("licensee shall supply electricity to every consumer on request within one month" for _ in range(2000))
+    blocks = list(iter_blocks([page]))
+    assert len(blocks) > 1 and all(len(b["text"]) <= MAX_PARAGRAPH_CHARS + 100 for b in blocks)
+
+
+if __name__ == "__main__":
+    test_blocks_follow_document_structure()
+    test_chunks_respect_sections_and_budget()
+    test_chunking_is_lazy()
+    test_oversized_sentence_is_split()
+    test_budget_holds_for_long_headings_and_words()
+    test_unbroken_text_is_bounded()
@@ -0,0 +1,44 @@
+import os
+import tempfile
+
+import numpy as np
+import pytest
+
+from document_store import DocumentStore
+
+
+def test_store_round_trip():
+    print("--- Testing DocumentStore ---")
+    store = DocumentStore()
+    store.add_many(["a", "b", "c"], ["Section 126: assessment", "धारा 135 बिजली चोरी", ""])
+    store.add_many(["b"], ["Section 135: theft"]) # Replaces the text of "b"
+    assert len(store) == 3 and "b" in store and "z" not in store
+    assert store.get("b") == "Section 135: theft" and store.get("c") == ""
+    assert store.get_many(["c", "z", "a"]) == {"c": "", "a": "Section 126: assessment"}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "docs.store")
+        store.save(path, ["c", "a", "b"], fingerprint="3:abc")
+        with pytest.raises(KeyError):
+            store.save(path, ["a", "missing"])
+
+        loaded = DocumentStore.load(path)
+        assert loaded.fingerprint == "3:abc" and len(loaded) == 3
+        assert isinstance(loaded._base_texts._blob, np.memmap) # Texts stay in the mapped file
+        assert [loaded.doc_id(i) for i in range(3)] == ["c", "a", "b"] # Numbered in the given order
+        assert loaded.number("b") == 2 and loaded.get("b") == "Section 135: theft"
+
+        # Ingestion appends to the tail, which overrides the mapped texts
+        loaded.add_many(["d", "a"], ["new chunk", "Section 126 (amended)"])
+        assert len(loaded) == 4
+        assert loaded.get_many(["a", "d"]) == {"a": "Section 126 (amended)", "d": "new chunk"}
+        loaded.save(path, ["a", "b", "c", "d"], fingerprint="4:def")
+        del loaded
+        reloaded = DocumentStore.load(path)
+        assert [reloaded.get(doc_id) for doc_id in ["a", "d"]] == ["Section 126 (amended)", "new chunk"]
+        del reloaded
+    print("[SUCCESS] Store keeps texts by ID across save/load and ingestion.")
+
+
+if __name__ == "__main__":
+    test_store_round_trip()
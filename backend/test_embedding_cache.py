@@ -0,0 +1,46 @@
+import os
+import tempfile
+
+from embedding_cache import EmbeddingCache, cache_key
+
+
+def test_cache_tiers_and_persistence():
+    print("--- Testing embedding cache ---")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache.sqlite3")
+        cache = EmbeddingCache(path=path, max_memory_entries=2)
+
+        assert cache.get_many(["notice"], "m", "retrieval_query") == [None]
+        cache.put_many(["a", "b", "c"], [[0.5, 1.0], [0.25, 2.0], [1.5, 3.0]], "m", "retrieval_query")
+
+        # "a" was evicted from the 2-entry memory tier but is still on disk
+        assert cache.get_many(["c", "a"], "m", "retrieval_query") == [[1.5, 3.0], [0.5, 1.0]]
+        assert cache.memory_hits == 1 and cache.disk_hits == 1 and cache.misses == 1
+
+        # Model and task type are part of the key
+        assert cache.get_many(["a"], "m", "retrieval_document") == [None]
+        assert cache.get_many(["a"], "other-model", "retrieval_query") == [None]
+        assert cache_key("a", "m", "x") != cache_key("a", "m", "y")
+
+        # A new instance (e.g. after a restart) reads the disk tier
+        restarted = EmbeddingCache(path=path)
+        assert restarted.get_many(["b"], "m", "retrieval_query") == [[0.25, 2.0]]
+        assert restarted.stats()["disk_hits"] == 1
+        cache._conn.close()
+        restarted._conn.close()
+    print("[SUCCESS] Embedding cache serves both tiers across restarts.")
+
+
+def test_disk_tier_is_bounded():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = EmbeddingCache(path=os.path.join(tmp, "cache.sqlite3"), max_disk_entries=100)
+        texts = [f"query {i}" for i in range(1200)]
+        cache.put_many(texts, [[float(i)] for i in range(1200)], "m", "t")
+        (count,) = cache._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        assert count == 100
+        cache._conn.close()
+
+
+if __name__ == "__main__":
+    test_cache_tiers_and_persistence()
+    test_disk_tier_is_bounded()
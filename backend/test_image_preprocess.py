@@ -0,0 +1,69 @@
+import os
+import tempfile
+
+import cv2
+import numpy as np
+
+from image_preprocess import find_document_corners, preprocess_file, preprocess_image
+
+WORDS = "the bill amount due date consumer number tariff units electricity notice section act penalty payment".split()
+
+
+def render_page(rng):
+    """An A4 page of text at 300 DPI."""
+    page = np.full((3508, 2480, 3), 250, np.uint8)
+    y = 250
+    while y < 3300:
+        line = " ".join(rng.choice(WORDS, size=rng.integers(4, 9)))
+        cv2.putText(page, line, (200, y), cv2.FONT_HERSHEY_SIMPLEX, 1.6, (30, 30, 30), 3, cv2.LINE_AA)
+        y += int(rng.integers(70, 110))
+    return page
+
+
+def make_photo(rng):
+    """A phone photo of the page: perspective-warped onto a 4000x3000 background, shadowed, noisy, slightly blurred."""
+    h, w = 3000, 4000
+    background = cv2.GaussianBlur(rng.integers(60, 140, size=(h, w, 3), dtype=np.uint8), (31, 31), 0)
+    page = render_page(rng)
+    ph, pw = page.shape[:2]
+    jitter = lambda: rng.uniform(-150, 150)
+    target = np.float32([
+        [1100 + jitter(), 150 + jitter()], [2900 + jitter(), 180 + jitter()],
+        [3050 + jitter(), 2850 + jitter()], [950 + jitter(), 2800 + jitter()],
+    ])
+    matrix = cv2.getPerspectiveTransform(np.float32([[0, 0], [pw, 0], [pw, ph], [0, ph]]), target)
+    warped = cv2.warpPerspective(page, matrix, (w, h))
+    mask = cv2.warpPerspective(np.full((ph, pw), 255, np.uint8), matrix, (w, h))
+    photo = np.where(mask[..., None] > 0, warped, background)
+    shadow = np.linspace(0.65, 1.0, w, dtype=np.float32)[None, :, None]
+    photo = photo.astype(np.float32) * shadow + rng.normal(0, 6, size=photo.shape).astype(np.float32)
+    return cv2.GaussianBlur(np.clip(photo, 0, 255).astype(np.uint8), (3, 3), 0)
+
+
+def test_photo_is_cropped_and_shrunk():
+    print("--- Testing image preprocessing ---")
+    photo = make_photo(np.random.default_rng(1))
+    data = cv2.imencode(".jpg", photo, [cv2.IMWRITE_JPEG_QUALITY, 95])[1].tobytes()
+    assert find_document_corners(photo) is not None
+
+    encoded, mime_type = preprocess_image(data, dpi=150)
+    page = cv2.imdecode(np.frombuffer(encoded, np.uint8), cv2.IMREAD_UNCHANGED)
+    assert mime_type == "image/png" and page.ndim == 2
+    assert max(page.shape) <= int(11.7 * 150) and page.shape[0] > page.shape[1] # Portrait page, at target DPI
+    assert set(np.unique(page)) <= {0, 255} # Black and white
+    assert len(encoded) < len(data) / 10
+    print(f"[SUCCESS] {len(data) // 1024} KB photo -> {len(encoded) // 1024} KB page.")
+
+
+def test_undecodable_images_are_left_alone():
+    assert preprocess_image(b"not an image") is None
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "page.heic")
+        with open(path, "wb") as f:
+            f.write(b"\0\0\0\x18ftypheic")
+        assert preprocess_file(path, tmp) is None
+
+
+if __name__ == "__main__":
+    test_photo_is_cropped_and_shrunk()
+    test_undecodable_images_are_left_alone()
@@ -0,0 +1,69 @@
+import os
+import tempfile
+import threading
+
+from ingest_pipeline import IngestPipeline
+from test_pdf_text import make_pdf
+
+
+def section_pages(count, prefix):
+    return [f"Section {i + 1}. Supply rule {i + 1}.-The {prefix} rule applies to every consumer of electricity." for i in range(count)]
+
+
+def test_pipeline_ingests_all_chunks():
+    print("--- Testing streaming ingestion pipeline ---")
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {}
+        for name, pages in (("act.pdf", 30), ("tariff.pdf", 11)):
+            files[name] = os.path.join(tmp, name)
+            make_pdf(files[name], section_pages(pages, name))
+        files["broken.pdf"] = os.path.join(tmp, "broken.pdf")
+        with open(files["broken.pdf"], "wb") as f:
+            f.write(b"not a pdf")
+
+        written = []
+        lock = threading.Lock()
+
+        def write(documents, embeddings, metadatas, ids):
+            assert len(documents) == len(embeddings) == len(metadatas) == len(ids) <= 16
+            with lock:
+                written.extend(zip(ids, metadatas, embeddings))
+
+        pipeline = IngestPipeline(embed_fn=lambda texts: [[float(len(t))] for t in texts], write_fn=write,
+                                  processes=2, file_workers=2, batch_size=16, queue_batches=1)
+        report = pipeline.run(files)
+
+        assert report["chunks"] == {"act.pdf": 30, "tariff.pdf": 11, "broken.pdf": 0}
+        assert len(report["errors"]) == 1 and report["errors"][0].startswith("broken.pdf")
+        assert len(written) == 41 and len({i for i, _, _ in written}) == 41
+        act = sorted((m for _, m, _ in written if m["source"] == "act.pdf"), key=lambda m: m["chunk_index"])
+        assert [m["section"] for m in act] == [str(i + 1) for i in range(30)] # Pages stay in order
+        assert [m["page_start"] for m in act] == list(range(1, 31))
+        stages = report["stages"]
+        assert stages["extract"]["items"] == 41 and stages["write"]["items"] == 41
+    print(f"[SUCCESS] {len(written)} chunks ingested; stages: {stages}")
+
+
+def test_failed_batch_is_skipped():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "act.pdf")
+        make_pdf(path, section_pages(8, "act"))
+        calls = []
+
+        def embed(texts):
+            calls.append(len(texts))
+            if len(calls) == 1:
+                raise Exception("quota exceeded")
+            return [[0.0] for _ in texts]
+
+        written = []
+        pipeline = IngestPipeline(embed_fn=embed, write_fn=lambda d, e, m, i: written.extend(i),
+                                  processes=1, batch_size=4)
+        report = pipeline.run({"act.pdf": path})
+        assert calls == [4, 4] and len(written) == 4
+        assert "quota exceeded" in report["errors"][0]
+
+
+if __name__ == "__main__":
+    test_pipeline_ingests_all_chunks()
+    test_failed_batch_is_skipped()
@@ -0,0 +1,124 @@
+import os
+import tempfile
+import threading
+import time
+
+import analysis_pipeline
+import jobs
+from concurrency import ServerBusyError
+from jobs import JobQueue
+
+
+def test_queue_depth_limit():
+    print("--- Testing job queue backpressure ---")
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(path=os.path.join(tmp, "jobs.sqlite3"), workers=0, max_queued=2)
+        first, _ = queue.submit("a.pdf", "English", file_hash="a")
+        queue.submit("b.pdf", "English", file_hash="b")
+        try:
+            queue.submit("c.pdf", "English", file_hash="c")
+            assert False, "Expected ServerBusyError"
+        except ServerBusyError:
+            pass
+        # Reusing an in-flight job adds no work, so it is still accepted
+        assert queue.submit("a.pdf", "English", file_hash="a") == (first, True)
+        stats = queue.stats()
+        assert stats["queued"] == 2 and stats["rejected"] == 1
+        queue._conn.close()
+    print("[SUCCESS] Submissions beyond the queue limit are rejected.")
+
+
+def test_reclaimed_job_is_not_finished_by_its_previous_owner():
+    print("--- Testing a re-claimed job ---")
+    saved = {name: getattr(analysis_pipeline, name) for name in ("extract_text", "retrieve_context", "explain", "build_response")}
+    saved_stale = jobs.JOB_STALE_SECONDS
+    analysis_pipeline.extract_text = lambda path, file_hash: {"text": "bill", "text_hash": "t"}
+    analysis_pipeline.retrieve_context = lambda text, text_hash: {"documents": []}
+    analysis_pipeline.explain = lambda text, text_hash, context, language: "explained"
+    analysis_pipeline.build_response = lambda extraction, context, explanation: {"explanation": explanation}
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            queue = JobQueue(path=os.path.join(tmp, "jobs.sqlite3"), workers=0, stage_retries=0)
+            job_id, _ = queue.submit("a.pdf", "English", file_hash="a")
+            row, old_owner = queue._claim()
+            jobs.JOB_STALE_SECONDS = -1 # The first worker looks stalled
+            _, new_owner = queue._claim()
+            assert new_owner != old_owner
+
+            queue._run_job(row, old_owner)
+            job = queue.get(job_id)
+            assert job["status"] == "running" and job["result"] is None
+
+            queue._run_job(row, new_owner)
+            job = queue.get(job_id)
+            assert job["status"] == "done" and job["result"] == {"explanation": "explained"}
+            queue._conn.close()
+    finally:
+        for name, fn in saved.items():
+            setattr(analysis_pipeline, name, fn)
+        jobs.JOB_STALE_SECONDS = saved_stale
+    print("[SUCCESS] Only the current owner finishes a job.")
+
+
+def test_running_job_keeps_its_lease():
+    print("--- Testing lease renewal during a long stage ---")
+    saved = {name: getattr(analysis_pipeline, name) for name in ("extract_text", "retrieve_context", "explain", "build_response")}
+    saved_stale = jobs.JOB_STALE_SECONDS
+    analysis_pipeline.extract_text = lambda path, file_hash: time.sleep(0.8) or {"text": "bill", "text_hash": "t"}
+    analysis_pipeline.retrieve_context = lambda text, text_hash: {"documents": []}
+    analysis_pipeline.explain = lambda text, text_hash, context, language: "explained"
+    analysis_pipeline.build_response = lambda extraction, context, explanation: {"explanation": explanation}
+    jobs.JOB_STALE_SECONDS = 0.3 # Much shorter than the extract stage
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "jobs.sqlite3")
+            queue = JobQueue(path=path, workers=0, heartbeat=0.05)
+            other = JobQueue(path=path, workers=0) # Another server process
+            job_id, _ = queue.submit("a.pdf", "English", file_hash="a")
+            row, owner = queue._claim()
+            worker = threading.Thread(target=queue._run_job, args=(row, owner))
+            worker.start()
+            stolen = []
+            while worker.is_alive():
+                stolen.append(other._claim())
+                time.sleep(0.05)
+            worker.join()
+            assert not any(stolen) # Never looked stalled
+            assert queue.get(job_id)["status"] == "done"
+            queue._conn.close()
+            other._conn.close()
+    finally:
+        for name, fn in saved.items():
+            setattr(analysis_pipeline, name, fn)
+        jobs.JOB_STALE_SECONDS = saved_stale
+    print("[SUCCESS] A long stage renews its lease and is not run twice.")
+
+
+def test_finished_jobs_are_purged():
+    print("--- Testing job retention ---")
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(path=os.path.join(tmp, "jobs.sqlite3"), workers=0, retention=3600)
+        done, _ = queue.submit("a.pdf", "English", file_hash="a")
+        failed, _ = queue.submit("b.pdf", "English", file_hash="b")
+        recent, _ = queue.submit("c.pdf", "English", file_hash="c")
+        waiting, _ = queue.submit("d.pdf", "English", file_hash="d")
+        db = queue._db()
+        old = time.time() - 7200
+        db.execute("UPDATE jobs SET status = 'done', updated = ? WHERE id = ?", (old, done))
+        db.execute("UPDATE jobs SET status = 'failed', updated = ? WHERE id = ?", (old, failed))
+        db.execute("UPDATE jobs SET status = 'done' WHERE id = ?", (recent,))
+        db.execute("UPDATE jobs SET updated = ? WHERE id = ?", (old, waiting)) # Queued: kept however old
+        db.commit()
+        assert queue.purge() == 2
+        assert queue.get(done) is None and queue.get(failed) is None
+        assert queue.get(recent)["status"] == "done" and queue.get(waiting)["status"] == "queued"
+        assert queue.stats()["purged"] == 2
+        queue._conn.close()
+    print("[SUCCESS] Old finished jobs are deleted, recent and pending ones kept.")
+
+
+if __name__ == "__main__":
+    test_queue_depth_limit()
+    test_reclaimed_job_is_not_finished_by_its_previous_owner()
+    test_running_job_keeps_its_lease()
+    test_finished_jobs_are_purged()
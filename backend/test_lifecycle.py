@@ -0,0 +1,78 @@
+import threading
+import time
+
+from lifecycle import LazyService, ServiceRegistry
+
+
+class Index:
+    def __init__(self):
+        time.sleep(0.2) # Slow start-up, like loading the retrieval index
+
+    def query(self, text):
+        return [text]
+
+
+def test_lazy_service_builds_once():
+    print("--- Testing lazy service start-up ---")
+    builds = []
+
+    def factory():
+        builds.append(1)
+        return Index()
+
+    service = LazyService("index", factory)
+    assert service.status()["status"] == "not started" and not service.ready
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(service.query("bill"))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert builds == [1] and results == [["bill"]] * 5 # Concurrent first calls share one build
+    assert service.status()["status"] == "ready" and service.status()["seconds"] >= 0.2
+    print("[SUCCESS] Built once on first use.")
+
+
+def test_background_start_and_readiness():
+    registry = ServiceRegistry()
+    index = registry.register(LazyService("index", Index))
+    registry.register(LazyService("optional", lambda: time.sleep(5), critical=False))
+
+    start = time.perf_counter()
+    registry.start_all()
+    assert time.perf_counter() - start < 0.1 # Does not block
+    status = registry.status()
+    assert not status["ready"] and status["services"]["index"]["status"] == "starting"
+
+    try:
+        index.get(timeout=0.01)
+        assert False, "expected TimeoutError"
+    except TimeoutError:
+        pass
+    assert index.get(timeout=5).query("x") == ["x"]
+    assert registry.ready() # Non-critical services do not hold up readiness
+
+
+def test_failed_start_is_retried():
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ValueError("Google Gemini API Key is missing.")
+        return Index()
+
+    service = LazyService("gemini", factory)
+    service.start()
+    while service.status()["status"] == "starting":
+        time.sleep(0.01)
+    status = service.status()
+    assert status["status"] == "failed" and "API Key is missing" in status["error"]
+    assert service.query("retry") == ["retry"] and len(attempts) == 2
+
+
+if __name__ == "__main__":
+    test_lazy_service_builds_once()
+    test_background_start_and_readiness()
+    test_failed_start_is_retried()
@@ -0,0 +1,136 @@
+import os
+import tempfile
+import threading
+import time
+import zipfile
+
+import page_extraction
+from analysis_cache import AnalysisCache
+from page_extraction import extract_units, split_units
+from test_pdf_text import make_pdf
+
+TEXT = "Electricity bill page {}. Amount due Rs 500, pay before the due date to avoid a late fee and disconnection."
+
+
+class FakeVision:
+    """Returns the page's file name; optionally fails the first attempts on one page."""
+
+    def __init__(self, flaky_page=None, failures=0):
+        self.calls = []
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+        self.flaky_page = flaky_page
+        self.failures = failures
+
+    def __call__(self, path, mime_type):
+        name = os.path.basename(path)
+        with self.lock:
+            self.calls.append(name)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(0.05)
+            if name.startswith(f"page_{self.flaky_page}.") and self.failures:
+                self.failures -= 1
+                raise Exception("503 Service Unavailable")
+            return f"[vision {name}]"
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def test_pages_in_parallel_with_retry_and_cache():
+    print("--- Testing page-level extraction ---")
+    page_extraction.PAGE_RETRY_DELAY = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = AnalysisCache(path=os.path.join(tmp, "cache.sqlite3"))
+        path = os.path.join(tmp, "notice.pdf")
+        # Pages 2, 3 and 5 are "scanned" (no text layer); page 5 differs from page 3
+        make_pdf(path, [TEXT.format(1), None, "x", TEXT.format(4), "scan"])
+
+        vision = FakeVision(flaky_page=2, failures=1)
+        with tempfile.TemporaryDirectory() as workdir:
+            units = split_units(path, "application/pdf", workdir)
+            document = extract_units(units, vision, cache=cache)
+        assert document["pages"] == {"total": 5, "local": 2, "remote": 3, "cached": 0}
+        assert document["text"].split("\n") == [
+            TEXT.format(1), "[vision page_1.pdf]", "[vision page_2.pdf]", TEXT.format(4), "[vision page_4.pdf]"
+        ]
+        assert vision.peak > 1 # Pages ran concurrently
+        assert vision.calls.count("page_2.pdf") == 2 # Retried once
+
+        # Re-upload with one changed scanned page: only that page is reprocessed
+        make_pdf(path, [TEXT.format(1), None, "x", TEXT.format(4), "changed scan"])
+        vision = FakeVision()
+        with tempfile.TemporaryDirectory() as workdir:
+            document = extract_units(split_units(path, "application/pdf", workdir), vision, cache=cache)
+        assert vision.calls == ["page_4.pdf"]
+        assert document["pages"]["cached"] == 2
+        cache._conn.close()
+    print("[SUCCESS] Pages run concurrently, retry individually and are cached by content.")
+
+
+def test_failed_page_keeps_the_others():
+    page_extraction.PAGE_RETRY_DELAY = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = AnalysisCache(path=os.path.join(tmp, "cache.sqlite3"))
+        bundle = os.path.join(tmp, "photos.zip")
+        with zipfile.ZipFile(bundle, "w") as archive:
+            archive.comment = page_extraction.PAGE_BUNDLE_COMMENT
+            for i in range(3):
+                archive.writestr(f"page_{i:04d}.jpg", f"jpeg bytes {i}")
+
+        with tempfile.TemporaryDirectory() as workdir:
+            units = split_units(bundle, "application/zip", workdir)
+            assert [u["mime_type"] for u in units] == ["image/jpeg"] * 3
+            try:
+                extract_units(units, FakeVision(flaky_page=1, failures=5), cache=cache, retries=1)
+                assert False, "expected the extraction to fail"
+            except Exception as e:
+                assert "page 2" in str(e)
+
+            vision = FakeVision()
+            document = extract_units(units, vision, cache=cache)
+        assert vision.calls == ["page_1.jpg"]
+        assert document["pages"] == {"total": 3, "local": 0, "remote": 1, "cached": 2}
+        cache._conn.close()
+
+
+def test_only_page_bundles_are_unpacked():
+    with tempfile.TemporaryDirectory() as tmp:
+        def bundle(name, members, comment=page_extraction.PAGE_BUNDLE_COMMENT, compression=zipfile.ZIP_STORED):
+            path = os.path.join(tmp, name)
+            with zipfile.ZipFile(path, "w", compression=compression) as archive:
+                archive.comment = comment
+                for member, data in members.items():
+                    archive.writestr(member, data)
+            return path
+
+        rejected = [
+            bundle("report.docx", {"word/document.xml": "<w:document/>"}, comment=b""), # Office file
+            bundle("bomb.zip", {"page_0000.png": b"\0" * (1 << 20)}, compression=zipfile.ZIP_DEFLATED),
+            bundle("mixed.zip", {"page_0000.jpg": "jpeg", "notes.txt": "text"}),
+            bundle("many.zip", {f"page_{i:04d}.jpg": "jpeg" for i in range(page_extraction.MAX_BUNDLE_PAGES + 1)}),
+        ]
+        limit = page_extraction.MAX_UPLOAD_BYTES
+        page_extraction.MAX_UPLOAD_BYTES = 1000
+        try:
+            rejected.append(bundle("large.zip", {"page_0000.jpg": b"x" * 600, "page_0001.jpg": b"x" * 600}))
+            for path in rejected:
+                with tempfile.TemporaryDirectory() as workdir:
+                    try:
+                        split_units(path, "application/zip", workdir)
+                        assert False, f"{os.path.basename(path)} should be rejected"
+                    except ValueError:
+                        pass
+                    assert os.listdir(workdir) == [] # Nothing was unpacked
+        finally:
+            page_extraction.MAX_UPLOAD_BYTES = limit
+    print("[SUCCESS] Only bundles from /upload/pages are unpacked.")
+
+
+if __name__ == "__main__":
+    test_pages_in_parallel_with_retry_and_cache()
+    test_failed_page_keeps_the_others()
+    test_only_page_bundles_are_unpacked()
@@ -0,0 +1,54 @@
+import os
+import tempfile
+
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+from pdf_text import extract_pages, is_usable_text, page_fingerprint
+
+
+def make_pdf(path, page_texts):
+    """Writes a PDF with one page per entry; None gives an image-only-like blank page."""
+    writer = PdfWriter()
+    font = DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    })
+    for text in page_texts:
+        page = writer.add_blank_page(612, 792)
+        if text is None:
+            continue
+        stream = DecodedStreamObject()
+        stream.set_data(f"BT /F1 10 Tf 40 700 Td ({text}) Tj ET".encode("latin-1"))
+        page[NameObject("/Contents")] = writer._add_object(stream)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): writer._add_object(font)})
+        })
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+def test_text_layer_detection():
+    print("--- Testing PDF text layer detection ---")
+    assert is_usable_text("Electricity bill for February. Amount due Rs 500 by 15 March 2023. " * 2)
+    assert not is_usable_text("  \n ")
+    assert not is_usable_text("(cid:12)(cid:15)(cid:3) " * 20)
+    assert not is_usable_text("�" * 200)
+    print("[SUCCESS] Text layers are told apart from scans.")
+
+
+def test_page_fingerprint_is_content_based():
+    with tempfile.TemporaryDirectory() as tmp:
+        first, second = os.path.join(tmp, "a.pdf"), os.path.join(tmp, "b.pdf")
+        make_pdf(first, ["Page one", "Page two", "Page three"])
+        make_pdf(second, ["Page one", "Page 2 (changed)", "Page three"])
+        a = [page_fingerprint(page) for page in PdfReader(first).pages]
+        b = [page_fingerprint(page) for page in PdfReader(second).pages]
+        assert a[0] == b[0] and a[2] == b[2] and a[1] != b[1]
+        assert extract_pages(first) == ["Page one", "Page two", "Page three"]
+
+
+if __name__ == "__main__":
+    test_text_layer_detection()
+    test_page_fingerprint_is_content_based()
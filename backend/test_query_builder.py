@@ -0,0 +1,135 @@
+import os
+import time
+
+import pytest
+
+import query_builder
+from query_builder import build_queries, extract_entities
+
+NOTICE = (
+    "TANGEDCO\nElectricity Bill cum Disconnection Notice\n"
+    "Consumer No: 04-123-456. Billing period: March 2024. Units consumed: 412.\n"
+    + "We thank you for being a valued customer and for using our online services. " * 15
+    + "\nAs per Section 56(1) of the Electricity Act, 2003 the supply will be disconnected if the "
+    "arrears of Rs. 4,250.50 are not paid within 15 days of this notice. Complaints may be filed "
+    "u/s 42(5) with the Consumer Grievance Redressal Forum under the Consumer Protection Act 2019."
+)
+
+
+def test_entities_are_extracted():
+    print("--- Testing entity extraction ---")
+    entities = extract_entities(NOTICE + " Section 56 (1) of the Act; fees of ₹ 500 and INR 1,000.")
+    assert entities["acts"] == ["Electricity Act, 2003", "Consumer Protection Act, 2019"]
+    assert entities["sections"] == ["Section 56(1)", "Section 42(5)"]
+    assert entities["amounts"] == ["Rs. 4,250.50", "₹ 500", "INR 1,000"]
+    print("Passed.")
+
+
+def test_queries_cover_the_whole_document():
+    print("--- Testing sub-queries of a long notice ---")
+    assert NOTICE.index("Section 56(1)") > 1000 # Beyond the old query snippet
+    queries = build_queries(NOTICE)
+    assert [q["kind"] for q in queries] == ["opening", "entities", "passage", "passage"]
+    assert queries[0]["text"].startswith("TANGEDCO")
+    assert queries[1]["text"] == ("Electricity Act, 2003 Consumer Protection Act, 2019 Section 56(1) "
+                                  "Section 42(5) Rs. 4,250.50")
+    # The passages citing the law, not the boilerplate between; heading only in the opening
+    assert "disconnected if the arrears" in queries[2]["text"] and "Redressal Forum" in queries[3]["text"]
+    assert not any("TANGEDCO" in q["text"] for q in queries[2:])
+    assert [q["kind"] for q in build_queries(NOTICE, max_queries=3)] == ["opening", "entities", "passage"]
+    print("Passed.")
+
+
+def test_short_documents_and_single_query_mode(monkeypatch):
+    print("--- Testing short documents / single-query mode ---")
+    assert build_queries("Ration card renewal receipt.") == [{"kind": "opening", "text": "Ration card renewal receipt."}]
+    monkeypatch.setattr(query_builder, "MULTI_QUERY", False)
+    assert build_queries(NOTICE) == [{"kind": "opening", "text": NOTICE[:1000]}]
+    print("Passed.")
+
+
+# --- Retrieval with several sub-queries ---
+
+DOCS = {
+    "theft": "The Electricity Act, 2003: Section 135 deals with theft of electricity.",
+    "disconnect": "Section 56 of the Electricity Act: disconnection of supply in default of payment of arrears.",
+    "ration": "Ration cards are issued by the civil supplies department.",
+    "aadhaar": "Aadhaar enrolment is free of charge at any enrolment centre.",
+}
+# Each document's vector lies on one axis; a query points at the documents it mentions
+AXES = {doc_id: i for i, doc_id in enumerate(DOCS)}
+
+
+def fake_embeddings(texts, task_type="retrieval_document"):
+    vectors = []
+    for text in texts:
+        vector = [0.01] * len(AXES)
+        for doc_id, axis in AXES.items():
+            if doc_id in text.lower():
+                vector[axis] = 1.0
+        vectors.append(vector)
+    return vectors
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("GEMINI_API_KEY", "test")
+    import chromadb
+    client = chromadb.PersistentClient(path=os.path.abspath("db_storage"))
+    client.get_or_create_collection(name="legal_knowledge_base", metadata={"hnsw:space": "cosine"}).add(
+        ids=list(DOCS), documents=list(DOCS.values()), embeddings=fake_embeddings(list(DOCS)))
+    client.clear_system_cache()
+
+    import rag_service
+    calls = []
+    monkeypatch.setattr(rag_service, "embed_texts_cached", lambda texts, deadline=None: calls.append(list(texts)) or fake_embeddings(texts))
+    service = rag_service.RAGService()
+    service.embed_calls = calls
+    yield service
+    from chromadb.api.client import SharedSystemClient
+    SharedSystemClient.clear_system_cache()
+
+
+def test_sub_queries_are_fused(service):
+    print("--- Testing multi-query retrieval ---")
+    queries = ["ration card renewal", "aadhaar enrolment centre", "theft of electricity"]
+    result = service.query_many(queries, n_results=3)
+    assert service.embed_calls == [queries] # One batch for every sub-query
+    documents = result["documents"]
+    assert {DOCS["ration"], DOCS["aadhaar"], DOCS["theft"]} == set(documents)
+    retrieval = result["retrieval"]
+    assert [q["query"] for q in retrieval["sub_queries"]] == queries
+    assert all(q["vector_hits"] > 0 and q["keyword_ms"] is not None for q in retrieval["sub_queries"])
+    assert {"embed_ms", "search_ms"} <= set(retrieval["legs"]["vector"])
+    assert not retrieval["degraded"]
+    # One query: the same fusion over one vector and one keyword list
+    assert service.query("theft of electricity", n_results=1) == [DOCS["theft"]]
+    print("Passed.")
+
+
+def test_latency_budget(service, monkeypatch):
+    print("--- Testing the latency budget ---")
+    import rag_service
+
+    def slow_embeddings(texts, deadline=None):
+        time.sleep(0.5)
+        return fake_embeddings(texts)
+
+    monkeypatch.setattr(rag_service, "embed_texts_cached", slow_embeddings)
+    result = service.query_many(["theft of electricity", "ration card"], n_results=2, budget=0.2)
+    retrieval = result["retrieval"]
+    # The vector leg is cut at the budget (well before its own deadline); keyword results remain
+    assert retrieval["legs"]["vector"]["status"] == "timeout" and retrieval["degraded"]
+    assert retrieval["total_ms"] < 450
+    assert set(result["documents"]) == {DOCS["theft"], DOCS["ration"]}
+    # Sub-queries left when the deadline passes are skipped
+    skipped = service._keyword_leg(["theft", "ration"], 2, deadline=time.perf_counter())
+    assert skipped == {"ids": [[], []], "ms": [None, None]}
+    print("Passed.")
+
+
+if __name__ == "__main__":
+    test_entities_are_extracted()
+    test_queries_cover_the_whole_document()
+    print("(Run with pytest for the retrieval tests.)")
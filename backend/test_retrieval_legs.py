@@ -0,0 +1,114 @@
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import rag_service
+
+DOCS = {
+    "theft": "The Electricity Act, 2003: Section 135 deals with theft of electricity.",
+    "ration": "Ration cards are issued by the civil supplies department.",
+    "aadhaar": "Aadhaar enrolment is free of charge at any enrolment centre.",
+}
+
+
+def fake_embeddings(texts, deadline=None):
+    return [[1.0 if doc_id in text.lower() else 0.01 for doc_id in DOCS] for text in texts]
+
+
+def deadline_embeddings(texts, deadline=None):
+    """A slow embedding backend that, like embed_texts, stops at the deadline."""
+    time.sleep(max(0.0, min(5.0, deadline - time.perf_counter())))
+    raise TimeoutError("Embedding deadline passed.")
+
+
+@contextmanager
+def knowledge_base():
+    """A RAGService over DOCS in a temporary directory, two runs allowed in flight per leg."""
+    import chromadb
+    from chromadb.api.client import SharedSystemClient
+    saved = (os.getcwd(), os.environ.get("GEMINI_API_KEY"), rag_service.LEG_MAX_IN_FLIGHT, rag_service.embed_texts_cached)
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        os.environ["GEMINI_API_KEY"] = saved[1] or "test"
+        rag_service.LEG_MAX_IN_FLIGHT = 2
+        rag_service.embed_texts_cached = fake_embeddings
+        try:
+            client = chromadb.PersistentClient(path=os.path.abspath("db_storage"))
+            client.get_or_create_collection(name="legal_knowledge_base", metadata={"hnsw:space": "cosine"}).add(
+                ids=list(DOCS), documents=list(DOCS.values()), embeddings=fake_embeddings(list(DOCS)))
+            client.clear_system_cache()
+            yield rag_service.RAGService()
+        finally:
+            SharedSystemClient.clear_system_cache()
+            os.chdir(saved[0])
+            if saved[1] is None:
+                del os.environ["GEMINI_API_KEY"]
+            rag_service.LEG_MAX_IN_FLIGHT, rag_service.embed_texts_cached = saved[2], saved[3]
+
+
+def test_timed_out_leg_degrades_and_frees_its_thread():
+    print("--- Testing a vector leg past its deadline ---")
+    with knowledge_base() as service:
+        rag_service.embed_texts_cached = deadline_embeddings
+        for _ in range(5): # More than LEG_MAX_IN_FLIGHT: each run ends at its deadline
+            result = service.query_many(["theft of electricity"], n_results=1, budget=0.2)
+            retrieval = result["retrieval"]
+            assert retrieval["legs"]["vector"]["status"] == "timeout"
+            assert retrieval["legs"]["keyword"]["status"] == "ok"
+            assert retrieval["degraded"] and result["documents"] == [DOCS["theft"]]
+            time.sleep(0.05)
+        assert service._leg_slots["vector"].acquire(blocking=False) # Not held by stragglers
+        service._leg_slots["vector"].release()
+    print("[SUCCESS] A slow leg is cut at its deadline and gives its thread back.")
+
+
+def test_hung_leg_is_bounded():
+    print("--- Testing a leg that ignores its deadline ---")
+    release = threading.Event()
+
+    def hung_embeddings(texts, deadline=None):
+        release.wait(5)
+        return fake_embeddings(texts)
+
+    with knowledge_base() as service:
+        rag_service.embed_texts_cached = hung_embeddings
+        try:
+            statuses = [service.query_many(["ration card"], n_results=1, budget=0.1)["retrieval"]["legs"]["vector"]["status"]
+                        for _ in range(4)]
+            # Two stragglers fill the leg's slots; later queries skip it without waiting
+            assert statuses == ["timeout", "timeout", "busy", "busy"]
+            start = time.perf_counter()
+            result = service.query_many(["aadhaar enrolment"], n_results=1, budget=0.1)
+            assert result["retrieval"]["legs"]["keyword"]["status"] == "ok" and time.perf_counter() - start < 0.1
+            assert result["documents"] == [DOCS["aadhaar"]]
+        finally:
+            release.set()
+        time.sleep(0.1)
+        rag_service.embed_texts_cached = fake_embeddings
+        assert not service.query_many(["theft"], n_results=1)["retrieval"]["degraded"]
+    print("[SUCCESS] Stragglers are bounded per leg; other queries do not queue behind them.")
+
+
+def test_both_legs_failing_raises():
+    print("--- Testing a query with no working leg ---")
+
+    def broken_keyword_leg(query_texts, n, deadline):
+        raise RuntimeError("index unavailable")
+
+    with knowledge_base() as service:
+        rag_service.embed_texts_cached = deadline_embeddings
+        service._keyword_leg = broken_keyword_leg
+        try:
+            service.query_many(["theft"], n_results=1, budget=0.1)
+            assert False, "expected the query to fail"
+        except Exception as e:
+            assert "All retrieval legs failed" in str(e)
+    print("[SUCCESS] A query fails only when every leg does.")
+
+
+if __name__ == "__main__":
+    test_timed_out_leg_degrades_and_frees_its_thread()
+    test_hung_leg_is_bounded()
+    test_both_legs_failing_raises()
@@ -0,0 +1,147 @@
+import multiprocessing
+import os
+import random
+import threading
+import time
+
+import numpy as np
+import pytest
+
+WORDS = "consumer complaint licensee supply tariff notice commission appeal penalty meter refund".split()
+
+
+def _seed(docs):
+    import chromadb
+    client = chromadb.PersistentClient(path=os.path.abspath("db_storage"))
+    collection = client.get_or_create_collection(name="legal_knowledge_base", metadata={"hnsw:space": "cosine"})
+    rng = random.Random(3)
+    collection.add(
+        ids=[f"doc_{i}" for i in range(docs)],
+        documents=[" ".join(rng.choice(WORDS) for _ in range(30)) for _ in range(docs)],
+        embeddings=[[rng.random(), rng.random(), rng.random()] for _ in range(docs)],
+    )
+    client.clear_system_cache() # Clients are cached by path; each test has its own directory
+
+
+def _start_worker(barrier, results):
+    """
+    A serving worker, started together with the others. Returns the index file
+    it serves from, whether its tables are mapped and its corpus version.
+    """
+    import rag_service
+    build = rag_service.RAGService._build_index_file
+
+    def counted_build(service):
+        with open("builds.log", "a") as log:
+            log.write("build\n")
+        time.sleep(1) # Building takes a while, like a large corpus
+        return build(service)
+
+    rag_service.RAGService._build_index_file = counted_build
+    barrier.wait()
+    service = rag_service.RAGService()
+    results.put((service._index_stamp, isinstance(service.bm25._df, np.memmap), service.kb_version))
+
+
+def _ingest():
+    """Another process adds a document and publishes the index, like ingest.py."""
+    from rag_service import RAGService
+    service = RAGService()
+    service.add_embedded(["electricity theft section 135"], [[0.0, 0.0, 1.0]], [{"source": "test"}], ["new_doc"])
+    service.persist_bm25()
+
+
+@pytest.fixture
+def kb_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("GEMINI_API_KEY", "test")
+    _seed(200)
+    yield tmp_path
+    from chromadb.api.client import SharedSystemClient
+    SharedSystemClient.clear_system_cache()
+
+
+def test_workers_build_index_once(kb_dir):
+    print("--- Testing concurrent worker start-up ---")
+    context = multiprocessing.get_context("spawn")
+    barrier, queue = context.Barrier(3), context.Queue()
+    workers = [context.Process(target=_start_worker, args=(barrier, queue)) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    results = [queue.get(timeout=120) for _ in workers]
+    for worker in workers:
+        worker.join()
+    with open("builds.log") as log:
+        assert len(log.readlines()) == 1
+    stamps = {stamp for stamp, _, _ in results}
+    assert len(stamps) == 1 and None not in stamps # One build, one file, served by all
+    assert all(mapped for _, mapped, _ in results)
+    assert len({version for _, _, version in results}) == 1
+    from document_store import DocumentStore
+    assert len(DocumentStore.load(os.path.join("db_storage", "docs.store"))) == 200
+    print("[SUCCESS] One worker built the index; all serve the same mapped file.")
+
+
+def test_worker_reloads_published_index(kb_dir):
+    print("--- Testing hot reload after ingestion ---")
+    from rag_service import RAGService
+    service = RAGService()
+    before = service.kb_version
+    assert service.bm25.top_n(["electricity"], 3) == []
+
+    process = multiprocessing.get_context("spawn").Process(target=_ingest)
+    process.start()
+    process.join()
+    assert process.exitcode == 0
+
+    service._next_reload_check = 0 # Skip the wait for the next check
+    assert service.kb_version != before
+    assert service.bm25.top_n(["electricity"], 3)[0][0] == "new_doc"
+    vector_ids = service.collection.query(query_embeddings=[[0.0, 0.0, 1.0]], n_results=1)["ids"][0]
+    assert vector_ids == ["new_doc"]
+    assert service.documents.get("new_doc") == "electricity theft section 135" # From the new mapped store
+    print("[SUCCESS] The worker picked up the new index and vectors.")
+
+
+def test_kb_version_tracks_added_documents(kb_dir, monkeypatch):
+    print("--- Testing the corpus version after in-process adds ---")
+    import rag_service
+    from bm25_index import corpus_fingerprint
+    service = rag_service.RAGService()
+    before = service.kb_version
+
+    calls = []
+    monkeypatch.setattr(rag_service, "corpus_fingerprint", lambda ids: calls.append(1) or corpus_fingerprint(ids))
+    for i in range(3):
+        service.add_embedded([f"electricity theft {i}"], [[0.0, 0.0, 1.0]], [{"source": "test"}], [f"new_{i}"])
+    assert calls == [] # Not rehashed on every add
+
+    ids = [f"doc_{i}" for i in range(200)] + [f"new_{i}" for i in range(3)]
+    assert service.kb_version == corpus_fingerprint(ids) != before
+    assert service.kb_version == corpus_fingerprint(ids) and len(calls) == 1
+
+    # A reader arriving while the version is recomputed waits for the new one
+    def slow_fingerprint(ids):
+        time.sleep(0.3)
+        return corpus_fingerprint(ids)
+
+    monkeypatch.setattr(rag_service, "corpus_fingerprint", slow_fingerprint)
+    service.add_embedded(["meter testing"], [[0.0, 1.0, 0.0]], [{"source": "test"}], ["new_3"])
+    seen = []
+    first = threading.Thread(target=lambda: seen.append(service.kb_version))
+    first.start()
+    time.sleep(0.1)
+    seen.append(service.kb_version)
+    first.join()
+    assert seen == [corpus_fingerprint(ids + ["new_3"])] * 2
+    print("[SUCCESS] The corpus version is computed once, when read.")
+
+
+if __name__ == "__main__":
+    import tempfile
+    os.environ.setdefault("GEMINI_API_KEY", "test")
+    for test in (test_workers_build_index_once, test_worker_reloads_published_index):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            _seed(200)
+            test(tmp)
@@ -0,0 +1,136 @@
+import io
+import os
+import tempfile
+import time
+
+from storage import BlobStore, StorageManager, UploadTooLarge, sniff_mime_type
+
+
+def test_content_addressed_blobs():
+    print("--- Testing blob store ---")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = BlobStore(root=tmp, max_bytes=3 * 1024 * 1024)
+        data = os.urandom(2 * 1024 * 1024 + 7) # Spans several copy chunks
+        first = store.save_fileobj(io.BytesIO(data))
+        second = store.save_fileobj(io.BytesIO(data))
+
+        handle = first["document_id"]
+        assert first == {"document_id": handle, "size": len(data), "deduplicated": False}
+        assert second["deduplicated"] and second["document_id"] == handle
+        assert store.path(handle) == os.path.join(tmp, "blobs", handle[:2], handle)
+        with open(store.path(handle), "rb") as f:
+            assert f.read() == data
+        assert os.listdir(store.tmp_dir) == [] # No partial files left behind
+
+        try:
+            store.save_fileobj(io.BytesIO(b"x" * (3 * 1024 * 1024 + 1)))
+            assert False, "expected UploadTooLarge"
+        except UploadTooLarge:
+            pass
+        assert os.listdir(store.tmp_dir) == []
+        assert not store.exists("../" + handle[3:]) and not store.exists("abc")
+    print("[SUCCESS] Uploads are deduplicated by content and size-limited.")
+
+
+def test_sniff_mime_type():
+    assert sniff_mime_type(b"%PDF-1.7\n") == "application/pdf"
+    assert sniff_mime_type(b"\xff\xd8\xff\xe0\0\x10JFIF") == "image/jpeg"
+    assert sniff_mime_type(b"PK\x03\x04\x14\0") == "application/zip"
+    assert sniff_mime_type("बिजली बिल".encode("utf-8")[:10]) == "text/plain" # Cut mid-character
+    assert sniff_mime_type(b"\x00\x01\xfe\xff") is None
+
+
+
+def age(path, seconds):
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+def test_retention():
+    print("--- Testing upload retention ---")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = BlobStore(root=tmp)
+        save = lambda data: store.save_fileobj(io.BytesIO(data))["document_id"]
+        expired, active, pinned, fresh = (save(b"%PDF-1.4 " + bytes([i]) * 1000) for i in range(4))
+        legacy = os.path.join(tmp, "old_upload.pdf")
+        with open(legacy, "wb") as f:
+            f.write(b"%PDF-1.4 legacy")
+        for handle in (expired, active, pinned):
+            age(store.path(handle), 3600)
+        age(legacy, 3600)
+
+        manager = StorageManager(store, active_paths=lambda: [store.path(active)], ttl=600, quota=10 ** 9)
+        with store.pin(store.path(pinned)):
+            stats = manager.sweep()
+        assert not store.exists(expired) and not os.path.exists(legacy)
+        assert store.exists(active) and store.exists(pinned) and store.exists(fresh)
+        assert stats["evicted"]["ttl_files"] == 2 and stats["stored"]["files"] == 3
+
+        # Over quota: least recently used first, still skipping active jobs
+        manager.ttl, manager.quota = 10 ** 6, 2100
+        age(store.path(fresh), 60)
+        stats = manager.sweep()
+        assert store.exists(active) and store.exists(fresh) and not store.exists(pinned)
+        assert stats["evicted"]["quota_files"] == 1 and stats["stored"]["hot_bytes"] <= 2100
+    print("[SUCCESS] Expired and over-quota uploads are evicted, referenced ones kept.")
+
+
+def test_cold_tier():
+    print("--- Testing compressed cold tier ---")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = BlobStore(root=tmp)
+        text = ("Electricity bill. Amount due: Rs. 1,250. " * 200).encode()
+        handle = store.save_fileobj(io.BytesIO(text))["document_id"]
+        photo = store.save_fileobj(io.BytesIO(b"\xff\xd8\xff\xe0" + os.urandom(4000)))["document_id"]
+        age(store.path(handle), 7200)
+        age(store.path(photo), 7200)
+
+        manager = StorageManager(store, ttl=10 ** 6, quota=10 ** 9, cold_tier=True, cold_after=3600)
+        stats = manager.sweep()
+        assert not os.path.exists(store.path(handle)) and os.path.exists(store.cold_path(handle))
+        assert os.path.exists(store.path(photo)) # JPEGs are not recompressed
+        assert stats["cold_tier"]["files"] == 1 and stats["cold_tier"]["bytes_saved"] > len(text) // 2
+        assert store.exists(handle)
+
+        path = store.materialize(handle)
+        with open(path, "rb") as f:
+            assert f.read() == text
+        assert not os.path.exists(store.cold_path(handle))
+        assert time.time() - os.path.getmtime(path) < 60 # Access refreshed its clock
+    print("[SUCCESS] Idle blobs are compressed and restored on access.")
+
+
+def test_concurrent_rehydration():
+    print("--- Testing two requests restoring the same cold blob ---")
+    import gzip
+    import storage
+    with tempfile.TemporaryDirectory() as tmp:
+        store = BlobStore(root=tmp)
+        text = ("Court notice. Hearing on 12 May. " * 200).encode()
+        handle = store.save_fileobj(io.BytesIO(text))["document_id"]
+        age(store.path(handle), 7200)
+        StorageManager(store, ttl=10 ** 6, quota=10 ** 9, cold_tier=True, cold_after=3600).sweep()
+
+        # The second request finishes rehydrating just before the first opens the cold file
+        real_open = gzip.open
+        def racing_open(path, mode="rb"):
+            storage.gzip.open = real_open
+            store.materialize(handle)
+            return real_open(path, mode)
+        storage.gzip.open = racing_open
+        try:
+            path = store.materialize(handle)
+        finally:
+            storage.gzip.open = real_open
+        with open(path, "rb") as f:
+            assert f.read() == text
+        assert not os.listdir(store.tmp_dir)
+    print("[SUCCESS] The slower request uses the blob the other one restored.")
+
+
+if __name__ == "__main__":
+    test_content_addressed_blobs()
+    test_sniff_mime_type()
+    test_retention()
+    test_cold_tier()
+    test_concurrent_rehydration()
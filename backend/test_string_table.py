@@ -0,0 +1,25 @@
+import numpy as np
+
+from string_table import StringTable
+
+
+def test_string_table_lookups():
+    print("--- Testing StringTable ---")
+    strings = ["doc_1", "", "बिजली अधिनियम", "doc_1_chunk_2", "தமிழ்", "doc_10"]
+    table = StringTable.from_strings(strings)
+    assert len(table) == len(strings)
+    assert [table[i] for i in range(len(table))] == strings
+    assert table.tolist() == list(table) == strings
+    for i, s in enumerate(strings):
+        assert table.find(s) == i
+    assert table.find("doc_2") is None
+
+    # Same lookups through arrays as they come out of an index file
+    arrays = {name: np.frombuffer(array.tobytes(), dtype=array.dtype) for name, array in StringTable.build(strings).items()}
+    assert StringTable(arrays).find("தமிழ்") == 4
+    assert len(StringTable.from_strings([])) == 0 and StringTable.from_strings([]).find("x") is None
+    print("[SUCCESS] StringTable round-trips and finds every string.")
+
+
+if __name__ == "__main__":
+    test_string_table_lookups()
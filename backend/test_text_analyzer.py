@@ -0,0 +1,74 @@
+from bm25_index import BM25Index
+from text_analyzer import Analyzer, TOKEN
+
+ACT_TEXT = "Section 135(1) of the Electricity Act, 2003: theft of electricity. Charges: ₹5.50 per unit (see “Consumer's Complaints”)."
+
+
+def test_punctuation_is_split_off():
+    print("--- Testing punctuation-aware splitting ---")
+    terms = Analyzer(stop_words=False, stem=False).analyze(ACT_TEXT)
+    assert terms == ["section", "135", "1", "of", "the", "electricity", "act", "2003", "theft", "of",
+                     "electricity", "charges", "5.50", "per", "unit", "see", "consumer", "s", "complaints"]
+    assert Analyzer().analyze("Name: ________ (field_name)") == ["name", "field_name"]
+    print("Passed.")
+
+
+def test_stop_words_and_stemming():
+    print("--- Testing stop words and stemming ---")
+    terms = Analyzer().analyze(ACT_TEXT)
+    assert "the" not in terms and "of" not in terms and "s" not in terms
+    assert "charge" in terms and terms[-2:] == ["consumer", "complaint"]
+    analyzer = Analyzer()
+    assert analyzer.analyze("penalties for licensees") == analyzer.analyze("Penalty, licensee")
+    assert analyzer.analyze("process address status") == ["process", "address", "status"]
+    assert Analyzer().name != Analyzer(stem=False).name # Stored with the index
+    print("Passed.")
+
+
+def test_unicode_normalization():
+    print("--- Testing Unicode normalization ---")
+    analyzer = Analyzer(stop_words=False, stem=False)
+    # PDF ligatures, full-width forms, soft hyphens and zero-width characters
+    assert analyzer.analyze("ﬁling ＡＰＰＥＡＬ elec\u00adtri\u200bcity") == ["filing", "appeal", "electricity"]
+    assert analyzer.analyze("क़ानून") == analyzer.analyze("कानून") # Nukta
+    assert analyzer.analyze("हिन\u094d\u200dदी") == analyzer.analyze("हिन्दी") # Zero width joiner
+    # Decomposed and precomposed Tamil vowel signs (ொ = ெ + ா)
+    assert analyzer.analyze("\u0ba4\u0bc6\u0bbe\u0b95\u0bc8") == analyzer.analyze("\u0ba4\u0bca\u0b95\u0bc8")
+    print("Passed.")
+
+
+def test_indic_words_stay_whole():
+    print("--- Testing Indic scripts ---")
+    assert TOKEN.findall("தமிழ்நாடு மின்சார வாரியம்।") == ["தமிழ்நாடு", "மின்சார", "வாரியம்"]
+    assert TOKEN.findall("उपभोक्ता शिकायत।") == ["उपभोक्ता", "शिकायत"]
+    analyzer = Analyzer()
+    # Inflected forms reach the same term; stop words are dropped
+    assert analyzer.analyze("उपभोक्ताओं की शिकायतें") == analyzer.analyze("उपभोक्ता शिकायत")
+    assert analyzer.analyze("மாநிலத்தின் மக்களுக்கு மற்றும்") == analyzer.analyze("மாநிலம் மக்கள்")
+    print("Passed.")
+
+
+def test_queries_match_documents_through_the_analyzer():
+    print("--- Testing retrieval with the analyzer ---")
+    analyzer = Analyzer()
+    docs = {
+        "act": ACT_TEXT,
+        "tn": "தமிழ்நாடு மின்சார வாரியம் நுகர்வோர் புகார்களை விசாரிக்கும்.",
+        "hi": "उपभोक्ताओं की शिकायतें जिला आयोग में दर्ज की जाती हैं।",
+        "other": "Ration cards are issued by the civil supplies department.",
+    }
+    index = BM25Index()
+    index.add_many(list(docs), analyzer.analyze_many(docs.values()))
+    assert index.top_n(analyzer.analyze("electricity theft (section 135)?"), 1)[0][0] == "act"
+    assert index.top_n(analyzer.analyze("நுகர்வோர் புகார்"), 1)[0][0] == "tn"
+    assert index.top_n(analyzer.analyze("उपभोक्ता शिकायत"), 1)[0][0] == "hi"
+    assert index.top_n(analyzer.analyze("the of and"), 3) == []
+    print("Passed.")
+
+
+if __name__ == "__main__":
+    test_punctuation_is_split_off()
+    test_stop_words_and_stemming()
+    test_unicode_normalization()
+    test_indic_words_stay_whole()
+    test_queries_match_documents_through_the_analyzer()
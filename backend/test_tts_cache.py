@@ -0,0 +1,72 @@
+import os
+import tempfile
+
+import tts_service
+from clients import client_pool
+from tts_cache import AudioCache, audio_cache_key
+
+
+def test_audio_cache_lru_by_bytes():
+    print("--- Testing TTS audio cache ---")
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = AudioCache(path=os.path.join(tmp, "tts.sqlite3"), max_bytes=250)
+        keys = [audio_cache_key(f"Sentence {i}.", "hi-IN", "voice", "mp3") for i in range(3)]
+        cache.put(keys[0], b"a" * 100)
+        cache.put(keys[1], b"b" * 100)
+        assert cache.get(keys[0]) == b"a" * 100 # keys[1] is now least recently used
+        cache.put(keys[2], b"c" * 100)
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[2]) == b"c" * 100
+
+        stats = cache.stats()
+        assert stats["hits"] == 2 and stats["misses"] == 1 and stats["bytes_saved"] == 200
+        assert stats["evictions"] == 1 and stats["bytes"] == 200
+
+        # Whitespace / Unicode normalization share an entry; voice and language do not
+        assert audio_cache_key(" Sentence  0. ", "hi-IN", "voice", "mp3") == keys[0]
+        assert audio_cache_key("Sentence 0.", "ta-IN", "voice", "mp3") != keys[0]
+        assert audio_cache_key("Sentence 0.", "hi-IN", "other", "mp3") != keys[0]
+        cache._conn.close()
+    print("[SUCCESS] Audio cache evicts by bytes and counts savings.")
+
+
+def test_cached_response_skips_the_api():
+    calls = []
+
+    class FakeClient:
+        def __init__(self):
+            calls.append("client")
+
+        def synthesize_speech(self, input, voice, audio_config):
+            calls.append(input.text)
+
+            class Response:
+                audio_content = input.text.encode()
+            return Response()
+
+    original_client = tts_service.texttospeech.TextToSpeechClient
+    original_cache = tts_service.audio_cache
+    with tempfile.TemporaryDirectory() as tmp:
+        tts_service.texttospeech.TextToSpeechClient = FakeClient
+        tts_service.audio_cache = AudioCache(path=os.path.join(tmp, "tts.sqlite3"))
+        client_pool.reset()
+        try:
+            text = "Pay the bill. Keep the receipt. Contact the office."
+            first = b"".join(tts_service.stream_speech(text, "en-US", chunk_bytes=20))
+            calls.clear()
+            second = b"".join(tts_service.stream_speech(text, "en-US", chunk_bytes=20))
+            assert second == first and calls == []
+
+            # Only the new sentence is synthesized, on the pooled client
+            b"".join(tts_service.stream_speech(text + " New sentence.", "en-US", chunk_bytes=20))
+            assert calls == ["New sentence."]
+        finally:
+            tts_service.audio_cache._conn.close()
+            tts_service.texttospeech.TextToSpeechClient = original_client
+            tts_service.audio_cache = original_cache
+            client_pool.reset()
+
+
+if __name__ == "__main__":
+    test_audio_cache_lru_by_bytes()
+    test_cached_response_skips_the_api()
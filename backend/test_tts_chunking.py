@@ -0,0 +1,76 @@
+import os
+import tempfile
+import threading
+import time
+
+import tts_service
+from clients import client_pool
+from tts_cache import AudioCache
+from tts_service import chunk_text, split_sentences
+
+
+def test_sentence_aware_chunking():
+    print("--- Testing TTS chunking ---")
+    text = "नमस्ते। यह बिजली का बिल है। राशि Rs. 5.50 है!\n\n**Action:** Pay by 15 Jan. Thank you?\n- item one\n- item two"
+    assert split_sentences(text) == [
+        "नमस्ते।", "यह बिजली का बिल है।", "राशि Rs. 5.50 है!",
+        "**Action:** Pay by 15 Jan.", "Thank you?", "- item one", "- item two",
+    ]
+
+    # Chunks end on sentence boundaries and respect the byte limits
+    chunks = list(chunk_text(text, max_bytes=80, first_chunk_bytes=20))
+    assert chunks[0] == "नमस्ते।"
+    assert all(len(c.encode("utf-8")) <= 80 for c in chunks)
+    assert " ".join(chunks).split() == text.split()
+
+    # A single over-long "sentence" still fits the API limit
+    long_chunks = list(chunk_text("word, " * 3000))
+    assert all(len(c.encode("utf-8")) <= tts_service.MAX_CHUNK_BYTES for c in long_chunks)
+    print("[SUCCESS] Chunks follow sentence boundaries within the byte limit.")
+
+
+class FakeClient:
+    """Synthesizes later chunks faster, to check ordering under concurrency."""
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def synthesize_speech(self, input, voice, audio_config):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.05 if input.text.startswith("Sentence 0 ") else 0.01)
+        with self.lock:
+            self.active -= 1
+
+        class Response:
+            audio_content = input.text.split()[1].encode() + b";"
+        return Response()
+
+
+def test_stream_speech_is_ordered_and_bounded():
+    client = FakeClient()
+    original_client = tts_service.texttospeech.TextToSpeechClient
+    original_cache = tts_service.audio_cache
+    with tempfile.TemporaryDirectory() as tmp:
+        tts_service.texttospeech.TextToSpeechClient = lambda: client
+        tts_service.audio_cache = AudioCache(path=os.path.join(tmp, "tts.sqlite3"))
+        client_pool.reset()
+        try:
+            text = " ".join(f"Sentence {i} of the explanation." for i in range(12))
+            audio = list(tts_service.stream_speech(text, "en-US", chunk_bytes=40, concurrency=3))
+        finally:
+            tts_service.audio_cache._conn.close()
+            tts_service.texttospeech.TextToSpeechClient = original_client
+            tts_service.audio_cache = original_cache
+            client_pool.reset()
+
+    assert b"".join(audio) == b"".join(f"{i};".encode() for i in range(12))
+    assert 1 < client.peak <= 3
+
+
+if __name__ == "__main__":
+    test_sentence_aware_chunking()
+    test_stream_speech_is_ordered_and_bounded()
@@ -0,0 +1,192 @@
+import re
+import sys
+import unicodedata
+from typing import Dict, FrozenSet, Iterable, List
+
+# --- Normalization ---
+# Applied after NFKC (which also expands PDF ligatures such as "ﬁ"):
+# invisible characters that PDF extraction leaves inside words are dropped,
+# and Devanagari spelling variants are folded (as Lucene's HindiNormalizer).
+_CHAR_FOLDS = {
+    "\u00ad": "",       # Soft hyphen
+    "\u200b": "",       # Zero width space
+    "\u200c": "",       # Zero width non-joiner
+    "\u200d": "",       # Zero width joiner
+    "\ufeff": "",       # Byte order mark
+    "\u093c": "",       # Devanagari nukta (क़ -> क)
+    "\u0901": "\u0902", # Chandrabindu -> anusvara
+}
+
+
+def _mark_ranges() -> str:
+    """Regex class body of every combining mark (Mn/Mc/Me) in the BMP."""
+    ranges, start, prev = [], None, None
+    for code in range(0x300, 0x10000):
+        if unicodedata.category(chr(code))[0] == "M":
+            if start is None:
+                start = code
+            prev = code
+        elif start is not None:
+            ranges.append(f"\\u{start:04x}-\\u{prev:04x}" if prev > start else f"\\u{start:04x}")
+            start = None
+    return "".join(ranges)
+
+
+# --- Tokens ---
+# Decimal numbers stay whole ("5.50", "1,000"); otherwise a token is a run
+# of word characters and combining marks. Python's \w does not include
+# marks, so without them Indic words would be cut at every vowel sign and
+# virama ("தமிழ்" -> "தம", "ழ"). One character class (underscores are
+# stripped per token) keeps this as fast as a plain \w+ split.
+TOKEN = re.compile(r"\d+(?:[.,]\d+)+|[\w" + _mark_ranges() + r"]+")
+
+# --- Scripts ---
+LATIN, DEVANAGARI, TAMIL, OTHER = "latin", "devanagari", "tamil", "other"
+
+
+def script_of(token: str) -> str:
+    """Script of a token, from its first character."""
+    code = ord(token[0])
+    if code < 0x250:
+        return LATIN
+    if 0x900 <= code <= 0x97f:
+        return DEVANAGARI
+    if 0xb80 <= code <= 0xbff:
+        return TAMIL
+    return OTHER
+
+
+# --- Stop words ---
+ENGLISH_STOP_WORDS = frozenset("""
+a an and are as at be but by for if in into is it no not of on or such that the
+their then there these they this to was will with s t
+""".split())
+
+HINDI_STOP_WORDS = frozenset("""
+का के की को में से है हैं और पर यह वह ये वे एक भी तो ही था थे थी हो कि जो इस उस
+इसे उसे लिए तथा या एवं द्वारा
+""".split())
+
+TAMIL_STOP_WORDS = frozenset("""
+மற்றும் ஒரு இந்த அந்த என்று என்ற உள்ள ஆகும் அல்லது இது அது போது மேலும் இங்கு அங்கு
+""".split())
+
+# --- Stemming ---
+# Light suffix stripping: enough to match inflected forms of the same word
+# in documents and queries, never shortening a stem below a few characters.
+# Hindi suffixes from Ramanathan & Rao's lightweight stemmer (as Lucene's
+# HindiStemmer), longest first; chandrabindu already folded to anusvara.
+HINDI_SUFFIXES = tuple(sorted(set("""
+ाएंगी ाएंगे ाऊंगी ाऊंगा ाइयां ाइयों
+ाएगी ाएगा ाओगी ाओगे एंगी ेंगी एंगे ेंगे ूंगी ूंगा ातीं नाओं नाएं ताओं ताएं ियां ियों
+ाकर ाइए ाईं ाया ेगी ेगा ोगी ोगे ाने ाना ाते ाती ाता तीं ाओं ाएं ुओं ुएं ुआं
+कर ाओ िए ाई ाए ने नी ना ते ीं ती ता ां ों ें
+ो े ू ु ी ि ा
+""".split()), key=len, reverse=True))
+
+# Tamil plural and case endings, as written after a consonant stem
+# ("மக்கள்", "மக்களுக்கு" -> "மக்"; "மாநிலம்", "மாநிலத்தின்" -> "மாநில")
+TAMIL_SUFFIXES = tuple(sorted(set("""
+களுக்கு களுடன் களின் களில் களால் களை கள்
+த்துக்கு த்திற்கு த்தின் த்தில் த்தால் த்தை
+ுக்கு ிற்கு க்கு ுடன் ின் ில் ால் ை ம்
+""".split()), key=len, reverse=True))
+
+
+def stem_english(word: str) -> str:
+    """Plural stripping (Harman's S-stemmer): "charges" -> "charge", "parties" -> "party"."""
+    if len(word) < 4 or not word.isalpha() or word[-1] != "s":
+        return word
+    if word.endswith("ies") and not word.endswith(("eies", "aies")):
+        return word[:-3] + "y"
+    if word.endswith("es") and not word.endswith(("aes", "ees", "oes")):
+        return word[:-1]
+    if not word.endswith(("us", "ss")):
+        return word[:-1]
+    return word
+
+
+def strip_suffix(word: str, suffixes: Iterable[str], min_stem: int) -> str:
+    """`word` without its longest suffix in `suffixes` (longest first) leaving min_stem characters."""
+    for suffix in suffixes:
+        if len(word) - len(suffix) >= min_stem and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+STOP_WORDS: Dict[str, FrozenSet[str]] = {
+    LATIN: ENGLISH_STOP_WORDS,
+    DEVANAGARI: HINDI_STOP_WORDS,
+    TAMIL: TAMIL_STOP_WORDS,
+}
+STEMMERS = {
+    LATIN: stem_english,
+    DEVANAGARI: lambda word: strip_suffix(word, HINDI_SUFFIXES, 2),
+    TAMIL: lambda word: strip_suffix(word, TAMIL_SUFFIXES, 3),
+}
+
+
+class Analyzer:
+    """
+    Turns text into keyword index terms; the same analyzer must be used at
+    index and query time (its `name` is stored with the index, so changing
+    the analysis forces a rebuild).
+
+    Stages: NFKC normalization and character folding, case folding,
+    splitting on punctuation (TOKEN), then per token, by script: stop word
+    removal and light stemming (see STOP_WORDS / STEMMERS).
+
+    Speed: normalization is skipped for ASCII text, splitting is one
+    precompiled regex, and the per-token stages run once per distinct
+    token: results are cached (the vocabulary of a corpus is small next to
+    its token count), so analyzing a text is mostly C-level work.
+    """
+
+    VERSION = 1
+    CACHE_SIZE = 200000 # Distinct tokens; the cache is cleared when full
+
+    def __init__(self, stop_words: bool = True, stem: bool = True):
+        self.stop_words = stop_words
+        self.stem = stem
+        self._stop_words = {script: frozenset(self.normalize(w) for w in words)
+                            for script, words in STOP_WORDS.items()}
+        self._terms: Dict[str, str] = {} # Token -> term ("" for a stop word)
+
+    @property
+    def name(self) -> str:
+        return f"analyzer-v{self.VERSION}" + ("-stop" if self.stop_words else "") + ("-stem" if self.stem else "")
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        if text.isascii():
+            return text.lower()
+        text = unicodedata.normalize("NFKC", text)
+        for char, replacement in _CHAR_FOLDS.items():
+            if char in text: # Much faster than str.translate on long texts
+                text = text.replace(char, replacement)
+        return text.casefold()
+
+    def _term(self, token: str) -> str:
+        word = token.strip("_") # Form blanks ("____"), snake_case names
+        script = script_of(word) if word else OTHER
+        if not word or self.stop_words and word in self._stop_words.get(script, ()):
+            term = ""
+        elif self.stem and script in STEMMERS:
+            term = sys.intern(STEMMERS[script](word))
+        else:
+            term = sys.intern(word)
+        if len(self._terms) >= self.CACHE_SIZE:
+            self._terms.clear()
+        self._terms[token] = term
+        return term
+
+    def analyze(self, text: str) -> List[str]:
+        """Index terms of `text`, in order."""
+        tokens = TOKEN.findall(self.normalize(text))
+        terms = list(map(self._terms.get, tokens))
+        if None in terms: # Tokens seen for the first time
+            terms = [term if term is not None else self._term(token) for token, term in zip(tokens, terms)]
+        return list(filter(None, terms)) # Drops stop words
+
+    def analyze_many(self, texts: Iterable[str]) -> List[List[str]]:
+        return [self.analyze(text) for text in texts]
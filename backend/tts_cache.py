@@ -0,0 +1,116 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, Optional
+
+# --- Configuration ---
+CACHE_PATH = os.environ.get("TTS_CACHE_PATH", os.path.join("db_storage", "tts_cache.sqlite3"))
+MAX_CACHE_BYTES = int(os.environ.get("TTS_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+
+def normalize_text(text: str) -> str:
+    """NFC + collapsed whitespace, so trivially different chunks share audio."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def audio_cache_key(text: str, language_code: str, voice: str, audio_config: str) -> str:
+    """
+    Hash of the normalized chunk text, scoped to the language, the voice
+    and the audio config (encoding, rate, pitch...), each given as a string.
+    """
+    h = hashlib.sha256()
+    for part in (language_code, voice, audio_config, normalize_text(text)):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class AudioCache:
+    """
+    Disk-backed cache of synthesized audio, one entry per TTS chunk.
+
+    Chunks are sentence-aligned, so boilerplate sentences shared by many
+    explanations hit the cache even when the full texts differ. Entries are
+    evicted least-recently-used first once the total size passes `max_bytes`.
+    """
+
+    def __init__(self, path: Optional[str] = CACHE_PATH, max_bytes: int = MAX_CACHE_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = None
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.evictions = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS audio ("
+                " key TEXT PRIMARY KEY, audio BLOB, size INTEGER, last_used REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS audio_last_used ON audio (last_used)")
+            (total,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM audio").fetchone()
+            self._total_bytes = total
+        return self._conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Returns the cached audio bytes or None."""
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT audio FROM audio WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            db.execute("UPDATE audio SET last_used = ? WHERE key = ?", (time.time(), key))
+            db.commit()
+            self.hits += 1
+            self.bytes_saved += len(row[0])
+            return bytes(row[0])
+
+    def put(self, key: str, audio: bytes):
+        """Stores audio for a chunk, then evicts down to `max_bytes`."""
+        if not audio or len(audio) > self.max_bytes:
+            return
+        with self._lock:
+            db = self._db()
+            old = db.execute("SELECT size FROM audio WHERE key = ?", (key,)).fetchone()
+            db.execute(
+                "INSERT OR REPLACE INTO audio (key, audio, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, sqlite3.Binary(audio), len(audio), time.time())
+            )
+            self._total_bytes += len(audio) - (old[0] if old else 0)
+
+            while self._total_bytes > self.max_bytes:
+                victims = db.execute("SELECT key, size FROM audio ORDER BY last_used LIMIT 64").fetchall()
+                if not victims:
+                    break
+                for victim, size in victims:
+                    db.execute("DELETE FROM audio WHERE key = ?", (victim,))
+                    self._total_bytes -= size
+                    self.evictions += 1
+                    if self._total_bytes <= self.max_bytes:
+                        break
+            db.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "bytes_saved": self.bytes_saved,
+                "evictions": self.evictions,
+                "bytes": self._total_bytes,
+            }
@@ -1,27 +1,38 @@
 import os
+import re
 import json
-import tempfile
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterator, List, Optional
 from google.cloud import texttospeech
+from tts_cache import AudioCache, audio_cache_key
+from clients import client_pool
 
-# Credential Loading Logic
-KEY_PATH = os.path.join(os.path.dirname(__file__), "keys", "tts-service-key.json")
-
-if os.path.exists(KEY_PATH):
-    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = KEY_PATH
-else:
-    # Fallback for Render/Cloud: Load from environment variable
-    creds_json = os.environ.get("GOOGLE_CREDENTIALS_JSON")
-    if creds_json:
-        # Create a temp file for the credentials
-        with tempfile.NamedTemporaryFile(mode="w", delete=False, suffix=".json") as temp:
-            temp.write(creds_json)
-            temp_path = temp.name
-        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = temp_path
-        print(f"Loaded Google Credentials from environment variable to {temp_path}")
-    else:
-        print("Warning: No Google Cloud TTS credentials found (File missing and GOOGLE_CREDENTIALS_JSON not set). TTS will fail.")
-
-def chunk_text(text: str, max_bytes: int = 4500):
+# --- Configuration ---
+MAX_CHUNK_BYTES = 4500 # The API rejects inputs over 5000 bytes
+FIRST_CHUNK_BYTES = int(os.environ.get("TTS_FIRST_CHUNK_BYTES", "400")) # Small first chunk -> audio starts sooner
+TTS_CHUNK_BYTES = int(os.environ.get("TTS_CHUNK_BYTES", "1500"))
+TTS_SYNTH_WORKERS = int(os.environ.get("TTS_SYNTH_WORKERS", "16")) # Shared by all requests
+TTS_CHUNK_CONCURRENCY = int(os.environ.get("TTS_CHUNK_CONCURRENCY", "4")) # Per request
+
+# Sentence terminators, incl. the Devanagari danda/double danda (used by Hindi,
+# Marathi, Bengali, ...), the Urdu full stop and the CJK full stop. Latin
+# terminators only count before whitespace and a non-digit, non-lowercase
+# character, so "Rs. 5.50" and "e.g. the" stay intact.
+SENTENCE_END = re.compile(r"(?<=[\u0964\u0965\u06d4\u3002])\s*|(?<=[.!?])\s+(?=[^\sa-z0-9])|\n\s*\n\s*|\n(?=\s*(?:[-*\u2022]|\d+[.)])\s)")
+# Weaker break points for sentences that are still too long
+CLAUSE_END = re.compile(r"(?<=[,;:\u060c])\s+")
+
+_synthesis_pool = ThreadPoolExecutor(max_workers=TTS_SYNTH_WORKERS, thread_name_prefix="tts-synth")
+
+# Synthesized audio per chunk, keyed by text + language + voice + audio config
+audio_cache = AudioCache()
+
+def split_sentences(text: str) -> List[str]:
+    """Splits text into sentences (script-aware), dropping empty pieces."""
+    return [s.strip() for s in SENTENCE_END.split(text) if s and s.strip()]
+
+def _split_words(text: str, max_bytes: int) -> Iterator[str]:
     """
     Yields chunks of text where each chunk's UTF-8 encoded size is within max_bytes.
     Tries to split on whitespace to avoid breaking words.
@@ -47,17 +58,41 @@ def chunk_text(text: str, max_bytes: int = 4500):
     if current_chunk:
         yield " ".join(current_chunk)
 
-def generate_speech(text: str, language_code: str = "en-US") -> bytes:
+def _split_long(sentence: str, max_bytes: int) -> Iterator[str]:
+    """Breaks an over-long sentence at clause punctuation, then at whitespace."""
+    for clause in CLAUSE_END.split(sentence):
+        if len(clause.encode("utf-8")) <= max_bytes:
+            yield clause
+        else:
+            yield from _split_words(clause, max_bytes)
+
+def chunk_text(text: str, max_bytes: int = MAX_CHUNK_BYTES, first_chunk_bytes: Optional[int] = None):
     """
-    Synthesizes speech from the input string of text using Google Cloud TTS.
-    Returns the audio content as bytes. Handles long text by chunking.
+    Yields chunks of text where each chunk's UTF-8 encoded size is within max_bytes.
+    Chunks end at sentence boundaries (danda, full stop, paragraph, list item)
+    where possible, so the synthesized audio never cuts off mid-sentence.
+    The first chunk is limited to `first_chunk_bytes` (if given), but always
+    holds at least one whole sentence unless that exceeds max_bytes.
     """
-    if not text or not text.strip():
-        return b""
+    limit = min(first_chunk_bytes or max_bytes, max_bytes)
+    current = []
+    current_size = 0
+
+    for sentence in split_sentences(text):
+        pieces = [sentence] if len(sentence.encode("utf-8")) <= max_bytes else _split_long(sentence, max_bytes)
+        for piece in pieces:
+            size = len(piece.encode("utf-8")) + 1
+            if current and current_size + size > limit:
+                yield " ".join(current)
+                current, current_size = [], 0
+                limit = max_bytes
+            current.append(piece)
+            current_size += size
 
-    # Instantiates a client
-    client = texttospeech.TextToSpeechClient()
+    if current:
+        yield " ".join(current)
 
+def _build_request_config(language_code: str):
     # Build the voice request
     voice = texttospeech.VoiceSelectionParams(
         language_code=language_code,
@@ -68,19 +103,69 @@ def generate_speech(text: str, language_code: str = "en-US") -> bytes:
     audio_config = texttospeech.AudioConfig(
         audio_encoding=texttospeech.AudioEncoding.MP3
     )
+    return voice, audio_config
+
+def synthesize_chunk(client, chunk: str, voice, audio_config) -> bytes:
+    """Synthesizes one chunk (at most MAX_CHUNK_BYTES of text)."""
+    synthesis_input = texttospeech.SynthesisInput(text=chunk)
     
-    combined_audio = b""
-    
-    # Process text in chunks
-    for chunk in chunk_text(text):
-        synthesis_input = texttospeech.SynthesisInput(text=chunk)
-        
-        response = client.synthesize_speech(
-            input=synthesis_input, voice=voice, audio_config=audio_config
-        )
-        combined_audio += response.audio_content
+    response = client.synthesize_speech(
+        input=synthesis_input, voice=voice, audio_config=audio_config
+    )
+    return response.audio_content
+
+def _synthesize_and_cache(client, chunk: str, voice, audio_config, key: str) -> bytes:
+    audio = synthesize_chunk(client, chunk, voice, audio_config)
+    audio_cache.put(key, audio)
+    return audio
+
+def stream_speech(text: str, language_code: str = "en-US", chunk_bytes: int = TTS_CHUNK_BYTES,
+                  concurrency: int = TTS_CHUNK_CONCURRENCY) -> Iterator[bytes]:
+    """
+    Synthesizes speech chunk by chunk and yields the MP3 audio of each chunk
+    in text order. Up to `concurrency` chunks are synthesized ahead in
+    parallel, so the first chunk can be played while later ones are being
+    generated. Closing the generator cancels chunks not yet started.
+    Cached chunks are served from `audio_cache`; the API client is only
+    created if at least one chunk misses.
+    """
+    if not text or not text.strip():
+        return
+
+    client = None
+    voice, audio_config = _build_request_config(language_code)
+    voice_id = texttospeech.VoiceSelectionParams.to_json(voice, indent=None, sort_keys=True)
+    config_id = texttospeech.AudioConfig.to_json(audio_config, indent=None, sort_keys=True)
 
-    return combined_audio
+    chunks = chunk_text(text, max_bytes=min(chunk_bytes, MAX_CHUNK_BYTES), first_chunk_bytes=FIRST_CHUNK_BYTES)
+    pending = deque()
+    try:
+        for chunk in chunks:
+            key = audio_cache_key(chunk, language_code, voice_id, config_id)
+            audio = audio_cache.get(key)
+            if audio is not None:
+                future = Future()
+                future.set_result(audio)
+            else:
+                if client is None:
+                    # Long-lived client shared by all requests
+                    client = client_pool.tts()
+                future = _synthesis_pool.submit(_synthesize_and_cache, client, chunk, voice, audio_config, key)
+            pending.append(future)
+            if len(pending) >= concurrency:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+def generate_speech(text: str, language_code: str = "en-US") -> bytes:
+    """
+    Synthesizes speech from the input string of text using Google Cloud TTS.
+    Returns the audio content as bytes. Handles long text by chunking.
+    """
+    return b"".join(stream_speech(text, language_code))
 
 if __name__ == "__main__":
     # Quick test
@@ -1,11 +1,12 @@
 import os
 import tts_service
+from clients import TTS_KEY_PATH
 
 def test_tts_long_text():
     print("Testing Google Cloud TTS Service with usage of Long Text (chunking verification)...")
     
     # 1. Check Key File
-    key_path = tts_service.KEY_PATH
+    key_path = TTS_KEY_PATH
     if not os.path.exists(key_path):
         print(f"FAILED: Key file not found at {key_path}")
         return
@@ -7,7 +7,7 @@ const Scanner = lazy(() => import('./components/Scanner'))
 import LanguageSelector from './components/LanguageSelector'
 import Navbar from './components/Navbar'
 import ExplanationView from './components/ExplanationView'
-import { uploadFile, analyzeDocument } from './api'
+import { uploadFile, analyzeDocumentStream } from './api'
 import { translations } from './utils/translations'
 
 function App() {
@@ -37,11 +37,14 @@ function App() {
     try {
       // 1. Upload
       const uploadResp = await uploadFile(file)
-      // Robustly handle both forward and backslashes
-      const serverFilename = uploadResp.path.split(/[/\\]/).pop()
-
-      // 2. Analyze
-      const analysisResp = await analyzeDocument(serverFilename, language)
+      // Content hash of the upload: the handle for analysis
+      const documentId = uploadResp.document_id
+
+      // 2. Analyze (streamed: show the explanation as it is written)
+      const analysisResp = await analyzeDocumentStream(documentId, language, (partial) => {
+        setResult(partial)
+        if (partial.explanation) setLoading(false)
+      })
       setResult(analysisResp)
     } catch (err) {
       console.error("Full Error Object:", err)
@@ -13,12 +13,53 @@ export const uploadFile = async (file) => {
     return response.data
 }
 
-export const analyzeDocument = async (filename, language) => {
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms))
+
+export const analyzeDocument = async (documentId, language, onProgress) => {
+    // /analyze queues a background job; poll it until the result is ready
     const response = await axios.post(`${API_base}/analyze`, {
-        filename,
+        document_id: documentId,
         language
     })
-    return response.data
+    const { job_id } = response.data
+
+    while (true) {
+        const job = (await axios.get(`${API_base}/jobs/${job_id}`)).data
+        if (onProgress) onProgress(job)
+        if (job.status === 'done') return job.result
+        if (job.status === 'failed') throw new Error(job.error || 'Analysis failed')
+        await sleep(1000)
+    }
+}
+
+export const analyzeDocumentStream = (documentId, language, onUpdate) => {
+    // Server-Sent Events: summary and related laws arrive first, then the
+    // explanation streams in. Resolves with the final /analyze payload.
+    const params = new URLSearchParams({ document_id: documentId, language })
+    const source = new EventSource(`${API_base}/analyze/stream?${params}`)
+    let partial = { explanation: '' }
+
+    return new Promise((resolve, reject) => {
+        const update = (fields) => {
+            partial = { ...partial, ...fields }
+            if (onUpdate) onUpdate(partial)
+        }
+        source.addEventListener('summary', (e) => update(JSON.parse(e.data)))
+        source.addEventListener('context', (e) => update(JSON.parse(e.data)))
+        source.addEventListener('token', (e) => {
+            update({ explanation: partial.explanation + JSON.parse(e.data).text })
+        })
+        source.addEventListener('done', (e) => {
+            source.close()
+            resolve(JSON.parse(e.data))
+        })
+        source.addEventListener('error', (e) => {
+            source.close()
+            // Server-sent error events carry a payload; connection errors do not
+            const detail = e.data ? JSON.parse(e.data).detail : 'Connection to server lost'
+            reject(new Error(detail))
+        })
+    })
 }
 
 export const generateAudio = async (text, language) => {
@@ -30,3 +71,45 @@ export const generateAudio = async (text, language) => {
     })
     return response.data
 }
+
+const appendToBuffer = (sourceBuffer, data) => new Promise((resolve, reject) => {
+    sourceBuffer.addEventListener('updateend', resolve, { once: true })
+    sourceBuffer.addEventListener('error', reject, { once: true })
+    sourceBuffer.appendBuffer(data)
+})
+
+export const streamAudio = async (text, language) => {
+    // Returns an object URL that starts playing as soon as the first audio
+    // chunk arrives (MediaSource). Falls back to a complete blob elsewhere.
+    if (!window.MediaSource || !MediaSource.isTypeSupported('audio/mpeg')) {
+        return URL.createObjectURL(await generateAudio(text, language))
+    }
+
+    const response = await fetch(`${API_base}/tts`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ text, language })
+    })
+    if (!response.ok) {
+        const error = await response.json().catch(() => ({}))
+        throw new Error(error.detail || `TTS failed (${response.status})`)
+    }
+
+    const mediaSource = new MediaSource()
+    mediaSource.addEventListener('sourceopen', async () => {
+        const sourceBuffer = mediaSource.addSourceBuffer('audio/mpeg')
+        const reader = response.body.getReader()
+        try {
+            while (true) {
+                const { done, value } = await reader.read()
+                if (done) break
+                await appendToBuffer(sourceBuffer, value)
+            }
+            mediaSource.endOfStream()
+        } catch (err) {
+            console.error('Audio stream interrupted', err)
+            if (mediaSource.readyState === 'open') mediaSource.endOfStream('network')
+        }
+    }, { once: true })
+    return URL.createObjectURL(mediaSource)
+}
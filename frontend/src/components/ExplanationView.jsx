@@ -3,7 +3,7 @@ import { useState, useEffect, useRef } from 'react'
 import ReactMarkdown from 'react-markdown'
 import { BookOpen, AlertTriangle, ShieldCheck, FileText, Info, Volume2, PauseCircle, StopCircle, Loader2 } from 'lucide-react'
 import { translations } from '../utils/translations'
-import { generateAudio } from '../api'
+import { streamAudio } from '../api'
 
 export default function ExplanationView({ explanation, relatedLaws, loading, language, uiLanguage }) {
     const t = translations[uiLanguage] || translations['English']
@@ -47,11 +47,8 @@ export default function ExplanationView({ explanation, relatedLaws, loading, lan
             // Strip markdown symbols for cleaner speech
             const cleanText = explanation.replace(/[#*`_]/g, '')
 
-            // 1. Fetch Audio from Backend
-            const audioBlob = await generateAudio(cleanText, language)
-
-            // 2. Create Audio URL
-            const audioUrl = URL.createObjectURL(audioBlob)
+            // 1 + 2. Stream Audio from Backend (plays before synthesis finishes)
+            const audioUrl = await streamAudio(cleanText, language)
 
             // 3. Setup Audio Object
             if (audioRef.current) {